@@ -7,19 +7,46 @@ This module orchestrates the two-stage self-healing test pipeline:
 
 Usage:
     python self_healing/main.py --test-file-path cypress/e2e/login.cy.js
+    python self_healing/main.py --test-file-paths "cypress/e2e/**/*.cy.js" --concurrency 8
+    python self_healing/main.py --test-file-paths "cypress/e2e/**/*.cy.js" --processes 4 --concurrency 8
+    python self_healing/main.py --test-file-paths "cypress/e2e/**/*.cy.js" --queue /shared/heal_queue.db
+    python self_healing/main.py --worker --queue /shared/heal_queue.db --concurrency 4
 """
 
 import argparse
 import asyncio
 import os
 import sys
+import time
 import uuid
 from pathlib import Path
 
 import dotenv
-from self_healing.src.agents.coding_agent import CodingAgent
-from self_healing.src.agents.web_agent import WebAgent
-from self_healing.src.utils.prompt_loader import PromptLoader
+from self_healing.src.lib.batch_runner import (
+    DEFAULT_CONCURRENCY,
+    DEFAULT_SPEC_PATTERNS,
+    STATUS_PASSED,
+    BatchRunner,
+    SpecResult,
+)
+from self_healing.src.lib.heal_daemon import HealDaemon
+from self_healing.src.lib.job_queue import DEFAULT_LEASE_SECONDS, JobQueue
+from self_healing.src.lib.mcp_server_pool import McpServerPool
+from self_healing.src.lib.prefix_state_runner import PrefixStateRunner
+from self_healing.src.lib.queue_worker import DEFAULT_POLL_INTERVAL, QueueWorker
+from self_healing.src.lib.self_healing_pipeline import PipelineTimeoutError, SelfHealingPipeline
+from self_healing.src.lib.sharded_runner import ShardedBatchRunner
+from self_healing.src.lib.staged_runner import StagedBatchRunner
+from self_healing.src.lib.triage_runner import DEFAULT_TRIAGE_CONCURRENCY, TriageRunner
+from self_healing.src.utils.baseline_store import BaselineStore
+from self_healing.src.utils.blocking_profiles import BlockingProfiles
+from self_healing.src.utils.git_changes import GitChangeDetector
+from self_healing.src.utils.har_store import DEFAULT_MAX_AGE as DEFAULT_HAR_MAX_AGE
+from self_healing.src.utils.playwright_replay import FlowStore, PlaywrightReplayer
+from self_healing.src.utils.process_memory import McpMemorySampler
+from self_healing.src.utils.selector_matcher import DEFAULT_CONFIDENCE as DEFAULT_LOCAL_MATCH_CONFIDENCE
+from self_healing.src.utils.storage_state import DEFAULT_MAX_AGE as DEFAULT_LOGIN_MAX_AGE
+from self_healing.src.utils.subprocess_executor import DEFAULT_TIMEOUT, SubprocessExecutor
 
 # Add the project root to the Python path
 project_root = Path(__file__).parent.parent
@@ -30,81 +57,498 @@ sys.path.insert(0, str(project_root))
 dotenv.load_dotenv()
 
 
-class SelfHealingPipeline:
-    """
-    Main orchestrator for the self-healing test pipeline.
-    Coordinates Web Agent and Coding Agent execution.
-    """
-
-    def __init__(self, test_file_path: str, workspace_path: str = None):
-        self.test_file_path = test_file_path
-        self.workspace_path = workspace_path or os.getcwd()
-        self.prompt_loader = PromptLoader()
-        self.run_uuid = uuid.uuid4()
-
-    async def run(self):
-        """Execute the complete self-healing pipeline."""
-        print("=" * 80)
-        print("Self-Healing Test Pipeline")
-        print("=" * 80)
-        print(f"Test File: {self.test_file_path}")
-        print(f"Workspace: {self.workspace_path}")
-        print("=" * 80 + "\n")
-
-        # Stage 1: Run Web Agent to generate conversation logs
-        print("STAGE 1: Web Agent - Executing test with Playwright\n")
-
-        web_agent = WebAgent(
-            test_file_path=self.test_file_path,
-            prompt_loader=self.prompt_loader,
-            workspace_path=self.workspace_path,
-            run_uuid=self.run_uuid,
-        )
-
-        await web_agent.run()
-
-        print("\n" + "✅ " * 20)
-        print(f"STAGE 1 COMPLETED: Task ID = {self.run_uuid}")
-        print("✅ " * 20 + "\n")
-
-        # Stage 2: Run Coding Agent to fix the test
-        print("STAGE 2: Coding Agent - Fixing test based on conversation logs")
-
-        coding_agent = CodingAgent(
-            test_file_path=self.test_file_path,
-            task_id=self.run_uuid,
-            prompt_loader=self.prompt_loader,
-            workspace_path=self.workspace_path,
-        )
-        await coding_agent.run()
-
-        print("\n" + "🎉 " * 20)
-        print("PIPELINE COMPLETED SUCCESSFULLY!")
-        print("🎉 " * 20 + "\n")
-
-
 def parse_args():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(
         description="Self-Healing Test Pipeline - Automated test analysis and fixing",
         formatter_class=argparse.RawDescriptionHelpFormatter,
     )
-    parser.add_argument(
+    targets = parser.add_mutually_exclusive_group()
+    targets.add_argument(
         "--test-file-path",
         type=str,
-        required=True,
         help="Path to the test file to analyze and fix",
     )
-    return parser.parse_args()
+    targets.add_argument(
+        "--test-file-paths",
+        type=str,
+        nargs="+",
+        help="Batch mode: test file paths or glob patterns (e.g. 'cypress/e2e/**/*.cy.js') to heal concurrently",
+    )
+    parser.add_argument(
+        "--changed-since",
+        type=str,
+        help="Incremental mode: git revision range (e.g. 'origin/main...HEAD' or 'HEAD~1'); only heal specs "
+        "that changed or depend on changed imports, support or config files. Candidates default to "
+        f"{' '.join(DEFAULT_SPEC_PATTERNS)}",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Daemon mode: stay resident and accept heal jobs over a local HTTP API "
+        "(--host/--port or --socket), running up to --concurrency jobs at once",
+    )
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Daemon mode: host to bind to")
+    parser.add_argument("--port", type=int, default=8765, help="Daemon mode: port to listen on")
+    parser.add_argument("--socket", type=str, help="Daemon mode: listen on this Unix socket instead of TCP")
+    parser.add_argument(
+        "--queue",
+        type=str,
+        help="Distributed mode: path of a SQLite job queue shared with workers (possibly on other hosts). "
+        "Batch and incremental runs enqueue their specs there and wait for the workers' results",
+    )
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="Distributed mode: lease jobs from --queue and heal them, up to --concurrency at once, "
+        "until the queue is drained",
+    )
+    parser.add_argument(
+        "--lease-seconds",
+        type=float,
+        default=DEFAULT_LEASE_SECONDS,
+        help="Worker mode: lease duration; a job whose worker stops renewing it is retried by another "
+        f"worker after this long (default: {DEFAULT_LEASE_SECONDS})",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Batch mode: maximum number of pipelines running at once (default: {DEFAULT_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--staged",
+        action="store_true",
+        help="Batch mode: overlap stages across specs, running --concurrency web agents and "
+        "--coding-concurrency coding agents on separate worker pools",
+    )
+    parser.add_argument(
+        "--coding-concurrency",
+        type=int,
+        help="Batch mode with --staged: number of coding agent workers (default: same as --concurrency)",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="Batch mode: shard test files across this many worker processes, "
+        "each running --concurrency pipelines (default: 1, no sharding)",
+    )
+    parser.add_argument(
+        "--prefilter",
+        action="store_true",
+        help="Run every spec with Cypress first and only heal the failing ones, "
+        "passing their failure output to the web agent",
+    )
+    parser.add_argument(
+        "--triage-concurrency",
+        type=int,
+        default=DEFAULT_TRIAGE_CONCURRENCY,
+        help=f"With --prefilter: number of Cypress triage runs at once (default: {DEFAULT_TRIAGE_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--per-test",
+        action="store_true",
+        help="Heal only the failing it() blocks of each spec, exploring them concurrently "
+        "and validating each with a single-test run",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Key stage outputs by a hash of the spec, its imports and config, "
+        "and skip stages already completed for unchanged inputs",
+    )
+    parser.add_argument(
+        "--spec-timeout",
+        type=float,
+        help="Wall-clock budget in seconds for healing one spec across both stages; "
+        "a spec that runs over is cancelled and reported as timed out",
+    )
+    parser.add_argument("--web-timeout", type=float, help="Wall-clock budget in seconds for the web agent stage")
+    parser.add_argument("--coding-timeout", type=float, help="Wall-clock budget in seconds for the coding agent stage")
+    parser.add_argument(
+        "--cypress-timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        help=f"Timeout in seconds for a single Cypress run (default: {DEFAULT_TIMEOUT})",
+    )
+    parser.add_argument(
+        "--mcp-pool-size",
+        type=int,
+        help="Keep this many Playwright MCP servers warm (per process) and lease them to web agents "
+        "instead of starting a server per session",
+    )
+    parser.add_argument(
+        "--shared-browser",
+        action="store_true",
+        help="Serve all web agents of a process from one MCP server (--mcp-pool-size servers if given), "
+        "so concurrent specs share one browser, each in its own isolated context",
+    )
+    parser.add_argument(
+        "--measure-memory",
+        action="store_true",
+        help="Sample the memory of MCP servers and their browsers while web agents run and "
+        "report RSS/PSS per concurrent session (Linux only)",
+    )
+    parser.add_argument(
+        "--reuse-login",
+        action="store_true",
+        help="Save the browser's storage state after the first web agent logs in and start later "
+        "MCP sessions with it (--storage-state), so specs skip the login flow",
+    )
+    parser.add_argument(
+        "--login-max-age",
+        type=float,
+        default=DEFAULT_LOGIN_MAX_AGE,
+        help="With --reuse-login: seconds before a saved login session is discarded "
+        f"(default: {DEFAULT_LOGIN_MAX_AGE})",
+    )
+    parser.add_argument(
+        "--preload-context",
+        action="store_true",
+        help="Include the spec, the files it imports, the Cypress config and the support files in the "
+        "web agent prompt, so the agent does not have to read them with tool calls",
+    )
+    parser.add_argument(
+        "--share-prefixes",
+        action="store_true",
+        help="Batch mode: execute setup steps shared by several specs once, save the browser state "
+        "(storage and URL) and start each of those specs' web agents from it",
+    )
+    parser.add_argument(
+        "--replay-precheck",
+        action="store_true",
+        help="Before the web agent runs, replay the browser steps recorded by the spec's previous session; "
+        "if they still work, reuse that session's output instead of starting an agent",
+    )
+    parser.add_argument(
+        "--pre-execute",
+        action="store_true",
+        help="Translate the spec's Cypress steps to Playwright and have the web agent run them in one call, "
+        "so it only starts exploring at the first step that fails or cannot be translated",
+    )
+    parser.add_argument(
+        "--har",
+        action="store_true",
+        help="Record the application traffic of each spec's first web agent session as a HAR and serve "
+        "later sessions of the spec from it (requests missing from the HAR still reach the network)",
+    )
+    parser.add_argument(
+        "--har-max-age",
+        type=float,
+        default=DEFAULT_HAR_MAX_AGE,
+        help=f"With --har: seconds before a recorded HAR is recorded again (default: {DEFAULT_HAR_MAX_AGE})",
+    )
+    parser.add_argument(
+        "--block",
+        type=lambda value: [name.strip() for name in value.split(",") if name.strip()],
+        help="Comma-separated blocking profiles (e.g. analytics,chat,ads) whose third-party hosts web agents "
+        "do not load; profiles can be added in self_healing/blocking_profiles.json",
+    )
+    parser.add_argument(
+        "--block-cypress",
+        action="store_true",
+        help="With --block: also block the hosts in Cypress validation runs (blockHosts)",
+    )
+    parser.add_argument(
+        "--compact-snapshots",
+        action="store_true",
+        help="Replace repeated ARIA snapshots in Playwright MCP tool results with references or deltas "
+        "and cap each tool's output, reporting the tokens saved per session",
+    )
+    parser.add_argument(
+        "--aria-diff",
+        action="store_true",
+        help="When a spec has a baseline snapshot from a passing run (self_healing/aria_baselines/ or captured "
+        "with --capture-baselines), skip the web agent and give the coding agent the ARIA diff against it",
+    )
+    parser.add_argument(
+        "--capture-baselines",
+        action="store_true",
+        help="Store the per-step ARIA snapshots of passing tests in Cypress runs (prefilter and validation) "
+        "as baselines for --aria-diff",
+    )
+    parser.add_argument(
+        "--local-match",
+        action="store_true",
+        help="Before any agent runs, match a failed selector or cy.contains() text against the failure's ARIA "
+        "snapshot and, when confident, apply and validate the replacement without an agent",
+    )
+    parser.add_argument(
+        "--local-match-threshold",
+        type=float,
+        default=DEFAULT_LOCAL_MATCH_CONFIDENCE,
+        help="With --local-match: minimum confidence (0-1) of a proposal to validate "
+        f"(default: {DEFAULT_LOCAL_MATCH_CONFIDENCE})",
+    )
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help="Only replay the recorded browser steps of the given specs, without any agent, "
+        "and report the first failing step of each",
+    )
+    args = parser.parse_args()
+    if args.worker and not args.queue:
+        parser.error("--worker requires --queue")
+    if not (args.test_file_path or args.test_file_paths or args.changed_since or args.serve or args.worker):
+        parser.error("one of --test-file-path, --test-file-paths, --changed-since, --serve or --worker is required")
+    if args.block_cypress and not args.block:
+        parser.error("--block-cypress requires --block")
+    if args.block:
+        try:
+            BlockingProfiles(os.getcwd()).hosts(args.block)
+        except ValueError as e:
+            parser.error(str(e))
+    return args
+
+
+async def run_triage(args, test_file_paths, workspace_path):
+    """Run the prefilter and return (triage results, per-spec pipeline options for failing specs)."""
+    # Prefilter runs block the same hosts as the pipeline's validation runs
+    block_hosts = None
+    if args.block_cypress:
+        block_hosts = BlockingProfiles.cypress_block_hosts(BlockingProfiles(workspace_path).hosts(args.block))
+    triage = TriageRunner(
+        test_file_paths=test_file_paths,
+        workspace_path=workspace_path,
+        concurrency=args.triage_concurrency,
+        cypress_executor=SubprocessExecutor(
+            workspace_path,
+            args.cypress_timeout,
+            block_hosts,
+            BaselineStore.shared(workspace_path) if args.capture_baselines else None,
+        ),
+    )
+    triage_results = await triage.run()
+    spec_options = {
+        test_file_path: {"initial_test_output": output}
+        for test_file_path, output in TriageRunner.failure_outputs(triage_results).items()
+    }
+    return triage_results, spec_options
+
+
+async def run_batch(args):
+    """Heal every matched test file concurrently and report an aggregate summary."""
+    workspace_path = os.getcwd()
+    patterns = args.test_file_paths or ([args.test_file_path] if args.test_file_path else DEFAULT_SPEC_PATTERNS)
+    all_test_file_paths = BatchRunner.expand_test_file_paths(patterns, workspace_path)
+    if args.changed_since:
+        detector = GitChangeDetector(workspace_path)
+        all_test_file_paths = detector.affected_specs(all_test_file_paths, args.changed_since)
+    if not all_test_file_paths:
+        print("No test files to heal.")
+        return
+
+    start = time.monotonic()
+    test_file_paths = all_test_file_paths
+    passed_results = {}
+    spec_options = {}
+    if args.prefilter:
+        triage_results, spec_options = await run_triage(args, all_test_file_paths, workspace_path)
+        passed_results = {
+            result.test_file_path: SpecResult(result.test_file_path, STATUS_PASSED, result.wall_time)
+            for result in triage_results
+            if result.passed
+        }
+        test_file_paths = [path for path in test_file_paths if path not in passed_results]
+
+    if args.share_prefixes and not args.per_test and len(test_file_paths) > 1:
+        prefix_runner = PrefixStateRunner(
+            workspace_path, concurrency=args.concurrency, pipeline_options=pipeline_options(args)
+        )
+        for path, options in (await prefix_runner.run(test_file_paths)).items():
+            spec_options[path] = {**spec_options.get(path, {}), **options}
+
+    if not test_file_paths:
+        healed_results = []
+    elif args.queue:
+        healed_results = await run_queued(args, test_file_paths, spec_options)
+    else:
+        runner = build_runner(args, test_file_paths, workspace_path, spec_options, pipeline_options(args))
+        healed_results = await runner.run()
+    results_by_path = {**passed_results, **{result.test_file_path: result for result in healed_results}}
+    results = [results_by_path[path] for path in all_test_file_paths]
+
+    BatchRunner.print_summary(results)
+    print(f"Batch wall time: {time.monotonic() - start:.1f}s")
+    BatchRunner.save_summary(
+        results,
+        Path(workspace_path) / "self_healing" / "results" / f"batch_summary_{uuid.uuid4().hex}.json",
+    )
+
+
+async def run_replay(args):
+    """Replay the recorded browser steps of every matched spec and report which flows still work."""
+    workspace_path = os.getcwd()
+    patterns = args.test_file_paths or ([args.test_file_path] if args.test_file_path else DEFAULT_SPEC_PATTERNS)
+    test_file_paths = BatchRunner.expand_test_file_paths(patterns, workspace_path)
+    if args.changed_since:
+        test_file_paths = GitChangeDetector(workspace_path).affected_specs(test_file_paths, args.changed_since)
+    store = FlowStore(workspace_path)
+    flows = {path: flow for path in test_file_paths if (flow := store.load(path))}
+    if not flows:
+        print("No recorded browser steps for the selected specs.")
+        return
+
+    replayer = PlaywrightReplayer(workspace_path)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def replay(flow):
+        async with semaphore:
+            return await replayer.replay(flow)
+
+    results = await asyncio.gather(*(replay(flow) for flow in flows.values()))
+
+    print("=" * 80)
+    print("Replay Summary")
+    print("=" * 80)
+    for (path, flow), result in zip(flows.items(), results):
+        print(f"{'✅' if result.passed else '❌'} {path} (recorded {flow.recorded_at})")
+        print("   " + result.report().replace("\n", "\n   "))
+    passed = sum(1 for result in results if result.passed)
+    print("=" * 80)
+    print(f"{passed} of {len(results)} recorded flows replay, {len(test_file_paths) - len(flows)} specs have none")
+
+
+async def run_queued(args, test_file_paths, spec_options):
+    """Enqueue the specs on the shared job queue and wait until workers have reported every result."""
+    queue = JobQueue(args.queue)
+    options = pipeline_options(args)
+    # Options no pipeline can be created with would fail on every worker that leases the job
+    checker = BatchRunner([], os.getcwd(), pipeline_options=options)
+    rejected = []
+    for path in test_file_paths:
+        try:
+            checker.check_options(path, spec_options.get(path, {}))
+        except ValueError as e:
+            rejected.append(BatchRunner.errored_result(path, time.monotonic(), e))
+    rejected_paths = {result.test_file_path for result in rejected}
+    test_file_paths = [path for path in test_file_paths if path not in rejected_paths]
+    job_ids = queue.enqueue(
+        test_file_paths,
+        {path: {**options, **spec_options.get(path, {})} for path in test_file_paths},
+    )
+    print(f"📥 Enqueued {len(job_ids)} jobs on {args.queue}, waiting for workers...")
+
+    while not await asyncio.to_thread(queue.is_drained, job_ids):
+        counts = await asyncio.to_thread(queue.counts)
+        print(f"   Queue: {', '.join(f'{count} {state}' for state, count in sorted(counts.items()))}")
+        await asyncio.sleep(DEFAULT_POLL_INTERVAL)
+
+    return rejected + await asyncio.to_thread(queue.results, job_ids)
+
+
+def pipeline_options(args):
+    """Keyword arguments shared by every SelfHealingPipeline of this run."""
+    return {
+        "resume": args.resume,
+        "per_test": args.per_test,
+        "spec_timeout": args.spec_timeout,
+        "web_timeout": args.web_timeout,
+        "coding_timeout": args.coding_timeout,
+        "cypress_timeout": args.cypress_timeout,
+        "mcp_pool_size": args.mcp_pool_size,
+        "shared_browser": args.shared_browser,
+        "measure_memory": args.measure_memory,
+        "reuse_login": args.reuse_login,
+        "login_max_age": args.login_max_age,
+        "preload_context": args.preload_context,
+        "replay_precheck": args.replay_precheck,
+        "pre_execute": args.pre_execute,
+        "record_har": args.har,
+        "har_max_age": args.har_max_age,
+        "blocking_profiles": args.block,
+        "block_cypress": args.block_cypress,
+        "compact_snapshots": args.compact_snapshots,
+        "aria_diff": args.aria_diff,
+        "capture_baselines": args.capture_baselines,
+        "local_match": args.local_match,
+        "local_match_threshold": args.local_match_threshold,
+    }
+
+
+def build_runner(args, test_file_paths, workspace_path, spec_options, options):
+    """Pick the batch scheduler requested on the command line."""
+    coding_concurrency = (args.coding_concurrency or args.concurrency) if args.staged else None
+    if args.processes > 1:
+        return ShardedBatchRunner(
+            test_file_paths=test_file_paths,
+            workspace_path=workspace_path,
+            processes=args.processes,
+            concurrency=args.concurrency,
+            coding_concurrency=coding_concurrency,
+            spec_options=spec_options,
+            pipeline_options=options,
+        )
+    if args.staged:
+        return StagedBatchRunner(
+            test_file_paths=test_file_paths,
+            workspace_path=workspace_path,
+            web_concurrency=args.concurrency,
+            coding_concurrency=coding_concurrency,
+            spec_options=spec_options,
+            pipeline_options=options,
+        )
+    return BatchRunner(
+        test_file_paths=test_file_paths,
+        workspace_path=workspace_path,
+        concurrency=args.concurrency,
+        spec_options=spec_options,
+        pipeline_options=options,
+    )
 
 
 async def main():
     """Main entry point for the self-healing pipeline."""
     args = parse_args()
+    try:
+        await run(args)
+    finally:
+        await McpServerPool.close_all()
+        await McpMemorySampler.close_shared()
+
+
+async def run(args):
+    """Dispatch to the mode selected on the command line."""
+    if args.serve:
+        daemon = HealDaemon(concurrency=args.concurrency, pipeline_options=pipeline_options(args))
+        await daemon.serve(host=args.host, port=args.port, socket_path=args.socket)
+        return
+
+    if args.worker:
+        worker = QueueWorker(
+            JobQueue(args.queue),
+            concurrency=args.concurrency,
+            pipeline_options=pipeline_options(args),
+            lease_seconds=args.lease_seconds,
+        )
+        await worker.run()
+        return
+
+    if args.replay:
+        await run_replay(args)
+        return
+
+    if args.test_file_paths or args.changed_since or args.queue:
+        await run_batch(args)
+        return
+
+    spec_options = {}
+    if args.prefilter:
+        triage_results, spec_options = await run_triage(args, [args.test_file_path], os.getcwd())
+        if triage_results[0].passed:
+            print(f"\n✅ {args.test_file_path} already passes, nothing to heal.")
+            return
+
     pipeline = SelfHealingPipeline(
         test_file_path=args.test_file_path,
+        **pipeline_options(args),
+        **spec_options.get(args.test_file_path, {}),
     )
-    await pipeline.run()
+    try:
+        await pipeline.run()
+    except PipelineTimeoutError as e:
+        print(f"\n⏱️ {args.test_file_path} timed out: {e}")
 
 
 if __name__ == "__main__":
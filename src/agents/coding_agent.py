@@ -70,6 +70,10 @@ class CodingAgent:
         workspace_path: str = None,
         max_retries: int = MAX_RETRIES,
         model: str = "haiku",
+        cypress_executor: SubprocessExecutor = None,
+        test_title: str = None,
+        aria_diff: str = None,
+        failure_output: str = None,
     ):
         self.test_file_path = test_file_path
         self.workspace_path = workspace_path or os.getcwd()
@@ -81,24 +85,38 @@ class CodingAgent:
             code_blocks_path,
             hint="Please run test_web_agent.py first to generate code_blocks.txt",
         )
-        self.cypress_executor = SubprocessExecutor(self.workspace_path)
+        self.cypress_executor = cypress_executor or SubprocessExecutor(self.workspace_path)
+        # When set, only this test of the spec is fixed and validated
+        self.test_title = test_title
         self.prompt_loader = prompt_loader or PromptLoader()
+        # Page changes since the last passing run; when set, no web agent conversation is needed
+        self.aria_diff = aria_diff
+        self.failure_output = failure_output
 
-    async def run(self):
-        conversation_content = self.file_loader.read()
+    async def run(self) -> bool:
+        """Run the fix attempts and return whether the test passed on the last attempt."""
+        conversation_content = "" if self.aria_diff else self.file_loader.read()
         fix_runner = CodingAgentRunner(
             test_file_path=self.test_file_path,
             workspace_path=self.workspace_path,
             conversation_content=conversation_content,
             prompt_loader=self.prompt_loader,
             model=self.model,
+            task_id=self.task_id,
+            test_title=self.test_title,
+            aria_diff=self.aria_diff,
+            failure_output=self.failure_output,
         )
 
         # Run all attempts in a single Claude session
-        await fix_runner.run_all_attempts(
+        conversation_history = await fix_runner.run_all_attempts(
             max_retries=self.max_retries,
             cypress_executor=self.cypress_executor,
         )
+        if not conversation_history:
+            return False
+        test_success, _ = conversation_history[-1]["test_result"]
+        return test_success
 
 
 async def main():
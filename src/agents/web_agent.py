@@ -17,11 +17,16 @@ import asyncio
 import os
 import uuid
 from pathlib import Path
+from typing import Any, Dict, List
 
 import dotenv
 from self_healing.src.agents.support_models import SUPPORT_MODELS
+from self_healing.src.lib.mcp_server_pool import McpServerPool
 from self_healing.src.lib.web_agent_runner import WebAgentRunner
 from self_healing.src.utils.conversation_extractor import ConversationExtractor
+from self_healing.src.utils.cypress_transpiler import PreExecution
+from self_healing.src.utils.playwright_replay import FlowStore
+from self_healing.src.utils.process_memory import McpMemorySampler
 from self_healing.src.utils.prompt_loader import PromptLoader
 
 # Load environment variables
@@ -60,12 +65,36 @@ class WebAgent:
         workspace_path: str = None,
         run_uuid: str = None,
         model: str = "sonnet",
+        initial_test_output: str = None,
+        test_title: str = None,
+        mcp_pool: McpServerPool = None,
+        memory_sampler: McpMemorySampler = None,
+        storage_state_path: str = None,
+        capture_storage_state_path: str = None,
+        prefix_state: Dict[str, Any] = None,
+        context_bundle: str = None,
+        replay_report: str = None,
+        pre_execution: PreExecution = None,
+        server_args: List[str] = None,
+        compact_snapshots: bool = False,
     ):
         self.prompt_loader = prompt_loader or PromptLoader()
         self.workspace_path = workspace_path or os.getcwd()
         self.test_file_path = test_file_path
         self.run_uuid = run_uuid or uuid.uuid4().hex
         self.model = model
+        self.initial_test_output = initial_test_output
+        self.test_title = test_title
+        self.mcp_pool = mcp_pool
+        self.memory_sampler = memory_sampler
+        self.storage_state_path = storage_state_path
+        self.capture_storage_state_path = capture_storage_state_path
+        self.prefix_state = prefix_state
+        self.context_bundle = context_bundle
+        self.replay_report = replay_report
+        self.pre_execution = pre_execution
+        self.server_args = server_args
+        self.compact_snapshots = compact_snapshots
         self.results_dir = Path("self_healing/results")
         self.results_dir.mkdir(parents=True, exist_ok=True)
         self.conversation_path = self.results_dir / f"conversation_{self.run_uuid}.md"
@@ -75,15 +104,37 @@ class WebAgent:
         await self._run_full_pipeline()
 
     async def _run_full_pipeline(self):
+        if self.mcp_pool:
+            async with self.mcp_pool.lease() as mcp_server_url:
+                await self._run_agent(mcp_server_url)
+        else:
+            await self._run_agent()
+        self._extract_code_blocks()
+
+    async def _run_agent(self, mcp_server_url: str = None):
         runner = WebAgentRunner(
             test_file_path=self.test_file_path,
             workspace_path=self.workspace_path,
             conversation_path=self.conversation_path,
             prompt_loader=self.prompt_loader,
             model=self.model,
+            initial_test_output=self.initial_test_output,
+            test_title=self.test_title,
+            mcp_server_url=mcp_server_url,
+            storage_state_path=self.storage_state_path,
+            capture_storage_state_path=self.capture_storage_state_path,
+            prefix_state=self.prefix_state,
+            context_bundle=self.context_bundle,
+            replay_report=self.replay_report,
+            pre_execution=self.pre_execution,
+            server_args=self.server_args,
+            compact_snapshots=self.compact_snapshots,
         )
-        await runner.run()
-        self._extract_code_blocks()
+        if self.memory_sampler:
+            with self.memory_sampler.session():
+                await runner.run()
+        else:
+            await runner.run()
 
     def _extract_code_blocks(self):
         """Extract todos and tool calls from the conversation file."""
@@ -137,11 +188,30 @@ class WebAgent:
             else:
                 f.write("No tool calls found.\n")
 
+        if not self.test_title:
+            self._record_flow(tool_calls)
+
         print("\n✅ Extraction completed successfully!")
         print(f"   - Extracted {len(todos)} todos from last list")
         print(f"   - Found {len(tool_calls)} tool calls with Input + Output pairs")
         print(f"   - Results saved to: {self.code_blocks_path}")
 
+    def _record_flow(self, tool_calls):
+        """Save the session's browser steps so later runs can replay them without an agent."""
+        storage_state_path, start_url = self.storage_state_path, None
+        if self.prefix_state:
+            storage_state_path, start_url = self.prefix_state["storage_state_path"], self.prefix_state["url"]
+        flow = FlowStore(self.workspace_path).record(
+            self.test_file_path,
+            tool_calls,
+            code_blocks_path=self.code_blocks_path,
+            conversation_path=self.conversation_path,
+            storage_state_path=storage_state_path,
+            start_url=start_url,
+        )
+        if flow:
+            print(f"   - Recorded {len(flow.steps)} replayable browser steps")
+
 
 async def main():
     args = WebAgent.parse_args()
@@ -0,0 +1,217 @@
+"""
+Batch Runner
+
+Heals many test files concurrently by running one SelfHealingPipeline per spec
+under an asyncio concurrency limit, then reports an aggregate summary.
+"""
+
+import asyncio
+import glob
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple
+
+from self_healing.src.lib.self_healing_pipeline import PipelineTimeoutError, SelfHealingPipeline
+from self_healing.src.utils.prompt_loader import PromptLoader
+
+# Configuration
+DEFAULT_CONCURRENCY = 4
+DEFAULT_SPEC_PATTERNS = ["cypress/e2e/**/*.cy.js", "cypress/e2e/**/*.cy.ts"]
+
+# Spec result statuses
+STATUS_HEALED = "healed"
+STATUS_FAILING = "still failing"
+STATUS_ERRORED = "errored"
+STATUS_PASSED = "passed"
+STATUS_TIMED_OUT = "timed out"
+
+
+class SpecResult(NamedTuple):
+    """Outcome of healing a single test file within a batch."""
+
+    test_file_path: str
+    status: str
+    wall_time: float
+    task_id: str = ""
+    error: str = ""
+    # Heals of the spec (or of its tests with --per-test) by the local selector matcher and by coding agents
+    local_heals: int = 0
+    agent_heals: int = 0
+    local_match_time: float = 0.0
+
+
+class BatchRunner:
+    """
+    Runs SelfHealingPipeline instances for a list of test files with bounded concurrency.
+    """
+
+    def __init__(
+        self,
+        test_file_paths: List[str],
+        workspace_path: str = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        prompt_loader: PromptLoader = None,
+        pipeline_options: Dict[str, Any] = None,
+        spec_options: Dict[str, Dict[str, Any]] = None,
+    ):
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be at least 1, got {concurrency}")
+        self.test_file_paths = test_file_paths
+        self.workspace_path = workspace_path or os.getcwd()
+        self.concurrency = concurrency
+        self.prompt_loader = prompt_loader or PromptLoader()
+        # Extra keyword arguments forwarded to every SelfHealingPipeline
+        self.pipeline_options = pipeline_options or {}
+        # Per test file keyword arguments, e.g. the initial failure output from triage
+        self.spec_options = spec_options or {}
+
+    @staticmethod
+    def expand_test_file_paths(patterns: Iterable[str], workspace_path: str = None) -> List[str]:
+        """
+        Expand glob patterns (e.g. "cypress/e2e/**/*.cy.js") relative to the workspace.
+        Plain paths are kept as-is; duplicates are removed while preserving order.
+        """
+        workspace_path = workspace_path or os.getcwd()
+        expanded: List[str] = []
+        for pattern in patterns:
+            if glob.has_magic(pattern):
+                matches = sorted(glob.glob(pattern, root_dir=workspace_path, recursive=True))
+                if not matches:
+                    print(f"⚠️ No test files matched pattern: {pattern}")
+                expanded.extend(matches)
+            else:
+                expanded.append(pattern)
+        return list(dict.fromkeys(expanded))
+
+    async def run(self) -> List[SpecResult]:
+        """Heal all test files and return one SpecResult per file, in input order."""
+        print("=" * 80)
+        print("Self-Healing Batch Run")
+        print("=" * 80)
+        print(f"Test Files: {len(self.test_file_paths)}")
+        print(f"Concurrency: {self.concurrency}")
+        print(f"Workspace: {self.workspace_path}")
+        print("=" * 80 + "\n")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        return await asyncio.gather(
+            *(self._run_one(test_file_path, semaphore) for test_file_path in self.test_file_paths)
+        )
+
+    async def _run_one(self, test_file_path: str, semaphore: asyncio.Semaphore) -> SpecResult:
+        async with semaphore:
+            start = time.monotonic()
+            try:
+                pipeline = self.create_pipeline(test_file_path)
+            except Exception as e:
+                return self.errored_result(test_file_path, start, e)
+            try:
+                healed = await pipeline.run()
+            except Exception as e:
+                return self.errored_result(test_file_path, start, e, pipeline)
+            return self.completed_result(pipeline, start, healed)
+
+    def create_pipeline(self, test_file_path: str, **overrides) -> SelfHealingPipeline:
+        return SelfHealingPipeline(
+            test_file_path=test_file_path,
+            workspace_path=self.workspace_path,
+            prompt_loader=self.prompt_loader,
+            **{**self.pipeline_options, **self.spec_options.get(test_file_path, {}), **overrides},
+        )
+
+    def check_options(self, test_file_path: str, options: Dict[str, Any] = None) -> None:
+        """Raise ValueError if no pipeline can be created for the spec with these options."""
+        try:
+            self.create_pipeline(test_file_path, **(options or {}))
+        except Exception as e:
+            raise ValueError(f"Invalid pipeline options for {test_file_path}: {e}") from e
+
+    @staticmethod
+    def completed_result(pipeline: SelfHealingPipeline, start: float, healed: bool) -> SpecResult:
+        return SpecResult(
+            test_file_path=pipeline.test_file_path,
+            status=STATUS_HEALED if healed else STATUS_FAILING,
+            wall_time=time.monotonic() - start,
+            task_id=str(pipeline.run_uuid),
+            local_heals=pipeline.local_heals,
+            agent_heals=pipeline.agent_heals,
+            local_match_time=pipeline.local_match_time,
+        )
+
+    @staticmethod
+    def errored_result(
+        test_file_path: str, start: float, error: Exception, pipeline: SelfHealingPipeline = None
+    ) -> SpecResult:
+        """Result of a pipeline that raised, or of one that could not be created (pipeline is None)."""
+        timed_out = isinstance(error, PipelineTimeoutError)
+        if timed_out:
+            print(f"\n⏱️ Pipeline timed out for {test_file_path}: {error}")
+        else:
+            print(f"\n❌ Pipeline errored for {test_file_path}: {error}")
+        if pipeline is None:
+            return SpecResult(
+                test_file_path=test_file_path,
+                status=STATUS_ERRORED,
+                wall_time=time.monotonic() - start,
+                error=str(error),
+            )
+        return SpecResult(
+            test_file_path=test_file_path,
+            status=STATUS_TIMED_OUT if timed_out else STATUS_ERRORED,
+            wall_time=time.monotonic() - start,
+            task_id=str(pipeline.run_uuid),
+            error=str(error),
+            local_heals=pipeline.local_heals,
+            agent_heals=pipeline.agent_heals,
+            local_match_time=pipeline.local_match_time,
+        )
+
+    @staticmethod
+    def summarize(results: List[SpecResult]) -> Dict[str, int]:
+        """Count results per status."""
+        counts = {STATUS_HEALED: 0, STATUS_FAILING: 0, STATUS_ERRORED: 0}
+        if any(result.status == STATUS_PASSED for result in results):
+            counts[STATUS_PASSED] = 0
+        for result in results:
+            counts[result.status] = counts.get(result.status, 0) + 1
+        return counts
+
+    @staticmethod
+    def print_summary(results: List[SpecResult]) -> None:
+        counts = BatchRunner.summarize(results)
+        total_time = sum(result.wall_time for result in results)
+
+        print("\n" + "=" * 80)
+        print("Batch Summary")
+        print("=" * 80)
+        for result in results:
+            line = f"[{result.status:>13}] {result.wall_time:8.1f}s  {result.test_file_path}"
+            if result.error:
+                line += f"  ({result.error})"
+            print(line)
+        print("-" * 80)
+        print(", ".join(f"{status}: {count}" for status, count in counts.items()))
+        print(f"Total: {len(results)} specs, {total_time:.1f}s of pipeline time")
+        if any(result.local_match_time for result in results):
+            local_heals = sum(result.local_heals for result in results)
+            heals = local_heals + sum(result.agent_heals for result in results)
+            share = f" ({local_heals / heals:.0%})" if heals else ""
+            match_time = sum(result.local_match_time for result in results)
+            print(
+                f"Local selector matcher: {local_heals} of {heals} heals{share} without an agent, "
+                f"{match_time:.1f}s spent matching and validating"
+            )
+        print("=" * 80)
+
+    @staticmethod
+    def save_summary(results: List[SpecResult], output_path: Path) -> None:
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        summary = {
+            "counts": BatchRunner.summarize(results),
+            "results": [result._asdict() for result in results],
+        }
+        output_path.write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nBatch summary saved to: {output_path.absolute()}")
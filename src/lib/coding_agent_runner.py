@@ -16,6 +16,7 @@ from claude_agent_sdk import (
     UserMessage,
 )
 from self_healing.src.utils.conversation_formatter import ConversationFormatter
+from self_healing.src.utils.cypress_config import CypressConfigResolver
 from self_healing.src.utils.prompt_loader import PromptLoader
 from self_healing.src.utils.subprocess_executor import SubprocessExecutor
 
@@ -32,14 +33,24 @@ class CodingAgentRunner:
         conversation_content: str,
         prompt_loader: PromptLoader,
         model: str = "haiku",
+        task_id: str = None,
+        test_title: str = None,
+        aria_diff: str = None,
+        failure_output: str = None,
     ):
         self.test_file_path = test_file_path
+        self.task_id = task_id
+        self.test_title = test_title
         self.workspace_path = workspace_path
         self.prompt_loader = prompt_loader
         self.model = model
         self.conversation_snippet = (
             conversation_content[-15000:] if len(conversation_content) > 15000 else conversation_content
         )
+        # With a diff of the page against its last passing run, the prompt carries the diff and the
+        # Cypress errors instead of the web agent's conversation
+        self.aria_diff = aria_diff
+        self.failure_snippet = failure_output[-6000:] if failure_output else ""
         self.options = self._build_agent_options()
         self.conversation_formatter = ConversationFormatter(
             log_title="Coding Agent Conversation Log",
@@ -75,12 +86,15 @@ class CodingAgentRunner:
 
         async with ClaudeSDKClient(options=self.options) as client:
             # Initial prompt with conversation context
-            initial_prompt = self.prompt_loader.format_prompt(
-                "coding_agent",
-                prompt_key="user_prompt",
-                test_file_path=self.test_file_path,
-                conversation_content=self.conversation_snippet,
-            )
+            initial_prompt = self._build_initial_prompt()
+            config = CypressConfigResolver.shared(self.workspace_path).config()
+            if config.config_file:
+                initial_prompt += self.prompt_loader.format_prompt(
+                    "coding_agent",
+                    prompt_key="cypress_config",
+                    config_file=config.config_file,
+                    settings=config.describe(),
+                )
 
             for attempt in range(1, max_retries + 1):
                 print(f"\n{'#' * 80}")
@@ -152,7 +166,7 @@ class CodingAgentRunner:
                 print(f"\n{'=' * 80}")
                 print(f"Executing test: {self.test_file_path}")
                 print(f"{'=' * 80}")
-                test_success, test_output = cypress_executor.run(self.test_file_path)
+                test_success, test_output = await cypress_executor.run_async(self.test_file_path)
                 conversation_history[-1]["test_result"] = (test_success, test_output)
 
                 if test_success:
@@ -173,7 +187,8 @@ class CodingAgentRunner:
         # Save conversation log
         from pathlib import Path
 
-        output_path = Path(self.workspace_path) / "self_healing" / "results" / "coding_agent_conversation.md"
+        log_name = f"coding_agent_conversation_{self.task_id}.md" if self.task_id else "coding_agent_conversation.md"
+        output_path = Path(self.workspace_path) / "self_healing" / "results" / log_name
         self.conversation_formatter.save(conversation_history, output_path)
         print("\n" + "=" * 80)
         print("Coding Agent execution completed!")
@@ -181,6 +196,25 @@ class CodingAgentRunner:
 
         return conversation_history
 
+    def _build_initial_prompt(self) -> str:
+        prompt_key = "test_user_prompt" if self.test_title else "user_prompt"
+        if self.aria_diff:
+            return self.prompt_loader.format_prompt(
+                "coding_agent",
+                prompt_key=f"diff_{prompt_key}",
+                test_file_path=self.test_file_path,
+                test_title=self.test_title,
+                aria_diff=self.aria_diff,
+                failure_output=self.failure_snippet,
+            )
+        return self.prompt_loader.format_prompt(
+            "coding_agent",
+            prompt_key=prompt_key,
+            test_file_path=self.test_file_path,
+            test_title=self.test_title,
+            conversation_content=self.conversation_snippet,
+        )
+
     def _build_retry_prompt(self, attempt: int, previous_test_output: str) -> str:
         """Build a follow-up prompt for retry attempts."""
         snippet = previous_test_output[-10000:] if len(previous_test_output) > 10000 else previous_test_output
@@ -0,0 +1,266 @@
+"""
+Heal Daemon
+
+A long-lived process that accepts heal jobs over a small local JSON/HTTP API (TCP or Unix socket).
+Imports, environment loading, prompt templates and other per-process state are paid for once,
+instead of on every main.py invocation.
+
+Endpoints:
+    GET    /health          -> daemon status and job counts
+    POST   /jobs            -> submit {"test_file_path": "...", "options": {...}}; returns the job
+    GET    /jobs            -> list all jobs
+    GET    /jobs/<job_id>   -> job status and result
+    DELETE /jobs/<job_id>   -> cancel a queued or running job
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+from self_healing.src.lib.batch_runner import DEFAULT_CONCURRENCY, BatchRunner, SpecResult
+from self_healing.src.utils.prompt_loader import PromptLoader
+
+# Configuration
+# Seconds a finished or cancelled job stays queryable before it is forgotten
+JOB_RETENTION = 3600
+
+# Job statuses (finished jobs carry the SpecResult status instead)
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_CANCELLED = "cancelled"
+
+# Pipeline keyword arguments a client may set per job
+ALLOWED_JOB_OPTIONS = {
+    "resume",
+    "per_test",
+    "initial_test_output",
+    "spec_timeout",
+    "web_timeout",
+    "coding_timeout",
+    "cypress_timeout",
+    "preload_context",
+    "replay_precheck",
+    "pre_execute",
+    "record_har",
+    "har_max_age",
+    "blocking_profiles",
+    "block_cypress",
+    "compact_snapshots",
+    "aria_diff",
+    "capture_baselines",
+    "local_match",
+    "local_match_threshold",
+}
+
+_REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+
+class HealJob:
+    """A heal request tracked by the daemon."""
+
+    def __init__(self, test_file_path: str, options: Dict[str, Any]):
+        self.job_id = uuid.uuid4().hex
+        self.test_file_path = test_file_path
+        self.options = options
+        self.status = JOB_QUEUED
+        self.submitted_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.result: Optional[SpecResult] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "test_file_path": self.test_file_path,
+            "options": {key: value for key, value in self.options.items() if key != "initial_test_output"},
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "finished_at": self.finished_at,
+            "result": self.result._asdict() if self.result else None,
+        }
+
+
+class HealDaemon:
+    """
+    Runs submitted heal jobs with bounded concurrency and serves their status over HTTP.
+    """
+
+    def __init__(
+        self,
+        workspace_path: str = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        pipeline_options: Dict[str, Any] = None,
+    ):
+        self.workspace_path = workspace_path or os.getcwd()
+        # Reuses BatchRunner's pipeline construction and result bookkeeping for single jobs
+        self.runner = BatchRunner(
+            test_file_paths=[],
+            workspace_path=self.workspace_path,
+            concurrency=concurrency,
+            prompt_loader=PromptLoader(),
+            pipeline_options=pipeline_options,
+        )
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.jobs: Dict[str, HealJob] = {}
+        self.started_at = time.time()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765, socket_path: str = None):
+        """Serve the job API until cancelled."""
+        if socket_path:
+            server = await asyncio.start_unix_server(self._handle_connection, path=socket_path)
+            address = socket_path
+        else:
+            server = await asyncio.start_server(self._handle_connection, host=host, port=port)
+            address = f"http://{host}:{port}"
+
+        print("=" * 80)
+        print("Self-Healing Daemon")
+        print("=" * 80)
+        print(f"Listening: {address}")
+        print(f"Workspace: {self.workspace_path}")
+        print(f"Concurrency: {self.runner.concurrency}")
+        print("=" * 80 + "\n")
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for job in self.jobs.values():
+                if job.task and not job.task.done():
+                    job.task.cancel()
+            if socket_path and os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+    def submit(self, test_file_path: str, options: Dict[str, Any] = None) -> HealJob:
+        options = options or {}
+        if not isinstance(options, dict):
+            raise ValueError("options must be an object")
+        unknown = set(options) - ALLOWED_JOB_OPTIONS
+        if unknown:
+            raise ValueError(f"Unsupported job options: {', '.join(sorted(unknown))}")
+        self.runner.check_options(test_file_path, options)
+
+        job = HealJob(test_file_path, options)
+        self.jobs[job.job_id] = job
+        job.task = asyncio.create_task(self._run_job(job))
+        print(f"📥 Job {job.job_id} queued: {test_file_path}")
+        return job
+
+    def cancel(self, job: HealJob) -> None:
+        if job.task and not job.task.done():
+            job.task.cancel()
+            # Recorded right away, so the DELETE response already shows it
+            job.status = JOB_CANCELLED
+            job.finished_at = time.time()
+
+    async def _run_job(self, job: HealJob):
+        try:
+            async with self.semaphore:
+                job.status = JOB_RUNNING
+                start = time.monotonic()
+                pipeline = None
+                try:
+                    pipeline = self.runner.create_pipeline(job.test_file_path, **job.options)
+                    healed = await pipeline.run()
+                except Exception as e:
+                    job.result = BatchRunner.errored_result(job.test_file_path, start, e, pipeline)
+                else:
+                    job.result = BatchRunner.completed_result(pipeline, start, healed)
+                job.status = job.result.status
+        except asyncio.CancelledError:
+            job.status = JOB_CANCELLED
+            job.finished_at = job.finished_at or time.time()
+            print(f"🛑 Job {job.job_id} cancelled: {job.test_file_path}")
+            return
+        job.finished_at = time.time()
+        print(f"📤 Job {job.job_id} finished ({job.status}): {job.test_file_path}")
+
+    def _expire_jobs(self):
+        """Forget jobs that finished more than JOB_RETENTION seconds ago, so a resident daemon stays bounded."""
+        cutoff = time.time() - JOB_RETENTION
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.finished_at and job.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            method, path, body = await self._read_request(reader)
+            status, payload = self._route(method, path, body)
+        except ValueError as e:
+            status, payload = 400, {"error": str(e)}
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: close\r\n\r\n".encode("ascii")
+            + data
+        )
+        await writer.drain()
+        writer.close()
+
+    def _route(self, method: str, path: str, body: Dict[str, Any]) -> Tuple[int, Any]:
+        self._expire_jobs()
+        parts = [part for part in path.split("?")[0].split("/") if part]
+
+        if parts == ["health"] and method == "GET":
+            counts: Dict[str, int] = {}
+            for job in self.jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return 200, {"status": "ok", "uptime": time.time() - self.started_at, "jobs": counts}
+
+        if parts == ["jobs"]:
+            if method == "GET":
+                return 200, [job.to_dict() for job in self.jobs.values()]
+            if method == "POST":
+                test_file_path = body.get("test_file_path")
+                if not test_file_path:
+                    raise ValueError("test_file_path is required")
+                return 201, self.submit(test_file_path, body.get("options")).to_dict()
+            return 405, {"error": f"{method} not allowed on /jobs"}
+
+        if len(parts) == 2 and parts[0] == "jobs":
+            job = self.jobs.get(parts[1])
+            if not job:
+                return 404, {"error": f"Job not found: {parts[1]}"}
+            if method == "GET":
+                return 200, job.to_dict()
+            if method == "DELETE":
+                self.cancel(job)
+                return 200, job.to_dict()
+            return 405, {"error": f"{method} not allowed on /jobs/<job_id>"}
+
+        return 404, {"error": f"Unknown endpoint: {path}"}
+
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader) -> Tuple[str, str, Dict[str, Any]]:
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        if not request_line:
+            raise ValueError("Empty request")
+        method, path, _ = request_line.split(" ", 2)
+
+        content_length = 0
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "content-length":
+                content_length = int(value.strip())
+
+        body: Dict[str, Any] = {}
+        if content_length:
+            raw = await reader.readexactly(content_length)
+            try:
+                body = json.loads(raw.decode("utf-8"))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON body: {e}") from e
+            if not isinstance(body, dict):
+                raise ValueError("JSON body must be an object")
+        return method.upper(), path, body
@@ -0,0 +1,199 @@
+"""
+Durable Job Queue
+
+A SQLite-backed queue of heal jobs shared by a coordinator and any number of workers,
+possibly on other hosts that mount the same filesystem. Workers lease jobs for a limited
+time and renew the lease while they run; a job whose lease expires (e.g. the worker died)
+is handed to the next worker until it runs out of attempts.
+
+Note: SQLite relies on file locking, which some network filesystems implement poorly.
+Prefer a local disk or a filesystem with working POSIX locks for the queue file.
+"""
+
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+from self_healing.src.lib.batch_runner import STATUS_ERRORED, SpecResult
+
+# Configuration
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Queue states (finished jobs carry the SpecResult status in the result column)
+QUEUE_QUEUED = "queued"
+QUEUE_LEASED = "leased"
+QUEUE_DONE = "done"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    test_file_path TEXT NOT NULL,
+    options TEXT NOT NULL DEFAULT '{}',
+    state TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    lease_owner TEXT,
+    lease_expires_at REAL,
+    result TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, lease_expires_at);
+"""
+
+
+class QueuedJob(NamedTuple):
+    """A job leased from the queue."""
+
+    job_id: int
+    test_file_path: str
+    options: Dict[str, Any]
+    attempts: int
+
+
+class JobQueue:
+    """
+    Enqueue, lease, renew and complete heal jobs stored in a SQLite file.
+    Every call opens its own connection, so the queue is safe to use from threads and processes.
+    """
+
+    def __init__(self, queue_path: str, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.queue_path = Path(queue_path)
+        self.max_attempts = max_attempts
+        self.queue_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(_SCHEMA)
+
+    def enqueue(self, test_file_paths: List[str], spec_options: Dict[str, Dict[str, Any]] = None) -> List[int]:
+        """Add one job per test file and return their ids."""
+        spec_options = spec_options or {}
+        now = time.time()
+        job_ids = []
+        with self._transaction() as connection:
+            for test_file_path in test_file_paths:
+                cursor = connection.execute(
+                    "INSERT INTO jobs (test_file_path, options, max_attempts, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (test_file_path, json.dumps(spec_options.get(test_file_path, {})), self.max_attempts, now, now),
+                )
+                job_ids.append(cursor.lastrowid)
+        return job_ids
+
+    def lease(self, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Optional[QueuedJob]:
+        """
+        Atomically take the oldest available job: a queued one, or a leased one whose lease expired.
+        Expired jobs that used up their attempts are marked errored instead.
+        """
+        while True:
+            now = time.time()
+            with self._transaction() as connection:
+                row = connection.execute(
+                    "SELECT id, test_file_path, options, attempts, max_attempts FROM jobs "
+                    "WHERE state = ? OR (state = ? AND lease_expires_at < ?) ORDER BY id LIMIT 1",
+                    (QUEUE_QUEUED, QUEUE_LEASED, now),
+                ).fetchone()
+                if row is None:
+                    return None
+
+                job_id, test_file_path, options, attempts, max_attempts = row
+                if attempts >= max_attempts:
+                    result = SpecResult(
+                        test_file_path=test_file_path,
+                        status=STATUS_ERRORED,
+                        wall_time=0.0,
+                        error=f"Lease expired {attempts} times; giving up",
+                    )
+                    self._finish(connection, job_id, result, now)
+                    print(f"⚠️ Job {job_id} ({test_file_path}) exhausted its attempts")
+                    continue
+
+                connection.execute(
+                    "UPDATE jobs SET state = ?, attempts = attempts + 1, lease_owner = ?, lease_expires_at = ?, "
+                    "updated_at = ? WHERE id = ?",
+                    (QUEUE_LEASED, worker_id, now + lease_seconds, now, job_id),
+                )
+                return QueuedJob(job_id, test_file_path, json.loads(options), attempts + 1)
+
+    def renew(self, job_id: int, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        """Extend a lease. Returns False if the worker no longer owns the job."""
+        now = time.time()
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET lease_expires_at = ?, updated_at = ? WHERE id = ? AND state = ? AND lease_owner = ?",
+                (now + lease_seconds, now, job_id, QUEUE_LEASED, worker_id),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: int, worker_id: str, result: SpecResult) -> bool:
+        """Store the result of a leased job. Returns False if the lease was lost to another worker."""
+        with self._transaction() as connection:
+            owner = connection.execute(
+                "SELECT lease_owner FROM jobs WHERE id = ? AND state = ?", (job_id, QUEUE_LEASED)
+            ).fetchone()
+            if not owner or owner[0] != worker_id:
+                return False
+            self._finish(connection, job_id, result, time.time())
+            return True
+
+    def release(self, job_id: int, worker_id: str) -> None:
+        """Give a leased job back to the queue without using up an attempt (e.g. on worker shutdown)."""
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET state = ?, attempts = MAX(attempts - 1, 0), lease_owner = NULL, "
+                "lease_expires_at = NULL, updated_at = ? WHERE id = ? AND state = ? AND lease_owner = ?",
+                (QUEUE_QUEUED, time.time(), job_id, QUEUE_LEASED, worker_id),
+            )
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per queue state."""
+        with self._connect() as connection:
+            rows = connection.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        return {state: count for state, count in rows}
+
+    def results(self, job_ids: List[int] = None) -> List[SpecResult]:
+        """Results of finished jobs, optionally restricted to the given ids, in id order."""
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT id, result FROM jobs WHERE state = ? ORDER BY id", (QUEUE_DONE,)
+            ).fetchall()
+        wanted = set(job_ids) if job_ids is not None else None
+        return [SpecResult(**json.loads(result)) for job_id, result in rows if wanted is None or job_id in wanted]
+
+    def is_drained(self, job_ids: List[int] = None) -> bool:
+        """True when no queued or leased jobs remain (among the given ids, if any)."""
+        with self._connect() as connection:
+            rows = connection.execute("SELECT id FROM jobs WHERE state != ?", (QUEUE_DONE,)).fetchall()
+        if job_ids is None:
+            return not rows
+        wanted = set(job_ids)
+        return not any(job_id in wanted for (job_id,) in rows)
+
+    @staticmethod
+    def _finish(connection: sqlite3.Connection, job_id: int, result: SpecResult, now: float) -> None:
+        connection.execute(
+            "UPDATE jobs SET state = ?, result = ?, lease_owner = NULL, lease_expires_at = NULL, updated_at = ? "
+            "WHERE id = ?",
+            (QUEUE_DONE, json.dumps(result._asdict(), ensure_ascii=False), now, job_id),
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.queue_path, timeout=30, isolation_level=None)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # BEGIN IMMEDIATE takes the write lock up front so two workers cannot lease the same job
+        connection = self._connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        finally:
+            connection.close()
@@ -0,0 +1,195 @@
+"""
+MCP Compaction Proxy
+
+A stdio MCP server that sits between the web agent and its Playwright MCP server. Every
+message is passed through unchanged, except tool results, which are compacted by
+SnapshotCompactor before the agent sees them. The upstream is either a stdio server the proxy
+starts or the HTTP endpoint of a pooled server. The session's compaction totals are written to
+the stats file after every tool result, for the runner to report.
+
+Usage:
+    python -m self_healing.src.lib.mcp_compaction_proxy --stats stats.json -- node cli.js run-mcp-server
+    python -m self_healing.src.lib.mcp_compaction_proxy --stats stats.json --url http://127.0.0.1:8931/mcp
+"""
+
+import argparse
+import asyncio
+import http.client
+import json
+import sys
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+from self_healing.src.utils.snapshot_compactor import SnapshotCompactor
+
+# Configuration
+# Full ARIA snapshots of large pages easily exceed asyncio's default 64 KiB line limit
+LINE_LIMIT = 64 * 1024 * 1024
+HTTP_TIMEOUT = 600
+SHUTDOWN_TIMEOUT = 10
+
+
+class McpCompactionProxy:
+    """
+    Relays newline-delimited JSON-RPC between the agent (stdin/stdout) and the upstream server.
+    """
+
+    def __init__(self, compactor: SnapshotCompactor, stats_path: str = None):
+        self.compactor = compactor
+        self.stats_path = Path(stats_path) if stats_path else None
+        # JSON-RPC id -> tool name of tools/call requests awaiting their result
+        self.tool_calls: Dict[Any, str] = {}
+        self.session_id: Optional[str] = None
+        self.protocol_version: Optional[str] = None
+
+    async def run_stdio(self, command: List[str]):
+        """Start the upstream server and relay until the agent closes stdin."""
+        process = await asyncio.create_subprocess_exec(
+            *command, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, limit=LINE_LIMIT
+        )
+
+        async def relay_upstream():
+            while line := await process.stdout.readline():
+                self._to_client(line)
+
+        upstream = asyncio.create_task(relay_upstream())
+        async for line in self._client_lines():
+            process.stdin.write(self._from_client(line))
+            await process.stdin.drain()
+
+        process.stdin.close()
+        try:
+            await asyncio.wait_for(process.wait(), timeout=SHUTDOWN_TIMEOUT)
+        except asyncio.TimeoutError:
+            process.terminate()
+            await process.wait()
+        await upstream
+
+    async def run_http(self, url: str):
+        """Relay to a streamable HTTP endpoint until the agent closes stdin, then end the MCP session."""
+        requests: Set[asyncio.Task] = set()
+        async for line in self._client_lines():
+            line = self._from_client(line)
+            if self.session_id is None and requests:
+                # Nothing can be sent before initialize returned the session id
+                await asyncio.gather(*requests)
+            task = asyncio.create_task(self._post(url, line))
+            requests.add(task)
+            task.add_done_callback(requests.discard)
+        await asyncio.gather(*requests)
+        if self.session_id:
+            await asyncio.to_thread(self._delete_session, url)
+
+    async def _client_lines(self) -> AsyncIterator[bytes]:
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=LINE_LIMIT)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+        while line := await reader.readline():
+            yield line
+
+    def _from_client(self, line: bytes) -> bytes:
+        """Remember which tool each tools/call request calls, so its result can be compacted."""
+        try:
+            message = json.loads(line)
+        except json.JSONDecodeError:
+            return line
+        if isinstance(message, dict) and message.get("method") == "tools/call" and "id" in message:
+            self.tool_calls[message["id"]] = message.get("params", {}).get("name", "")
+        return line
+
+    def _to_client(self, line: bytes):
+        try:
+            message = json.loads(line)
+        except json.JSONDecodeError:
+            message = None
+        if isinstance(message, dict) and "result" in message:
+            if message.get("id") in self.tool_calls:
+                tool_name = self.tool_calls.pop(message["id"])
+                message["result"] = self.compactor.compact(tool_name, message["result"])
+                line = (json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8")
+                self._write_stats()
+            elif isinstance(message["result"], dict) and "protocolVersion" in message["result"]:
+                self.protocol_version = message["result"]["protocolVersion"]
+        if not line.endswith(b"\n"):
+            line += b"\n"
+        sys.stdout.buffer.write(line)
+        sys.stdout.buffer.flush()
+
+    async def _post(self, url: str, line: bytes):
+        try:
+            messages = await asyncio.to_thread(self._post_sync, url, line)
+        except (OSError, urllib.error.URLError, http.client.HTTPException, UnicodeDecodeError) as e:
+            # Answered as a JSON-RPC error, so one broken response does not end the proxy and the session
+            messages = self._error_response(line, f"Upstream MCP server failed: {e}")
+        for message in messages:
+            self._to_client(message)
+
+    def _post_sync(self, url: str, line: bytes) -> List[bytes]:
+        request = urllib.request.Request(url, data=line, headers=self._headers(), method="POST")
+        with urllib.request.urlopen(request, timeout=HTTP_TIMEOUT) as response:
+            self.session_id = response.headers.get("Mcp-Session-Id") or self.session_id
+            content_type = response.headers.get("Content-Type", "")
+            body = response.read()
+        if "text/event-stream" not in content_type:
+            return [body] if body.strip() else []
+        # The server ends the stream once it has answered the request
+        messages = []
+        for event in body.decode("utf-8").replace("\r\n", "\n").split("\n\n"):
+            data = [field[5:].lstrip() for field in event.split("\n") if field.startswith("data:")]
+            if data:
+                messages.append("\n".join(data).encode("utf-8"))
+        return messages
+
+    def _delete_session(self, url: str):
+        request = urllib.request.Request(url, headers=self._headers(), method="DELETE")
+        try:
+            urllib.request.urlopen(request, timeout=SHUTDOWN_TIMEOUT).close()
+        except (OSError, urllib.error.URLError):
+            pass
+
+    def _headers(self) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json", "Accept": "application/json, text/event-stream"}
+        if self.session_id:
+            headers["Mcp-Session-Id"] = self.session_id
+        if self.protocol_version:
+            headers["MCP-Protocol-Version"] = self.protocol_version
+        return headers
+
+    @staticmethod
+    def _error_response(line: bytes, error: str) -> List[bytes]:
+        """A JSON-RPC error for a request that could not be relayed; notifications get none."""
+        try:
+            message = json.loads(line)
+        except json.JSONDecodeError:
+            return []
+        if not isinstance(message, dict) or "id" not in message:
+            return []
+        response = {"jsonrpc": "2.0", "id": message["id"], "error": {"code": -32603, "message": error}}
+        return [json.dumps(response).encode("utf-8")]
+
+    def _write_stats(self):
+        if not self.stats_path:
+            return
+        temporary_path = self.stats_path.with_suffix(".tmp")
+        temporary_path.write_text(json.dumps(self.compactor.stats._asdict()), encoding="utf-8")
+        temporary_path.replace(self.stats_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compacting proxy in front of a Playwright MCP server")
+    parser.add_argument("--stats", type=str, help="File to write the session's compaction totals to")
+    parser.add_argument("--url", type=str, help="Streamable HTTP endpoint of a running MCP server")
+    parser.add_argument("command", nargs=argparse.REMAINDER, help="Command starting a stdio MCP server, after --")
+    args = parser.parse_args()
+    command = args.command[1:] if args.command[:1] == ["--"] else args.command
+    if bool(args.url) == bool(command):
+        parser.error("pass either --url or a server command")
+
+    proxy = McpCompactionProxy(SnapshotCompactor(), args.stats)
+    asyncio.run(proxy.run_http(args.url) if args.url else proxy.run_stdio(command))
+
+
+if __name__ == "__main__":
+    main()
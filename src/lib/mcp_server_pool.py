@@ -0,0 +1,327 @@
+"""
+MCP Server Pool
+
+Keeps Playwright MCP servers running on the vendored server's HTTP transport (--port), so
+web agent sessions lease an already started server instead of paying Node startup and
+module loading on every heal.
+
+Browser state never carries over between leases: every agent session opens its own MCP
+session, and in --isolated mode the server creates a fresh browser context per session
+and disposes it when the session closes. Servers are additionally recycled after a number
+of leases, and health-checked on lease and return.
+
+With `sessions_per_server` above one (or unlimited), several sessions use the same server
+at once. The isolated server launches one browser and gives each session its own context
+in it, so a concurrent spec costs a browser context instead of a whole browser.
+
+Server arguments such as --storage-state differ between sessions, and each set of arguments
+gets its own pool. The shared pools of a process draw on one server budget: a pool that needs
+a server while the budget is used up stops an idle server of another pool, or waits.
+"""
+
+import asyncio
+import os
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Dict, List, Optional, Sequence, Tuple
+
+# Configuration
+DEFAULT_POOL_SIZE = 2
+DEFAULT_MAX_LEASES = 20
+STARTUP_TIMEOUT = 60
+HEALTH_CHECK_TIMEOUT = 5
+
+_LISTENING_PATTERN = re.compile(r"Listening on (\S+)")
+
+
+class McpServer:
+    """A running Playwright MCP server process and its HTTP endpoint."""
+
+    def __init__(self, process: asyncio.subprocess.Process, base_url: str):
+        self.process = process
+        self.base_url = base_url
+        self.url = f"{base_url}/mcp"
+        self.leases = 0
+        self.active = 0
+        # Set once the server reached its lease limit; it stops when its last session ends
+        self.retiring = False
+        self._stderr_task: Optional[asyncio.Task] = None
+
+    async def is_healthy(self) -> bool:
+        """The process is alive and its HTTP endpoint answers."""
+        if self.process.returncode is not None:
+            return False
+        host_port = self.base_url.split("://", 1)[1].split("/", 1)[0]
+        host, _, port = host_port.rpartition(":")
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(host.strip("[]"), int(port)), timeout=HEALTH_CHECK_TIMEOUT
+            )
+            # Any HTTP response will do; a GET without an MCP session is answered with 400
+            writer.write(f"GET /mcp HTTP/1.1\r\nHost: {host_port}\r\nConnection: close\r\n\r\n".encode("ascii"))
+            await writer.drain()
+            status_line = await asyncio.wait_for(reader.readline(), timeout=HEALTH_CHECK_TIMEOUT)
+            writer.close()
+        except (OSError, asyncio.TimeoutError, ValueError):
+            return False
+        return status_line.startswith(b"HTTP/")
+
+    async def stop(self):
+        if self.process.returncode is None:
+            # SIGTERM lets the server's exit watchdog close its browsers
+            self.process.terminate()
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout=10)
+            except asyncio.TimeoutError:
+                self.process.kill()
+                await self.process.wait()
+        if self._stderr_task:
+            self._stderr_task.cancel()
+
+
+class McpServerPool:
+    """
+    A bounded pool of warm Playwright MCP servers. `size` servers are started up front,
+    up to `max_size` exist at once, each serves up to `sessions_per_server` sessions at a
+    time (None for no limit) and is replaced after `max_leases` sessions.
+    """
+
+    _shared: Dict[Tuple, "McpServerPool"] = {}
+    # Servers all shared pools of the process may run at once (None: no budget), and the number running
+    _server_budget: Optional[int] = None
+    _live_servers = 0
+    # Notified whenever a server is returned or stopped, in any pool
+    _budget_changed: Optional[asyncio.Condition] = None
+
+    def __init__(
+        self,
+        workspace_path: str = None,
+        size: int = DEFAULT_POOL_SIZE,
+        max_size: int = None,
+        server_args: Sequence[str] = (),
+        max_leases: int = DEFAULT_MAX_LEASES,
+        sessions_per_server: Optional[int] = 1,
+    ):
+        if size < 1:
+            raise ValueError(f"size must be at least 1, got {size}")
+        self.workspace_path = workspace_path or os.getcwd()
+        self.size = size
+        self.max_size = max(max_size or size, size)
+        self.server_args = list(server_args)
+        self.max_leases = max_leases
+        self.sessions_per_server = sessions_per_server
+        self.cli_path = os.path.join(self.workspace_path, "self_healing/playwright/packages/playwright/cli.js")
+        self._servers: List[McpServer] = []
+        self._starting = 0
+        self._started = False
+        self._start_lock = asyncio.Lock()
+        self._changed = asyncio.Condition()
+        self.budgeted = False
+        # Stats for the summary printed on close
+        self._servers_started = 0
+        self._lease_count = 0
+        self._lease_wait = 0.0
+
+    @classmethod
+    def shared(
+        cls,
+        workspace_path: str,
+        size: int = DEFAULT_POOL_SIZE,
+        server_args: Sequence[str] = (),
+        sessions_per_server: Optional[int] = 1,
+    ) -> "McpServerPool":
+        """
+        Return the process-wide pool for these settings, creating it on first use. All shared pools
+        together run at most `size` servers.
+        """
+        key = (workspace_path, size, tuple(server_args), sessions_per_server)
+        if key not in cls._shared:
+            pool = cls(workspace_path, size=size, server_args=server_args, sessions_per_server=sessions_per_server)
+            if cls._budget_changed is None:
+                cls._budget_changed = asyncio.Condition()
+            pool._changed = cls._budget_changed
+            pool.budgeted = True
+            cls._server_budget = max(cls._server_budget or 0, size)
+            cls._shared[key] = pool
+        return cls._shared[key]
+
+    @classmethod
+    async def close_all(cls):
+        """Stop every pool created through shared()."""
+        pools = list(cls._shared.values())
+        cls._shared.clear()
+        for pool in pools:
+            await pool.close()
+        cls._server_budget = None
+        cls._budget_changed = None
+
+    def command(self) -> List[str]:
+        return ["node", self.cli_path, "run-mcp-server", "--isolated", "--host", "127.0.0.1", "--port", "0"] + (
+            self.server_args
+        )
+
+    async def start(self):
+        """Start the initial servers concurrently."""
+        async with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+            # Other pools may hold part of the budget; leases get the rest as it frees up
+            spawns = []
+            while len(spawns) < self.size and self._can_spawn():
+                spawns.append(self._spawn())
+            if spawns:
+                print(f"🔌 Starting {len(spawns)} Playwright MCP servers")
+                await asyncio.gather(*spawns)
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[str]:
+        """Lease a healthy server for one agent session and yield its MCP URL."""
+        await self.start()
+        start = time.monotonic()
+        server = await self._acquire()
+        wait = time.monotonic() - start
+        self._lease_count += 1
+        self._lease_wait += wait
+        print(f"🔌 Leased MCP server {server.base_url} in {wait:.2f}s ({server.active} active sessions)")
+        try:
+            yield server.url
+        finally:
+            await self._release(server)
+
+    async def close(self):
+        servers, self._servers = self._servers, []
+        McpServerPool._live_servers -= len(servers)
+        await asyncio.gather(*(server.stop() for server in servers))
+        if self._lease_count:
+            print(
+                f"🔌 MCP server pool closed: {self._lease_count} leases, {self._servers_started} servers started, "
+                f"{self._lease_wait / self._lease_count:.2f}s average lease wait"
+            )
+
+    def _has_capacity(self, server: McpServer) -> bool:
+        return not server.retiring and (self.sessions_per_server is None or server.active < self.sessions_per_server)
+
+    def _can_spawn(self) -> bool:
+        if self.budgeted and McpServerPool._live_servers >= self._server_budget:
+            return False
+        return len(self._servers) + self._starting < self.max_size
+
+    async def _evict_idle_server(self) -> bool:
+        """Stop an idle server of another shared pool to free budget for this one."""
+        if not self.budgeted or len(self._servers) + self._starting >= self.max_size:
+            return False
+        for pool in list(McpServerPool._shared.values()):
+            if pool is self:
+                continue
+            idle = next((server for server in pool._servers if server.active == 0), None)
+            if idle:
+                print(f"🔌 Stopping idle MCP server {idle.base_url} of another pool to stay within the server budget")
+                await pool._discard(idle)
+                return True
+        return False
+
+    async def _acquire(self) -> McpServer:
+        while True:
+            candidates = [server for server in self._servers if self._has_capacity(server)]
+            if candidates:
+                # Least loaded first, so sessions spread over the warm servers
+                server = min(candidates, key=lambda candidate: candidate.active)
+                server.active += 1
+                if await server.is_healthy():
+                    return server
+                print(f"⚠️ MCP server {server.base_url} failed its health check, replacing it")
+                server.active -= 1
+                await self._discard(server)
+                continue
+
+            if self._can_spawn():
+                server = await self._spawn()
+                server.active += 1
+                return server
+            if await self._evict_idle_server():
+                continue
+
+            async with self._changed:
+                await self._changed.wait()
+
+    async def _release(self, server: McpServer):
+        server.active -= 1
+        server.leases += 1
+        if server.leases >= self.max_leases:
+            server.retiring = True
+        if server.active == 0 and (server.retiring or not await server.is_healthy()):
+            await self._discard(server)
+            # Keep the pool warm: replace the server before the next lease needs it
+            if len(self._servers) + self._starting < self.size and self._can_spawn():
+                try:
+                    await self._spawn()
+                except Exception as e:
+                    print(f"⚠️ Could not replace MCP server: {e}")
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def _discard(self, server: McpServer):
+        if server in self._servers:
+            self._servers.remove(server)
+            McpServerPool._live_servers -= 1
+        await server.stop()
+        # Waiting leases may now start a server of their own
+        async with self._changed:
+            self._changed.notify_all()
+
+    def _spawn(self) -> Awaitable[McpServer]:
+        # Counted before the server starts, so concurrent spawns cannot overrun the size or the budget
+        self._starting += 1
+        McpServerPool._live_servers += 1
+        return self._start_server()
+
+    async def _start_server(self) -> McpServer:
+        started = False
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *self.command(),
+                cwd=self.workspace_path,
+                # The server's exit watchdog stops it once this pipe closes, even if we crash
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            try:
+                base_url = await asyncio.wait_for(self._read_url(process), timeout=STARTUP_TIMEOUT)
+            except BaseException:
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+                raise
+            started = True
+        finally:
+            self._starting -= 1
+            if not started:
+                McpServerPool._live_servers -= 1
+
+        server = McpServer(process, base_url)
+        # Keep draining stderr so the server never blocks on a full pipe
+        server._stderr_task = asyncio.create_task(self._drain(process.stderr))
+        self._servers.append(server)
+        self._servers_started += 1
+        return server
+
+    @staticmethod
+    async def _read_url(process: asyncio.subprocess.Process) -> str:
+        output = []
+        while True:
+            line = await process.stderr.readline()
+            if not line:
+                raise RuntimeError(f"Playwright MCP server exited during startup:\n{''.join(output)}")
+            text = line.decode("utf-8", errors="replace")
+            output.append(text)
+            match = _LISTENING_PATTERN.search(text)
+            if match:
+                return match.group(1).rstrip("/")
+
+    @staticmethod
+    async def _drain(stream: asyncio.StreamReader):
+        while await stream.readline():
+            pass
@@ -0,0 +1,161 @@
+"""
+Prefix State Runner
+
+Executes setup steps shared by several specs once per batch and snapshots the resulting
+browser state: the storage state file (cookies, localStorage) plus the page URL. Each
+spec's web agent then starts from that snapshot (--storage-state) and navigates to the URL
+instead of repeating the steps. In-memory page state and sessionStorage are not carried over.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from self_healing.src.lib.self_healing_pipeline import SelfHealingPipeline
+from self_healing.src.lib.web_agent_runner import WebAgentRunner
+from self_healing.src.utils.blocking_profiles import BlockingProfiles
+from self_healing.src.utils.prompt_loader import PromptLoader
+from self_healing.src.utils.step_prefix import (
+    DEFAULT_MIN_SPECS,
+    DEFAULT_MIN_STEPS,
+    PrefixGroup,
+    shared_prefixes,
+    spec_steps,
+)
+
+# The prefix session stores the page URL under this localStorage key before saving the state
+URL_STORAGE_KEY = "__self_healing_prefix_url__"
+
+
+class PrefixStateRunner:
+    """
+    Finds shared step prefixes in a batch, runs each once with a web agent and returns
+    per-spec pipeline options pointing at the saved state.
+    """
+
+    def __init__(
+        self,
+        workspace_path: str = None,
+        concurrency: int = 4,
+        prompt_loader: PromptLoader = None,
+        min_specs: int = DEFAULT_MIN_SPECS,
+        min_steps: int = DEFAULT_MIN_STEPS,
+        pipeline_options: Dict[str, Any] = None,
+    ):
+        self.workspace_path = workspace_path or os.getcwd()
+        self.concurrency = concurrency
+        self.prompt_loader = prompt_loader or PromptLoader()
+        self.min_specs = min_specs
+        self.min_steps = min_steps
+        # Options of the batch's pipelines, so prefix sessions get the web stage budget and MCP servers of specs
+        self.pipeline_options = pipeline_options or {}
+        self.prefix_dir = Path(self.workspace_path) / "self_healing" / "results" / "prefixes"
+
+    async def run(self, test_file_paths: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Return {test_file_path: {"prefix_state": {...}}} for every spec that can start from a shared prefix."""
+        groups = shared_prefixes(spec_steps(self.workspace_path, test_file_paths), self.min_specs, self.min_steps)
+        if not groups:
+            print("No setup steps shared by several specs, skipping prefix execution")
+            return {}
+
+        print("=" * 80)
+        print("Shared Step Prefixes")
+        print("=" * 80)
+        for group in groups:
+            print(f"{len(group.steps)} steps shared by {len(group.test_file_paths)} specs:")
+            for test_file_path in group.test_file_paths:
+                print(f"  - {test_file_path}")
+        print("=" * 80 + "\n")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        states = await asyncio.gather(*(self._run_prefix(group, semaphore) for group in groups))
+
+        spec_options = {}
+        for group, state in zip(groups, states):
+            if state:
+                for test_file_path in group.test_file_paths:
+                    spec_options[test_file_path] = {"prefix_state": state}
+        saved = len(spec_options) - sum(1 for state in states if state)
+        print(f"\nPrefix states ready for {len(spec_options)} specs ({saved} prefix executions saved)")
+        return spec_options
+
+    async def _run_prefix(self, group: PrefixGroup, semaphore: asyncio.Semaphore) -> Optional[Dict[str, Any]]:
+        prefix_id = hashlib.sha256("\n".join(group.steps).encode("utf-8")).hexdigest()[:16]
+        storage_state_path = (self.prefix_dir / f"prefix_{prefix_id}.json").absolute()
+        storage_state_path.parent.mkdir(parents=True, exist_ok=True)
+        storage_state_path.unlink(missing_ok=True)
+        steps = "\n".join(group.steps)
+        conversation_path = (self.prefix_dir / f"conversation_prefix_{prefix_id}.md").absolute()
+
+        # The prefix runs as the first spec of its group would: same web stage deadline, blocked hosts,
+        # MCP pool and recorded traffic (replayed only, the HAR belongs to the spec)
+        pipeline = SelfHealingPipeline(
+            group.test_file_paths[0], self.workspace_path, self.prompt_loader, **self.pipeline_options
+        )
+        har_path = pipeline.har_store.valid_har(group.test_file_paths[0]) if pipeline.har_store else None
+        blocking_args = BlockingProfiles.server_args(pipeline.block_hosts)
+        mcp_pool = None if har_path else pipeline.mcp_pool(blocking_args)
+        memory_sampler = pipeline.memory_sampler()
+
+        async with semaphore:
+            start = time.monotonic()
+            try:
+                async with pipeline.deadline("web", pipeline.web_timeout):
+                    async with mcp_pool.lease() if mcp_pool else nullcontext() as mcp_server_url:
+                        runner = WebAgentRunner(
+                            test_file_path=group.test_file_paths[0],
+                            workspace_path=self.workspace_path,
+                            conversation_path=conversation_path,
+                            prompt_loader=self.prompt_loader,
+                            mcp_server_url=mcp_server_url,
+                            user_prompt=self.prompt_loader.format_prompt(
+                                "web_agent",
+                                prompt_key="prefix_user_prompt",
+                                steps=steps,
+                                url_key=URL_STORAGE_KEY,
+                                storage_state_path=storage_state_path,
+                            ),
+                            capture_storage_state_path=str(storage_state_path),
+                            server_args=(pipeline.har_store.replay_args(har_path) if har_path else []) + blocking_args,
+                            compact_snapshots=pipeline.compact_snapshots,
+                        )
+                        with memory_sampler.session() if memory_sampler else nullcontext():
+                            await runner.run()
+            except Exception as e:
+                print(f"⚠️ Prefix {prefix_id} failed, its specs run from scratch: {e}")
+                return None
+
+        url = self._pop_url(storage_state_path)
+        if not url:
+            print(f"⚠️ Prefix {prefix_id} did not save its browser state, its specs run from scratch")
+            return None
+        print(f"✅ Prefix {prefix_id} executed in {time.monotonic() - start:.1f}s, state at {url}")
+        return {
+            "storage_state_path": str(storage_state_path),
+            "url": url,
+            "steps": list(group.steps),
+            "conversation_path": str(conversation_path),
+        }
+
+    @staticmethod
+    def _pop_url(storage_state_path: Path) -> Optional[str]:
+        """Read the URL recorded by the prefix session and remove it from the saved localStorage."""
+        try:
+            state = json.loads(storage_state_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return None
+
+        url = None
+        for origin in state.get("origins", []):
+            entries = origin.get("localStorage", [])
+            for entry in entries:
+                if entry.get("name") == URL_STORAGE_KEY:
+                    url = entry.get("value")
+            origin["localStorage"] = [entry for entry in entries if entry.get("name") != URL_STORAGE_KEY]
+        storage_state_path.write_text(json.dumps(state, indent=2), encoding="utf-8")
+        return url
@@ -0,0 +1,136 @@
+"""
+Queue Worker
+
+Leases heal jobs from a shared JobQueue, runs SelfHealingPipeline for each and reports
+the result back. Leases are renewed while a pipeline runs, so a worker that dies simply
+stops renewing and its job is picked up by another worker once the lease expires. A worker
+that fails to renew a lease stops the job's pipeline, so no two workers heal a spec at once.
+"""
+
+import asyncio
+import os
+import socket
+import time
+import uuid
+from typing import Any, Dict
+
+from self_healing.src.lib.batch_runner import DEFAULT_CONCURRENCY, BatchRunner, SpecResult
+from self_healing.src.lib.job_queue import DEFAULT_LEASE_SECONDS, JobQueue, QueuedJob
+from self_healing.src.utils.prompt_loader import PromptLoader
+
+# Configuration
+DEFAULT_POLL_INTERVAL = 5
+
+
+class QueueWorker:
+    """
+    Runs up to `concurrency` leased jobs at a time until the queue is drained
+    (or forever, when `keep_polling` is set).
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        workspace_path: str = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        pipeline_options: Dict[str, Any] = None,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        keep_polling: bool = False,
+    ):
+        self.queue = queue
+        self.workspace_path = workspace_path or os.getcwd()
+        # Reuses BatchRunner's pipeline construction and result bookkeeping for single jobs
+        self.runner = BatchRunner(
+            test_file_paths=[],
+            workspace_path=self.workspace_path,
+            concurrency=concurrency,
+            prompt_loader=PromptLoader(),
+            pipeline_options=pipeline_options,
+        )
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.keep_polling = keep_polling
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    async def run(self) -> int:
+        """Process jobs and return how many this worker completed."""
+        print("=" * 80)
+        print("Self-Healing Queue Worker")
+        print("=" * 80)
+        print(f"Worker: {self.worker_id}")
+        print(f"Queue: {self.queue.queue_path}")
+        print(f"Workspace: {self.workspace_path}")
+        print(f"Concurrency: {self.runner.concurrency}")
+        print(f"Lease: {self.lease_seconds}s")
+        print("=" * 80 + "\n")
+
+        running: set = set()
+        completed = 0
+        while True:
+            while len(running) < self.runner.concurrency:
+                job = await asyncio.to_thread(self.queue.lease, self.worker_id, self.lease_seconds)
+                if job is None:
+                    break
+                running.add(asyncio.create_task(self._run_job(job)))
+
+            if not running:
+                # Jobs leased by other (possibly dead) workers may still come back once their lease expires
+                drained = await asyncio.to_thread(self.queue.is_drained)
+                if drained and not self.keep_polling:
+                    break
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            done, running = await asyncio.wait(running, timeout=self.poll_interval, return_when=asyncio.FIRST_COMPLETED)
+            completed += sum(1 for task in done if task.result())
+
+        print(f"\nWorker {self.worker_id} finished: {completed} jobs completed")
+        return completed
+
+    async def _run_job(self, job: QueuedJob) -> bool:
+        print(f"📥 Job {job.job_id} leased (attempt {job.attempts}): {job.test_file_path}")
+        heal = asyncio.create_task(self._heal(job))
+        heartbeat = asyncio.create_task(self._heartbeat(job, heal))
+        try:
+            result = await heal
+        except asyncio.CancelledError:
+            heartbeat.cancel()
+            if asyncio.current_task().cancelling():
+                await asyncio.to_thread(self.queue.release, job.job_id, self.worker_id)
+                raise
+            # The heartbeat lost the lease and stopped the pipeline, the job belongs to another worker now
+            print(f"⚠️ Job {job.job_id} lease was lost, pipeline stopped: {job.test_file_path}")
+            return False
+        finally:
+            heartbeat.cancel()
+
+        return await self._report(job, result)
+
+    async def _heal(self, job: QueuedJob) -> SpecResult:
+        start = time.monotonic()
+        pipeline = None
+        try:
+            pipeline = self.runner.create_pipeline(job.test_file_path, **job.options)
+            healed = await pipeline.run()
+        except Exception as e:
+            return BatchRunner.errored_result(job.test_file_path, start, e, pipeline)
+        return BatchRunner.completed_result(pipeline, start, healed)
+
+    async def _report(self, job: QueuedJob, result: SpecResult) -> bool:
+        stored = await asyncio.to_thread(self.queue.complete, job.job_id, self.worker_id, result)
+        if stored:
+            print(f"📤 Job {job.job_id} finished ({result.status}): {job.test_file_path}")
+        else:
+            print(f"⚠️ Job {job.job_id} lease was lost, result discarded: {job.test_file_path}")
+        return stored
+
+    async def _heartbeat(self, job: QueuedJob, heal: asyncio.Task):
+        """Renew the job's lease while its pipeline runs; stop the pipeline once the lease is lost."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            renewed = await asyncio.to_thread(self.queue.renew, job.job_id, self.worker_id, self.lease_seconds)
+            if not renewed:
+                print(f"⚠️ Job {job.job_id} lease could not be renewed, stopping it: {job.test_file_path}")
+                heal.cancel()
+                return
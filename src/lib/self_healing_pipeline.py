@@ -0,0 +1,734 @@
+"""
+Self-Healing Pipeline
+
+Runs the two-stage self-healing flow for a single test file:
+1. Web Agent - Executes test with Playwright MCP tools to generate conversation logs
+2. Coding Agent - Fixes the test based on conversation logs with retry logic
+"""
+
+import asyncio
+import os
+import shutil
+import time
+import uuid
+from collections import Counter
+from contextlib import asynccontextmanager, nullcontext
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from self_healing.src.agents.coding_agent import CodingAgent
+from self_healing.src.agents.web_agent import WebAgent
+from self_healing.src.lib.mcp_server_pool import McpServerPool
+from self_healing.src.utils.aria_diff import AriaDiff, load_baseline
+from self_healing.src.utils.aria_tree import AriaTree, extract_cypress_snapshot, strip_cypress_snapshots
+from self_healing.src.utils.baseline_store import BaselineStore
+from self_healing.src.utils.blocking_profiles import BlockingProbe, BlockingProfiles
+from self_healing.src.utils.context_bundle import ContextBundle
+from self_healing.src.utils.cypress_config import CypressConfigResolver
+from self_healing.src.utils.cypress_transpiler import CypressTranspiler, PreExecution
+from self_healing.src.utils.har_store import DEFAULT_MAX_AGE as DEFAULT_HAR_MAX_AGE
+from self_healing.src.utils.har_store import HarStore
+from self_healing.src.utils.playwright_replay import FlowStore, PlaywrightReplayer
+from self_healing.src.utils.process_memory import McpMemorySampler
+from self_healing.src.utils.prompt_loader import PromptLoader
+from self_healing.src.utils.selector_matcher import DEFAULT_CONFIDENCE, LocalMatchRecord, NoMatch, SelectorMatcher
+from self_healing.src.utils.spec_splitter import SpecSplitter, SpecTest
+from self_healing.src.utils.stage_cache import STAGE_CODING, STAGE_WEB, StageCache
+from self_healing.src.utils.storage_state import DEFAULT_MAX_AGE, StorageStateStore
+from self_healing.src.utils.subprocess_executor import DEFAULT_TIMEOUT, SingleTestExecutor, SubprocessExecutor
+
+# Configuration
+DEFAULT_TEST_CONCURRENCY = 3
+
+
+class PipelineTimeoutError(TimeoutError):
+    """Raised when a stage runs past its own budget or the spec's overall deadline."""
+
+    def __init__(self, stage: str, budget: float):
+        super().__init__(f"{stage} budget of {budget:g}s exceeded")
+        self.stage = stage
+        self.budget = budget
+
+
+class SelfHealingPipeline:
+    """
+    Main orchestrator for the self-healing test pipeline.
+    Coordinates Web Agent and Coding Agent execution.
+    """
+
+    def __init__(
+        self,
+        test_file_path: str,
+        workspace_path: str = None,
+        prompt_loader: PromptLoader = None,
+        initial_test_output: str = None,
+        resume: bool = False,
+        per_test: bool = False,
+        test_concurrency: int = DEFAULT_TEST_CONCURRENCY,
+        spec_timeout: float = None,
+        web_timeout: float = None,
+        coding_timeout: float = None,
+        cypress_timeout: float = DEFAULT_TIMEOUT,
+        mcp_pool_size: int = None,
+        shared_browser: bool = False,
+        measure_memory: bool = False,
+        reuse_login: bool = False,
+        login_max_age: float = DEFAULT_MAX_AGE,
+        prefix_state: Dict[str, Any] = None,
+        preload_context: bool = False,
+        replay_precheck: bool = False,
+        pre_execute: bool = False,
+        record_har: bool = False,
+        har_max_age: float = DEFAULT_HAR_MAX_AGE,
+        blocking_profiles: List[str] = None,
+        block_cypress: bool = False,
+        compact_snapshots: bool = False,
+        aria_diff: bool = False,
+        capture_baselines: bool = False,
+        local_match: bool = False,
+        local_match_threshold: float = DEFAULT_CONFIDENCE,
+    ):
+        self.test_file_path = test_file_path
+        self.workspace_path = workspace_path or os.getcwd()
+        self.prompt_loader = prompt_loader or PromptLoader()
+        # Failure output of a triage run, given to the web agent as extra context
+        self.initial_test_output = initial_test_output
+        self.run_uuid = uuid.uuid4()
+        # With resume enabled the run id becomes a content key and finished stages are skipped
+        self.stage_cache = StageCache(self.workspace_path) if resume else None
+        self.web_stage_completed = False
+        # Heal failing it() blocks individually instead of the whole spec
+        self.per_test = per_test
+        self.test_concurrency = test_concurrency
+        # Wall-clock budgets in seconds; the spec deadline starts with the first stage
+        self.spec_timeout = spec_timeout
+        self.web_timeout = web_timeout
+        self.coding_timeout = coding_timeout
+        self.cypress_timeout = cypress_timeout
+        self.spec_deadline: Optional[float] = None
+        # Web agents lease warm MCP servers from the process-wide pool instead of starting their own
+        self.mcp_pool_size = mcp_pool_size
+        # All web agents of this process share one server, i.e. one browser with a context per session
+        self.shared_browser = shared_browser
+        self.measure_memory = measure_memory
+        # Start web agents from a login session captured once per environment
+        self.storage_state_store = StorageStateStore.shared(self.workspace_path, login_max_age) if reuse_login else None
+        # Browser state after setup steps this spec shares with others in the batch
+        self.prefix_state = prefix_state
+        # Give web agents the spec, its imports and the Cypress config up front instead of letting them look it up
+        self.preload_context = preload_context
+        # Replay the browser steps of the spec's previous web agent session before starting a new one
+        self.replay_precheck = replay_precheck
+        # Let web agents run the spec's translatable leading steps in one call before exploring
+        self.pre_execute = pre_execute
+        # Record the spec's traffic in its first web agent session and serve it to later ones
+        self.har_store = HarStore.shared(self.workspace_path, har_max_age) if record_har else None
+        # Third-party hosts web agents, and optionally Cypress validation runs, do not load
+        self.block_hosts = BlockingProfiles(self.workspace_path).hosts(blocking_profiles) if blocking_profiles else []
+        self.cypress_block_hosts = BlockingProfiles.cypress_block_hosts(self.block_hosts) if block_cypress else None
+        self.blocking_reported = False
+        # Pass the MCP server's tool results through McpCompactionProxy before the agent sees them
+        self.compact_snapshots = compact_snapshots
+        # Give the coding agent the ARIA diff against the last passing run instead of a web agent conversation
+        self.aria_diff = aria_diff
+        # (rendered diff, failure output without snapshots) once the web stage was skipped for it
+        self.page_diff: Optional[Tuple[str, str]] = None
+        # Store the ARIA snapshots of passing tests in Cypress runs, as baselines for the diff
+        self.capture_baselines = capture_baselines
+        # Try SelectorMatcher's proposal for a failed lookup, validated by one Cypress run, before any agent
+        self.local_match = local_match
+        self.local_match_threshold = local_match_threshold
+        self.locally_healed = False
+        # Heals of the spec or its tests, by the local matcher and by coding agents, for the batch summary
+        self.local_heals = 0
+        self.agent_heals = 0
+        self.local_match_time = 0.0
+
+    async def run(self) -> bool:
+        """Execute the complete self-healing pipeline and return whether the test passes afterwards."""
+        print("=" * 80)
+        print("Self-Healing Test Pipeline")
+        print("=" * 80)
+        print(f"Test File: {self.test_file_path}")
+        print(f"Workspace: {self.workspace_path}")
+        print("=" * 80 + "\n")
+
+        if self.per_test:
+            return await self.run_per_test()
+
+        recorded = self.resume()
+        if recorded is not None:
+            return recorded
+
+        await self.run_web_stage()
+        return await self.run_coding_stage()
+
+    async def run_per_test(self) -> bool:
+        """
+        Heal only the failing tests of the spec. Web agents explore failing tests concurrently;
+        coding agents take turns because they edit the same file, and each validates with a
+        single-test run.
+        """
+        test_output = self.initial_test_output
+        if test_output is None:
+            print("Running spec to find failing tests\n")
+            async with self.deadline("spec"):
+                success, test_output = await self.cypress_executor().run_async(self.test_file_path)
+            if success:
+                print(f"✅ {self.test_file_path} already passes, nothing to heal.")
+                return True
+
+        splitter = SpecSplitter.from_file(Path(self.workspace_path) / self.test_file_path)
+        failing_tests = splitter.failing_tests(test_output)
+        if not failing_tests:
+            print("⚠️ Could not map the failure to individual tests, healing the whole spec\n")
+            await self.run_web_stage()
+            return await self.run_coding_stage()
+        # Single-test runs and agents find a test by its title, which must not pick another test
+        titles = Counter(test.title for test in splitter.tests())
+        ambiguous = sorted({test.title for test in failing_tests if titles[test.title] > 1})
+        if ambiguous:
+            print(f"⚠️ Several tests are titled {', '.join(map(repr, ambiguous))}, healing the whole spec\n")
+            await self.run_web_stage()
+            return await self.run_coding_stage()
+
+        print(f"Healing {len(failing_tests)} of {len(splitter.tests())} tests individually:")
+        for test in failing_tests:
+            print(f"  - {test.full_title} (line {test.line})")
+        print()
+
+        semaphore = asyncio.Semaphore(self.test_concurrency)
+        coding_lock = asyncio.Lock()
+        # With one failing test the spec's output is that test's; otherwise each test is run on its own for a diff
+        single_output = test_output if len(failing_tests) == 1 else None
+        # A task group cancels the other tests' agents as soon as one test fails, e.g. past the spec deadline
+        try:
+            async with asyncio.TaskGroup() as group:
+                heals = [
+                    group.create_task(self._heal_test(test, index, semaphore, coding_lock, single_output))
+                    for index, test in enumerate(failing_tests, 1)
+                ]
+                group.create_task(self.report_blocking())
+        except BaseExceptionGroup as errors:
+            # Callers expect the error itself, e.g. PipelineTimeoutError
+            raise errors.exceptions[0] from None
+        results = [heal.result() for heal in heals]
+        healed = all(results)
+        print(f"\n{sum(results)} of {len(results)} failing tests healed in {self.test_file_path}")
+        return healed
+
+    async def _heal_test(
+        self,
+        test: SpecTest,
+        index: int,
+        semaphore: asyncio.Semaphore,
+        coding_lock: asyncio.Lock,
+        test_output: str = None,
+    ) -> bool:
+        task_id = f"{self.run_uuid}_{index}"
+        async with semaphore:
+            if self.local_match:
+                healed, test_output = await self.heal_locally(test_output, test, coding_lock)
+                if healed:
+                    print(f"\n✅ Test '{test.title}' healed by the local selector matcher")
+                    return True
+            page_diff = await self.aria_page_diff(test_output, test) if self.aria_diff else None
+            if page_diff:
+                print(
+                    f"⏭️  STAGE 1 SKIPPED for '{test.title}': healing from the ARIA diff against the last passing run\n"
+                )
+            else:
+                print(f"STAGE 1: Web Agent - Executing test '{test.title}' with Playwright\n")
+                await self.run_web_agent(task_id, test_title=test.title)
+
+        # Coding agents edit the same spec file, so only one runs at a time
+        async with coding_lock:
+            print(f"STAGE 2: Coding Agent - Fixing test '{test.title}'")
+            coding_agent = CodingAgent(
+                test_file_path=self.test_file_path,
+                task_id=task_id,
+                prompt_loader=self.prompt_loader,
+                workspace_path=self.workspace_path,
+                cypress_executor=self.cypress_executor(test.title),
+                test_title=test.title,
+                aria_diff=page_diff[0] if page_diff else None,
+                failure_output=page_diff[1] if page_diff else None,
+            )
+            async with self.deadline("coding", self.coding_timeout):
+                healed = await coding_agent.run()
+            self.agent_heals += healed
+
+        icon = "✅" if healed else "❌"
+        print(f"\n{icon} Test '{test.title}' {'healed' if healed else 'still failing'}")
+        return healed
+
+    async def run_web_agent(self, run_uuid, **kwargs):
+        """
+        Run one web agent session within the web stage budget, reusing or capturing the login session
+        and the spec's recorded traffic.
+        """
+        storage_state_path = capture_storage_state_path = prefix_state = None
+        if self.prefix_state and "test_title" not in kwargs:
+            # The prefix was taken from the spec's first test, so it only applies to whole-spec sessions
+            prefix_state = self.prefix_state
+            storage_state_path = prefix_state["storage_state_path"]
+        elif self.storage_state_store:
+            storage_state_path = self.storage_state_store.valid_state()
+            if storage_state_path is None:
+                capture_storage_state_path = self.storage_state_store.begin_capture()
+
+        # HAR files are per spec, so those sessions get their own server instead of a pooled one
+        har_args, har_recording = [], False
+        if self.har_store:
+            har_path = self.har_store.valid_har(self.test_file_path)
+            if har_path:
+                print(f"🗂️ Serving recorded traffic from {har_path}")
+                har_args = self.har_store.replay_args(har_path)
+            else:
+                har_path = self.har_store.begin_record(self.test_file_path)
+                if har_path:
+                    har_args, har_recording = self.har_store.record_args(har_path), True
+
+        blocking_args = BlockingProfiles.server_args(self.block_hosts)
+        server_args = ["--storage-state", str(storage_state_path)] if storage_state_path else []
+        web_agent = WebAgent(
+            test_file_path=self.test_file_path,
+            prompt_loader=self.prompt_loader,
+            workspace_path=self.workspace_path,
+            run_uuid=run_uuid,
+            mcp_pool=None if har_args else self.mcp_pool(server_args + blocking_args),
+            memory_sampler=self.memory_sampler(),
+            storage_state_path=str(storage_state_path) if storage_state_path else None,
+            capture_storage_state_path=str(capture_storage_state_path) if capture_storage_state_path else None,
+            prefix_state=prefix_state,
+            context_bundle=self.context_bundle(),
+            pre_execution=self.pre_execution(kwargs.get("test_title")) if not prefix_state else None,
+            server_args=har_args + blocking_args,
+            compact_snapshots=self.compact_snapshots,
+            **kwargs,
+        )
+        try:
+            async with self.deadline("web", self.web_timeout):
+                await web_agent.run()
+        finally:
+            if capture_storage_state_path:
+                self.storage_state_store.finish_capture()
+            if har_recording:
+                await self.har_store.finish_record(self.test_file_path)
+
+    async def report_blocking(self) -> None:
+        """Measure and print what the blocked hosts save on the spec's start page, next to the web agent."""
+        if not self.block_hosts or self.blocking_reported:
+            return
+        self.blocking_reported = True
+        source = (Path(self.workspace_path) / self.test_file_path).read_text(encoding="utf-8")
+        base_url = CypressConfigResolver.shared(self.workspace_path).config().base_url
+        url = BlockingProbe.start_url(source, base_url)
+        if not url:
+            print(
+                f"🚫 Blocking {len(self.block_hosts)} hosts; no start URL in {self.test_file_path} to measure savings"
+            )
+            return
+        storage_state_path = self.storage_state_store.valid_state() if self.storage_state_store else None
+        report = await BlockingProbe(self.workspace_path).measure(
+            url, self.block_hosts, str(storage_state_path) if storage_state_path else None
+        )
+        print(f"🚫 {self.test_file_path}: {report.summary()}")
+
+    async def aria_page_diff(self, test_output: str = None, test: SpecTest = None) -> Optional[Tuple[str, str]]:
+        """
+        Diff the ARIA snapshot of the failure against the baseline from a passing run: a baseline file
+        put in place by hand, or else the captured step closest to the failure. Returns the rendered
+        diff and the failure output without snapshots, or None when there is nothing to diff.
+        """
+        test_title = test.title if test else None
+        full_title = test.full_title if test else None
+        baseline = load_baseline(self.workspace_path, self.test_file_path, test_title)
+        baseline_store = BaselineStore.shared(self.workspace_path)
+        if baseline is None and not baseline_store.steps(self.test_file_path, full_title):
+            print(f"⚠️ No ARIA baseline for {self.test_file_path}, running the web agent")
+            return None
+
+        if test_output is None and test_title is None:
+            test_output = self.initial_test_output
+        if test_output is None:
+            async with self.deadline("spec"):
+                success, test_output = await self.cypress_executor(test_title).run_async(self.test_file_path)
+            if success:
+                print(f"⚠️ {self.test_file_path} passed this time, no failure snapshot to diff; running the web agent")
+                return None
+            if test_title is None:
+                # Also given to the web agent if it runs after all
+                self.initial_test_output = test_output
+
+        current_snapshot = extract_cypress_snapshot(test_output)
+        if current_snapshot is None:
+            print(f"⚠️ The failure output of {self.test_file_path} has no ARIA snapshot to diff, running the web agent")
+            return None
+        current = AriaTree.parse(current_snapshot)
+        if baseline is None:
+            closest = baseline_store.closest(self.test_file_path, current_snapshot, full_title)
+            if closest is None:
+                print(f"⚠️ The stored baselines of {self.test_file_path} are missing, running the web agent")
+                return None
+            snapshot, step = closest
+            baseline = AriaTree.parse(snapshot)
+            captured_at = time.strftime("%Y-%m-%d %H:%M", time.localtime(step.captured_at))
+            print(f"📸 Baseline: {step.describe()}, captured {captured_at}")
+        started = time.perf_counter()
+        diff = AriaDiff.between(baseline, current)
+        elapsed = time.perf_counter() - started
+        print(f"🌳 ARIA diff against the last passing run: {diff.summary()}, computed in {elapsed * 1000:.0f}ms")
+        if not diff:
+            print("⚠️ The page did not change since the passing run, running the web agent")
+            return None
+        return diff.render(), strip_cypress_snapshots(test_output)
+
+    async def heal_locally(
+        self, test_output: str = None, test: SpecTest = None, coding_lock: asyncio.Lock = None
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Let SelectorMatcher propose a fix for the failed lookup from the failure's ARIA snapshot. A
+        proposal at or above the confidence threshold is applied and validated with one Cypress run,
+        and reverted when the run still fails. Returns whether the spec (or test) passes now and the
+        failure output, for the stages that run otherwise.
+        """
+        test_title = test.title if test else None
+        label = f"test '{test_title}'" if test_title else self.test_file_path
+        if test_output is None and test_title is None:
+            test_output = self.initial_test_output
+        if test_output is None:
+            async with self.deadline("spec"):
+                success, test_output = await self.cypress_executor(test_title).run_async(self.test_file_path)
+            if success:
+                print(f"⚠️ {label} passed this time, no failure to match; running the agents")
+                return False, None
+            if test_title is None:
+                # Also given to the web agent if it runs after all
+                self.initial_test_output = test_output
+        if test_title is None and len(SpecSplitter.failing_titles(test_output)) > 1:
+            print(
+                f"⚠️ Several tests of {self.test_file_path} fail, the local matcher handles one at a time (--per-test)"
+            )
+            return False, test_output
+
+        started = time.perf_counter()
+        # Coding agents of other tests edit the same spec
+        async with coding_lock or nullcontext():
+            spec_path = Path(self.workspace_path) / self.test_file_path
+            source = spec_path.read_text(encoding="utf-8")
+            splitter = SpecSplitter(source)
+            if test_title:
+                current = next((other for other in splitter.tests() if other.full_title == test.full_title), None)
+            else:
+                failing = splitter.failing_tests(test_output)
+                current = failing[0] if len(failing) == 1 else None
+            # Only the failing test's body and hooks are edited, never titles or other tests
+            spans = splitter.ranges(current) if current else []
+            try:
+                if current is None:
+                    raise NoMatch("the failing test could not be found in the spec")
+                match = SelectorMatcher().propose(test_output, source, spans)
+            except NoMatch as e:
+                match_ms = (time.perf_counter() - started) * 1000
+                print(f"🧩 Local matcher: no proposal for {label}, {e}")
+                LocalMatchRecord(self.test_file_path, test_title or "", "no match", str(e), match_ms=match_ms).save(
+                    self.workspace_path
+                )
+                return False, test_output
+            match_ms = (time.perf_counter() - started) * 1000
+            record = LocalMatchRecord(
+                self.test_file_path,
+                test_title or "",
+                "low confidence",
+                old=match.old,
+                new=match.new,
+                confidence=match.confidence,
+                match_ms=match_ms,
+            )
+            if match.confidence < self.local_match_threshold:
+                print(
+                    f"🧩 Local matcher: {match.describe()} is below the threshold of "
+                    f"{self.local_match_threshold:.2f}, running the agents"
+                )
+                record.save(self.workspace_path)
+                return False, test_output
+
+            print(f"🧩 Local matcher: {match.describe()}, found in {match_ms:.0f}ms; validating")
+            spec_path.write_text(SelectorMatcher.apply(match, source, spans), encoding="utf-8")
+            validation_start = time.monotonic()
+            success = False
+            try:
+                async with self.deadline("spec"):
+                    success, _ = await self.cypress_executor(test_title).run_async(self.test_file_path)
+            finally:
+                validation_time = time.monotonic() - validation_start
+                self.local_match_time += match_ms / 1000 + validation_time
+                if not success:
+                    spec_path.write_text(source, encoding="utf-8")
+
+        outcome = "healed" if success else "rejected"
+        record._replace(outcome=outcome, validation_time=validation_time).save(self.workspace_path)
+        if success:
+            self.local_heals += 1
+            print(f"🧩 Local matcher healed {label} without an agent, validated in {validation_time:.1f}s")
+        else:
+            print(f"🧩 Local matcher: the proposal still fails ({validation_time:.1f}s), reverted; running the agents")
+        return success, test_output
+
+    def context_bundle(self) -> Optional[str]:
+        """Build the bundle for the spec as it is now, so later sessions see the coding agent's fixes."""
+        if not self.preload_context:
+            return None
+        bundle = ContextBundle(self.workspace_path).build(self.test_file_path)
+        print(f"📦 Preloaded {len(bundle)} characters of spec and config context for the web agent")
+        return bundle
+
+    def pre_execution(self, test_title: str = None) -> Optional[PreExecution]:
+        """Translate the steps of the session's tests to Playwright, up to the first untranslatable one."""
+        if not self.pre_execute:
+            return None
+        splitter = SpecSplitter.from_file(Path(self.workspace_path) / self.test_file_path)
+        tests = splitter.tests()
+        modifiers = {test: splitter.source[test.keyword_start : test.keyword_end] for test in tests}
+        if test_title:
+            tests = [test for test in tests if test.title == test_title]
+        elif any(modifier.endswith(".only") for modifier in modifiers.values()):
+            tests = [test for test in tests if modifiers[test].endswith(".only")]
+        else:
+            tests = [test for test in tests if not modifiers[test].endswith(".skip")]
+        base_url = CypressConfigResolver.shared(self.workspace_path).config().base_url
+        before_run = set()
+        plan = CypressTranspiler(base_url).pre_execution(
+            [(test.title, splitter.steps(test, before_run)) for test in tests]
+        )
+        if not plan.translated:
+            reason = f": {plan.stopped_at.reason}" if plan.stopped_at else ""
+            print(f"⚠️ No leading steps of {self.test_file_path} could be translated to Playwright{reason}")
+            return None
+        stop = f", stopping at {plan.stopped_at.cypress} ({plan.stopped_at.reason})" if plan.stopped_at else ""
+        print(f"⚡ Pre-executing {plan.translated} of {len(plan.steps)} steps with Playwright{stop}")
+        return plan
+
+    def cypress_executor(self, test_title: str = None) -> SubprocessExecutor:
+        """Executor for Cypress runs of the spec, or of one of its tests."""
+        baseline_store = BaselineStore.shared(self.workspace_path) if self.capture_baselines else None
+        if test_title:
+            return SingleTestExecutor(
+                self.workspace_path, test_title, self.cypress_timeout, self.cypress_block_hosts, baseline_store
+            )
+        return SubprocessExecutor(self.workspace_path, self.cypress_timeout, self.cypress_block_hosts, baseline_store)
+
+    def mcp_pool(self, server_args: List[str] = None) -> Optional[McpServerPool]:
+        server_args = server_args or []
+        if self.shared_browser:
+            return McpServerPool.shared(
+                self.workspace_path, size=self.mcp_pool_size or 1, server_args=server_args, sessions_per_server=None
+            )
+        if self.mcp_pool_size:
+            return McpServerPool.shared(self.workspace_path, size=self.mcp_pool_size, server_args=server_args)
+        return None
+
+    def memory_sampler(self) -> Optional[McpMemorySampler]:
+        return McpMemorySampler.shared() if self.measure_memory else None
+
+    def defer_deadline(self, seconds: float) -> None:
+        """Move the spec deadline back by time the spec spent between stages, e.g. queued for a coding worker."""
+        if self.spec_deadline is not None:
+            self.spec_deadline += seconds
+
+    @asynccontextmanager
+    async def deadline(self, stage: str, budget: float = None) -> AsyncIterator[None]:
+        """
+        Bound the enclosed work by the stage budget and the spec's overall deadline, whichever ends first.
+        On expiry the work is cancelled: the SDK session closes its CLI (whose Playwright MCP server exits
+        with it) and a running Cypress subprocess is killed, then PipelineTimeoutError is raised.
+        """
+        loop = asyncio.get_running_loop()
+        if self.spec_timeout and self.spec_deadline is None:
+            self.spec_deadline = loop.time() + self.spec_timeout
+
+        limits = []
+        if self.spec_deadline is not None:
+            limits.append((self.spec_deadline, "spec", self.spec_timeout))
+        if budget:
+            limits.append((loop.time() + budget, stage, budget))
+        if not limits:
+            yield
+            return
+
+        when, limit_name, limit_budget = min(limits)
+        timeout = asyncio.timeout_at(when)
+        try:
+            async with timeout:
+                yield
+        except TimeoutError:
+            if not timeout.expired():
+                raise
+            print(
+                f"\n⏱️ {self.test_file_path}: {stage} stage stopped, {limit_name} budget of {limit_budget:g}s exceeded"
+            )
+            raise PipelineTimeoutError(limit_name, limit_budget) from None
+
+    def stage_settings(self) -> Dict[str, Any]:
+        """The options that change what the stages produce, hashed into the stage cache key."""
+        return {
+            "per_test": self.per_test,
+            # Only the prefix's steps: its URL and state file change with every batch
+            "prefix_steps": self.prefix_state["steps"] if self.prefix_state else None,
+            "preload_context": self.preload_context,
+            "pre_execute": self.pre_execute,
+            "record_har": self.har_store is not None,
+            "block_hosts": self.block_hosts,
+            "cypress_block_hosts": self.cypress_block_hosts,
+            "compact_snapshots": self.compact_snapshots,
+            "aria_diff": self.aria_diff,
+            "local_match": self.local_match,
+        }
+
+    def resume(self) -> Optional[bool]:
+        """
+        Adopt the spec's content key as run id and detect stages finished by earlier runs.
+        Returns True when an earlier run already healed the unchanged inputs, otherwise None.
+        A coding stage that did not heal the spec counts as incomplete and runs again.
+        """
+        if not self.stage_cache:
+            return None
+
+        key = self.stage_cache.compute_key(self.test_file_path, self.stage_settings())
+        manifest = self.stage_cache.load(key)
+
+        # A Stage 2 that was interrupted may already have edited the spec, changing its key
+        pending_key = self.stage_cache.get_pending(self.test_file_path)
+        if pending_key and not StageCache.is_completed(manifest, STAGE_WEB):
+            pending_manifest = self.stage_cache.load(pending_key)
+            if StageCache.is_completed(pending_manifest, STAGE_WEB):
+                key, manifest = pending_key, pending_manifest
+
+        self.run_uuid = key
+        if StageCache.is_completed(manifest, STAGE_CODING):
+            if manifest["stages"][STAGE_CODING].get("healed", False):
+                print(f"⏭️  All stages already completed for unchanged inputs (Task ID = {key}), healed: True")
+                return True
+            print(f"🔁 The last coding stage for unchanged inputs did not heal the spec, retrying (Task ID = {key})")
+
+        self.web_stage_completed = StageCache.is_completed(
+            manifest, STAGE_WEB
+        ) and self.stage_cache.stage_outputs_exist(key)
+        return None
+
+    async def run_web_stage(self):
+        """Stage 1: Run Web Agent to generate conversation logs."""
+        if self.web_stage_completed:
+            print(f"⏭️  STAGE 1 SKIPPED: reusing Web Agent output for unchanged inputs (Task ID = {self.run_uuid})\n")
+            return
+
+        if self.local_match:
+            self.locally_healed, _ = await self.heal_locally()
+            if self.locally_healed:
+                print(f"⏭️  STAGE 1 SKIPPED: the local selector matcher healed the spec (Task ID = {self.run_uuid})\n")
+                return
+
+        if self.aria_diff:
+            self.page_diff = await self.aria_page_diff()
+            if self.page_diff:
+                print(
+                    f"⏭️  STAGE 1 SKIPPED: healing from the ARIA diff against the passing run "
+                    f"(Task ID = {self.run_uuid})\n"
+                )
+                return
+
+        replay_report = None
+        if self.replay_precheck:
+            reused, replay_report = await self.replay_recorded_flow()
+            if reused:
+                print(f"⏭️  STAGE 1 SKIPPED: recorded browser steps still replay (Task ID = {self.run_uuid})\n")
+                self.web_stage_completed = True
+                if self.stage_cache:
+                    self.stage_cache.mark_completed(self.run_uuid, self.test_file_path, STAGE_WEB)
+                return
+
+        print("STAGE 1: Web Agent - Executing test with Playwright\n")
+
+        await asyncio.gather(
+            self.run_web_agent(
+                self.run_uuid, initial_test_output=self.initial_test_output, replay_report=replay_report
+            ),
+            self.report_blocking(),
+        )
+        self.web_stage_completed = True
+        if self.stage_cache:
+            self.stage_cache.mark_completed(self.run_uuid, self.test_file_path, STAGE_WEB)
+
+        print("\n" + "✅ " * 20)
+        print(f"STAGE 1 COMPLETED: Task ID = {self.run_uuid}")
+        print("✅ " * 20 + "\n")
+
+    async def replay_recorded_flow(self) -> Tuple[bool, Optional[str]]:
+        """
+        Replay the browser steps recorded by the spec's previous web agent session. When all of them
+        still work, that session's code blocks are reused for the coding agent and no web agent runs.
+        Otherwise returns the report of the failing step for the web agent's prompt.
+        """
+        flow = FlowStore(self.workspace_path).load(self.test_file_path)
+        if not flow:
+            return False, None
+
+        print(f"🔁 Replaying {len(flow.steps)} browser steps recorded on {flow.recorded_at}")
+        async with self.deadline("web", self.web_timeout):
+            result = await PlaywrightReplayer(self.workspace_path).replay(flow)
+        print(result.report() + "\n")
+        if not result.passed:
+            return False, result.report() if result.failed_step else None
+
+        code_blocks_path = Path(self.workspace_path) / "self_healing" / "results" / f"code_blocks_{self.run_uuid}.txt"
+        recorded_path = Path(flow.code_blocks_path)
+        if not recorded_path.exists():
+            print(f"⚠️ {recorded_path} no longer exists, running the web agent anyway")
+            return False, None
+        if recorded_path.resolve() != code_blocks_path.resolve():
+            shutil.copyfile(recorded_path, code_blocks_path)
+        return True, None
+
+    async def run_coding_stage(self) -> bool:
+        """Stage 2: Run Coding Agent to fix the test. Returns whether the test passes afterwards."""
+        if self.locally_healed:
+            print(f"⏭️  STAGE 2 SKIPPED: the local selector matcher's fix passed validation (Task ID = {self.run_uuid})")
+            healed = True
+        else:
+            print("STAGE 2: Coding Agent - Fixing test based on conversation logs")
+
+            if self.stage_cache:
+                self.stage_cache.set_pending(self.test_file_path, self.run_uuid)
+
+            coding_agent = CodingAgent(
+                test_file_path=self.test_file_path,
+                task_id=self.run_uuid,
+                prompt_loader=self.prompt_loader,
+                workspace_path=self.workspace_path,
+                cypress_executor=self.cypress_executor(),
+                aria_diff=self.page_diff[0] if self.page_diff else None,
+                failure_output=self.page_diff[1] if self.page_diff else None,
+            )
+            async with self.deadline("coding", self.coding_timeout):
+                healed = await coding_agent.run()
+            self.agent_heals += healed
+
+        if self.stage_cache:
+            self.stage_cache.mark_completed(self.run_uuid, self.test_file_path, STAGE_CODING, healed=healed)
+            # Record the outcome under the post-fix content too, so an unchanged rerun is skipped
+            self.stage_cache.copy_manifest(
+                self.run_uuid, self.stage_cache.compute_key(self.test_file_path, self.stage_settings())
+            )
+            self.stage_cache.clear_pending(self.test_file_path)
+
+        if healed:
+            print("\n" + "🎉 " * 20)
+            print("PIPELINE COMPLETED SUCCESSFULLY!")
+            print("🎉 " * 20 + "\n")
+        else:
+            print("\n" + "❌ " * 20)
+            print(f"PIPELINE COMPLETED: {self.test_file_path} is still failing")
+            print("❌ " * 20 + "\n")
+
+        return healed
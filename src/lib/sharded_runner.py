@@ -0,0 +1,135 @@
+"""
+Sharded Batch Runner
+
+Partitions a batch of test files across worker processes so the CPU-bound parts of
+each pipeline (message collection, conversation formatting, extraction regexes) can
+use more than one core. Every worker runs its own event loop and BatchRunner; the
+parent merges the per-shard results back into input order.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+from self_healing.src.lib.batch_runner import DEFAULT_CONCURRENCY, STATUS_ERRORED, BatchRunner, SpecResult
+from self_healing.src.lib.mcp_server_pool import McpServerPool
+from self_healing.src.lib.staged_runner import StagedBatchRunner
+from self_healing.src.utils.process_memory import McpMemorySampler
+
+
+def partition(test_file_paths: List[str], shard_count: int) -> List[List[str]]:
+    """Split test files round-robin into at most shard_count non-empty shards."""
+    shards = [test_file_paths[index::shard_count] for index in range(shard_count)]
+    return [shard for shard in shards if shard]
+
+
+def run_shard(
+    test_file_paths: List[str],
+    workspace_path: str,
+    concurrency: int,
+    coding_concurrency: int = None,
+    spec_options: Dict[str, Dict[str, Any]] = None,
+    pipeline_options: Dict[str, Any] = None,
+) -> List[SpecResult]:
+    """
+    Worker entry point: heal one shard in a fresh event loop.
+    When coding_concurrency is set, the shard uses the staged scheduler.
+    """
+    if coding_concurrency:
+        runner = StagedBatchRunner(
+            test_file_paths=test_file_paths,
+            workspace_path=workspace_path,
+            web_concurrency=concurrency,
+            coding_concurrency=coding_concurrency,
+            spec_options=spec_options,
+            pipeline_options=pipeline_options,
+        )
+    else:
+        runner = BatchRunner(
+            test_file_paths=test_file_paths,
+            workspace_path=workspace_path,
+            concurrency=concurrency,
+            spec_options=spec_options,
+            pipeline_options=pipeline_options,
+        )
+    return asyncio.run(_run_and_close_pools(runner))
+
+
+async def _run_and_close_pools(runner: BatchRunner) -> List[SpecResult]:
+    try:
+        return await runner.run()
+    finally:
+        await McpServerPool.close_all()
+        await McpMemorySampler.close_shared()
+
+
+class ShardedBatchRunner:
+    """
+    Runs a BatchRunner per shard in a ProcessPoolExecutor and merges the results.
+    """
+
+    def __init__(
+        self,
+        test_file_paths: List[str],
+        workspace_path: str = None,
+        processes: int = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        coding_concurrency: int = None,
+        spec_options: Dict[str, Dict[str, Any]] = None,
+        pipeline_options: Dict[str, Any] = None,
+    ):
+        self.test_file_paths = test_file_paths
+        self.workspace_path = workspace_path or os.getcwd()
+        self.processes = processes or os.cpu_count() or 1
+        if self.processes < 1:
+            raise ValueError(f"processes must be at least 1, got {self.processes}")
+        self.concurrency = concurrency
+        self.coding_concurrency = coding_concurrency
+        self.spec_options = spec_options or {}
+        self.pipeline_options = pipeline_options or {}
+
+    async def run(self) -> List[SpecResult]:
+        """Heal all test files across worker processes and return results in input order."""
+        shards = partition(self.test_file_paths, self.processes)
+
+        print("=" * 80)
+        print("Self-Healing Sharded Batch Run")
+        print("=" * 80)
+        print(f"Test Files: {len(self.test_file_paths)}")
+        print(f"Shards: {len(shards)} processes x {self.concurrency} concurrent pipelines")
+        print(f"Workspace: {self.workspace_path}")
+        print("=" * 80 + "\n")
+
+        loop = asyncio.get_running_loop()
+        # Spawn instead of fork: the parent already has a running event loop and SDK state.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=len(shards), mp_context=context) as executor:
+            futures = [
+                loop.run_in_executor(
+                    executor,
+                    run_shard,
+                    shard,
+                    self.workspace_path,
+                    self.concurrency,
+                    self.coding_concurrency,
+                    {path: self.spec_options[path] for path in shard if path in self.spec_options},
+                    self.pipeline_options,
+                )
+                for shard in shards
+            ]
+            shard_results = await asyncio.gather(*futures, return_exceptions=True)
+
+        results_by_path = {}
+        for shard, results in zip(shards, shard_results):
+            if isinstance(results, BaseException):
+                print(f"\n❌ Shard worker failed ({len(shard)} specs): {results}")
+                results = [
+                    SpecResult(test_file_path=path, status=STATUS_ERRORED, wall_time=0.0, error=str(results))
+                    for path in shard
+                ]
+            for result in results:
+                results_by_path[result.test_file_path] = result
+
+        return [results_by_path[path] for path in self.test_file_paths]
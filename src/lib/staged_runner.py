@@ -0,0 +1,121 @@
+"""
+Staged Batch Runner
+
+Schedules the two pipeline stages on separate worker pools so they overlap across
+specs: while spec A is in its Cypress retry loop (Stage 2), spec B can already be
+exploring the page with the web agent (Stage 1). A bounded hand-off queue between
+the pools provides backpressure, so web workers stop opening new browser sessions
+when the coding workers cannot keep up.
+"""
+
+import asyncio
+import time
+from typing import List, Optional, Tuple
+
+from self_healing.src.lib.batch_runner import DEFAULT_CONCURRENCY, BatchRunner, SpecResult
+from self_healing.src.lib.self_healing_pipeline import SelfHealingPipeline
+
+
+class StagedBatchRunner(BatchRunner):
+    """
+    Runs Stage 1 and Stage 2 of every SelfHealingPipeline on separate bounded worker pools.
+    """
+
+    def __init__(
+        self,
+        test_file_paths: List[str],
+        workspace_path: str = None,
+        web_concurrency: int = DEFAULT_CONCURRENCY,
+        coding_concurrency: int = DEFAULT_CONCURRENCY,
+        handoff_size: int = None,
+        **kwargs,
+    ):
+        if coding_concurrency < 1:
+            raise ValueError(f"coding_concurrency must be at least 1, got {coding_concurrency}")
+        super().__init__(test_file_paths, workspace_path=workspace_path, concurrency=web_concurrency, **kwargs)
+        self.web_concurrency = web_concurrency
+        self.coding_concurrency = coding_concurrency
+        # Specs that finished Stage 1 and wait for a coding worker
+        self.handoff_size = handoff_size or coding_concurrency
+
+    async def run(self) -> List[SpecResult]:
+        """Heal all test files with overlapping stages and return results in input order."""
+        print("=" * 80)
+        print("Self-Healing Staged Batch Run")
+        print("=" * 80)
+        print(f"Test Files: {len(self.test_file_paths)}")
+        print(f"Web Workers: {self.web_concurrency}")
+        print(f"Coding Workers: {self.coding_concurrency} (hand-off queue: {self.handoff_size})")
+        print(f"Workspace: {self.workspace_path}")
+        print("=" * 80 + "\n")
+
+        pending: asyncio.Queue = asyncio.Queue()
+        for test_file_path in self.test_file_paths:
+            pending.put_nowait(test_file_path)
+        handoff: asyncio.Queue = asyncio.Queue(maxsize=self.handoff_size)
+        results = {}
+
+        web_workers = [
+            asyncio.create_task(self._web_worker(pending, handoff, results)) for _ in range(self.web_concurrency)
+        ]
+        coding_workers = [
+            asyncio.create_task(self._coding_worker(handoff, results)) for _ in range(self.coding_concurrency)
+        ]
+
+        try:
+            await asyncio.gather(*web_workers)
+            # One sentinel per coding worker once no more specs can arrive
+            for _ in coding_workers:
+                await handoff.put(None)
+            await asyncio.gather(*coding_workers)
+        finally:
+            for worker in web_workers + coding_workers:
+                worker.cancel()
+
+        return [results[test_file_path] for test_file_path in self.test_file_paths]
+
+    async def _web_worker(self, pending: asyncio.Queue, handoff: asyncio.Queue, results: dict):
+        while True:
+            try:
+                test_file_path = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            start = time.monotonic()
+            try:
+                pipeline = self.create_pipeline(test_file_path)
+            except Exception as e:
+                results[test_file_path] = self.errored_result(test_file_path, start, e)
+                continue
+            try:
+                if pipeline.per_test:
+                    # Per-test healing schedules its own stages within the spec
+                    results[test_file_path] = self.completed_result(pipeline, start, await pipeline.run())
+                    continue
+                recorded = pipeline.resume()
+                if recorded is not None:
+                    results[test_file_path] = self.completed_result(pipeline, start, recorded)
+                    continue
+                await pipeline.run_web_stage()
+            except Exception as e:
+                results[test_file_path] = self.errored_result(test_file_path, start, e, pipeline)
+                continue
+
+            # Blocks while the coding pool is saturated (backpressure)
+            await handoff.put((pipeline, start, asyncio.get_running_loop().time()))
+
+    async def _coding_worker(self, handoff: asyncio.Queue, results: dict):
+        while True:
+            item: Optional[Tuple[SelfHealingPipeline, float, float]] = await handoff.get()
+            if item is None:
+                return
+
+            pipeline, start, queued_at = item
+            # Waiting for a coding worker does not count against the spec budget
+            pipeline.defer_deadline(asyncio.get_running_loop().time() - queued_at)
+            try:
+                healed = await pipeline.run_coding_stage()
+            except Exception as e:
+                results[pipeline.test_file_path] = self.errored_result(pipeline.test_file_path, start, e, pipeline)
+                continue
+            results[pipeline.test_file_path] = self.completed_result(pipeline, start, healed)
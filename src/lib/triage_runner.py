@@ -0,0 +1,88 @@
+"""
+Triage Runner
+
+Runs the requested specs through Cypress once, in parallel, before any agent is
+started. Only failing specs need healing; their failure output is kept so it can
+be handed to the web agent as extra context.
+"""
+
+import asyncio
+import os
+import time
+from typing import Dict, List, NamedTuple
+
+from self_healing.src.utils.subprocess_executor import SubprocessExecutor
+
+# Configuration
+DEFAULT_TRIAGE_CONCURRENCY = 4
+
+
+class TriageResult(NamedTuple):
+    """Outcome of the initial Cypress run for a single test file."""
+
+    test_file_path: str
+    passed: bool
+    output: str
+    wall_time: float
+
+
+class TriageRunner:
+    """
+    Executes every spec once with SubprocessExecutor and splits them into passing and failing.
+    """
+
+    def __init__(
+        self,
+        test_file_paths: List[str],
+        workspace_path: str = None,
+        concurrency: int = DEFAULT_TRIAGE_CONCURRENCY,
+        cypress_executor: SubprocessExecutor = None,
+    ):
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be at least 1, got {concurrency}")
+        self.test_file_paths = test_file_paths
+        self.workspace_path = workspace_path or os.getcwd()
+        self.concurrency = concurrency
+        self.cypress_executor = cypress_executor or SubprocessExecutor(self.workspace_path)
+
+    async def run(self) -> List[TriageResult]:
+        """Run all specs and return one TriageResult per file, in input order."""
+        print("=" * 80)
+        print("Triage: running specs before healing")
+        print("=" * 80)
+        print(f"Test Files: {len(self.test_file_paths)}")
+        print(f"Concurrency: {self.concurrency}")
+        print("=" * 80 + "\n")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(
+            *(self._run_one(test_file_path, semaphore) for test_file_path in self.test_file_paths)
+        )
+
+        failing = sum(1 for result in results if not result.passed)
+        print(f"\nTriage completed: {len(results) - failing} passing, {failing} failing")
+        return results
+
+    async def _run_one(self, test_file_path: str, semaphore: asyncio.Semaphore) -> TriageResult:
+        async with semaphore:
+            start = time.monotonic()
+            try:
+                passed, output = await self.cypress_executor.run_async(test_file_path)
+            except Exception as e:
+                # Could not even run the spec; let the pipeline look at it
+                passed, output = False, f"Triage run failed: {e}"
+            wall_time = time.monotonic() - start
+
+        icon = "✅" if passed else "❌"
+        print(f"{icon} [{wall_time:6.1f}s] {test_file_path}")
+        return TriageResult(
+            test_file_path=test_file_path,
+            passed=passed,
+            output=output,
+            wall_time=wall_time,
+        )
+
+    @staticmethod
+    def failure_outputs(results: List[TriageResult]) -> Dict[str, str]:
+        """Map each failing spec to the output of its triage run."""
+        return {result.test_file_path: result.output for result in results if not result.passed}
@@ -4,9 +4,11 @@ Web Agent Runner
 Encapsulates the logic to run the Claude test pipeline and persist conversation logs.
 """
 
+import json
 import os
+import sys
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 from claude_agent_sdk import (
     AgentDefinition,
@@ -19,7 +21,10 @@ from claude_agent_sdk import (
     UserMessage,
 )
 from self_healing.src.utils.conversation_formatter import ConversationFormatter
+from self_healing.src.utils.cypress_config import CypressConfigResolver
+from self_healing.src.utils.cypress_transpiler import PreExecution
 from self_healing.src.utils.prompt_loader import PromptLoader
+from self_healing.src.utils.snapshot_compactor import CompactionStats
 
 
 class WebAgentRunner:
@@ -34,13 +39,49 @@ class WebAgentRunner:
         conversation_path: Path,
         prompt_loader: PromptLoader,
         model: str = "sonnet",
+        initial_test_output: str = None,
+        test_title: str = None,
+        mcp_server_url: str = None,
+        storage_state_path: str = None,
+        capture_storage_state_path: str = None,
+        prefix_state: Dict[str, Any] = None,
+        user_prompt: str = None,
+        context_bundle: str = None,
+        replay_report: str = None,
+        pre_execution: PreExecution = None,
+        server_args: List[str] = None,
+        compact_snapshots: bool = False,
     ):
         self.test_file_path = test_file_path
         self.workspace_path = workspace_path
         self.conversation_path = conversation_path
         self.prompt_loader = prompt_loader
         self.model = model
+        self.initial_test_output = initial_test_output
+        # When set, the agent only executes this test of the spec
+        self.test_title = test_title
         self.local_playwright_cli = os.path.join(workspace_path, "self_healing/playwright/packages/playwright/cli.js")
+        # A pooled server's HTTP endpoint; without it a fresh stdio server is started for this session
+        self.mcp_server_url = mcp_server_url
+        # Saved login session to start from, or where this session should save its login
+        self.storage_state_path = storage_state_path
+        self.capture_storage_state_path = capture_storage_state_path
+        # Browser state after setup steps shared with other specs (see PrefixStateRunner)
+        self.prefix_state = prefix_state
+        # Replaces the prompt built from the test file, e.g. for shared prefix sessions
+        self.user_prompt = user_prompt
+        # Preloaded spec, imported files and config (see ContextBundle), saving the agent's file lookups
+        self.context_bundle = context_bundle
+        # Where the previous run's recorded browser steps stopped working (see PlaywrightReplayer)
+        self.replay_report = replay_report
+        # Translated leading steps the agent runs in one browser_run_code call (see CypressTranspiler)
+        self.pre_execution = pre_execution
+        # Extra arguments for a session-specific stdio server, e.g. HAR recording or replay
+        self.server_args = server_args or []
+        # Route the MCP server through McpCompactionProxy, which writes its totals next to the conversation
+        self.compaction_stats_path = (
+            conversation_path.with_suffix(".compaction.json").absolute() if compact_snapshots else None
+        )
         self.conversation_formatter = ConversationFormatter(
             log_title="Claude Agent Conversation Log",
             test_file_path=self.test_file_path,
@@ -52,12 +93,11 @@ class WebAgentRunner:
         options = self._build_agent_options()
 
         conversation_history = []
-        user_prompt = self.prompt_loader.format_prompt(
-            "web_agent",
-            prompt_key="user_prompt",
-            test_file_path=self.test_file_path,
-        )
+        user_prompt = (self.user_prompt or self._build_user_prompt()) + self._build_config_context()
         print("Web Agent User Prompt: " + user_prompt)
+        if self.compaction_stats_path:
+            self.compaction_stats_path.parent.mkdir(parents=True, exist_ok=True)
+            self.compaction_stats_path.unlink(missing_ok=True)
 
         async with ClaudeSDKClient(options=options) as client:
             print("\n" + "=" * 80)
@@ -75,38 +115,155 @@ class WebAgentRunner:
             self.conversation_path,
             show_tool_summary=True,
         )
+        self._report_compaction()
+
+    def _build_user_prompt(self) -> str:
+        user_prompt = self.prompt_loader.format_prompt(
+            "web_agent",
+            prompt_key="test_user_prompt" if self.test_title else "user_prompt",
+            test_file_path=self.test_file_path,
+            test_title=self.test_title,
+        )
+        if self.context_bundle:
+            user_prompt += self.prompt_loader.format_prompt(
+                "web_agent",
+                prompt_key="context_bundle",
+                bundle=self.context_bundle,
+            )
+        if self.initial_test_output:
+            snippet = self.initial_test_output[-10000:]
+            user_prompt += self.prompt_loader.format_prompt(
+                "web_agent",
+                prompt_key="failure_context",
+                test_output=snippet,
+            )
+        if self.pre_execution:
+            plan = self.pre_execution
+            next_step = plan.label(plan.translated) if plan.stopped_at else "none, every step is covered."
+            user_prompt += self.prompt_loader.format_prompt(
+                "web_agent",
+                prompt_key="pre_execution",
+                code=plan.code,
+                translated=plan.translated,
+                total=len(plan.steps),
+                next_step=next_step,
+            )
+        if self.replay_report:
+            user_prompt += self.prompt_loader.format_prompt(
+                "web_agent",
+                prompt_key="replay_failure",
+                replay_report=self.replay_report,
+            )
+        if self.prefix_state:
+            user_prompt += self.prompt_loader.format_prompt(
+                "web_agent",
+                prompt_key="prefix_context",
+                step_count=len(self.prefix_state["steps"]),
+                steps="\n".join(self.prefix_state["steps"]),
+                url=self.prefix_state["url"],
+                conversation_path=self.prefix_state["conversation_path"],
+                test_file_path=self.test_file_path,
+            )
+        elif self.storage_state_path:
+            user_prompt += self.prompt_loader.format_prompt(
+                "web_agent",
+                prompt_key="storage_state_context",
+                storage_state_path=self.storage_state_path,
+            )
+        elif self.capture_storage_state_path:
+            user_prompt += self.prompt_loader.format_prompt(
+                "web_agent",
+                prompt_key="capture_storage_state",
+                storage_state_path=self.capture_storage_state_path,
+            )
+        return user_prompt
+
+    def _build_config_context(self) -> str:
+        config = CypressConfigResolver.shared(self.workspace_path).config()
+        if not config.config_file:
+            return ""
+        return self.prompt_loader.format_prompt(
+            "web_agent",
+            prompt_key="cypress_config",
+            config_file=config.config_file,
+            settings=config.describe(),
+        )
 
     def _print_header(self):
         print("=" * 80)
         print("Claude Agent Test Pipeline")
         print("=" * 80)
         print(f"Test File: {self.test_file_path}")
+        if self.test_title:
+            print(f"Test: {self.test_title}")
         print(f"Workspace: {self.workspace_path}")
         print("=" * 80)
 
+    def _build_mcp_server_config(self) -> Dict[str, Any]:
+        if self.compaction_stats_path:
+            return self._build_compaction_proxy_config()
+        if self.mcp_server_url:
+            return {"type": "http", "url": self.mcp_server_url}
+        return {"command": "node", "args": self._server_args()}
+
+    def _server_args(self) -> List[str]:
+        args = [self.local_playwright_cli, "run-mcp-server", "--isolated"]
+        if self.storage_state_path:
+            args += ["--storage-state", self.storage_state_path]
+        return args + self.server_args
+
+    def _build_compaction_proxy_config(self) -> Dict[str, Any]:
+        upstream = ["--url", self.mcp_server_url] if self.mcp_server_url else ["--", "node", *self._server_args()]
+        # The proxy imports self_healing.src, which lives in the workspace root
+        python_path = os.pathsep.join(filter(None, [self.workspace_path, os.environ.get("PYTHONPATH")]))
+        return {
+            "command": sys.executable,
+            "args": [
+                "-m",
+                "self_healing.src.lib.mcp_compaction_proxy",
+                "--stats",
+                str(self.compaction_stats_path),
+                *upstream,
+            ],
+            "env": {"PYTHONPATH": python_path},
+        }
+
+    def _report_compaction(self):
+        if not self.compaction_stats_path or not self.compaction_stats_path.exists():
+            return
+        try:
+            stats = CompactionStats(**json.loads(self.compaction_stats_path.read_text(encoding="utf-8")))
+        except (OSError, json.JSONDecodeError, TypeError):
+            return
+        print(f"🗜️ Snapshot compaction: {stats.summary()}")
+
+    def _browser_tools(self) -> List[str]:
+        tools = [
+            "mcp__playwright__browser_navigate",
+            "mcp__playwright__browser_snapshot",
+            "mcp__playwright__browser_click",
+            "mcp__playwright__browser_type",
+            "mcp__playwright__browser_wait_for",
+            "mcp__playwright__browser_take_screenshot",
+            "mcp__playwright__browser_press_key",
+            "mcp__playwright__browser_evaluate",
+        ]
+        if self.storage_state_path or self.capture_storage_state_path or self.pre_execution:
+            # Needed to save the login session with page.context().storageState() and to pre-execute steps
+            tools.append("mcp__playwright__browser_run_code")
+        return tools
+
     def _build_agent_options(self) -> ClaudeAgentOptions:
         return ClaudeAgentOptions(
             model=self.model,
-            mcp_servers={
-                "playwright": {
-                    "command": "node",
-                    "args": [self.local_playwright_cli, "run-mcp-server", "--isolated"],
-                }
-            },
+            mcp_servers={"playwright": self._build_mcp_server_config()},
             allowed_tools=[
                 "Read",
                 "Write",
                 "Edit",
                 "Glob",
                 "Grep",
-                "mcp__playwright__browser_navigate",
-                "mcp__playwright__browser_snapshot",
-                "mcp__playwright__browser_click",
-                "mcp__playwright__browser_type",
-                "mcp__playwright__browser_wait_for",
-                "mcp__playwright__browser_take_screenshot",
-                "mcp__playwright__browser_press_key",
-                "mcp__playwright__browser_evaluate",
+                *self._browser_tools(),
             ],
             permission_mode="acceptEdits",
             cwd=self.workspace_path,
@@ -123,14 +280,7 @@ class WebAgentRunner:
                         "Edit",
                         "Glob",
                         "Grep",
-                        "mcp__playwright__browser_navigate",
-                        "mcp__playwright__browser_snapshot",
-                        "mcp__playwright__browser_click",
-                        "mcp__playwright__browser_type",
-                        "mcp__playwright__browser_wait_for",
-                        "mcp__playwright__browser_take_screenshot",
-                        "mcp__playwright__browser_press_key",
-                        "mcp__playwright__browser_evaluate",
+                        *self._browser_tools(),
                     ],
                     model="haiku",
                 ),
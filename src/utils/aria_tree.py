@@ -0,0 +1,423 @@
+"""
+Parsed ARIA snapshots with lookups by role, accessible name, ref and text.
+
+Playwright renders accessibility trees as YAML, both in the MCP server's tool results and in
+the ARIA snapshot the Cypress support code prints on failure:
+
+    - navigation "Main" [ref=e3]:
+      - link "Home" [ref=e4] [cursor=pointer]:
+        - /url: /home
+      - button "Sign in" [disabled] [ref=e5]
+    - textbox "Email" [ref=e6]: jane@example.com
+    - text: Welcome back
+
+AriaTree.parse() reads that format line by line into slotted nodes kept in document order and
+builds its indexes once, so lookups are dictionary accesses instead of text scans. Incremental
+MCP snapshots (`<changed>` roots, `- ref=e5 [unchanged]`) parse too; their nodes are flagged.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import re
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+_LINE = re.compile(r"^(?P<indent> *)- (?P<rest>.*)$")
+# The common line shape, parsed in one match: role, optional quoted name, attributes, optional value
+_ELEMENT = re.compile(
+    r'^( *)- (<changed> )?([a-z]+)(?: ("[^"\\]*(?:\\.[^"\\]*)*"))?((?: \[[\w-]+(?:=[^\]]*)?\])*)(?:(:)(?: (.*))?)?$'
+)
+_ATTRIBUTES = re.compile(r"\[([\w-]+)(=[^\]]*)?\]")
+_NAME = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"')
+_REGEX_NAME = re.compile(r"(/.*/)(?=(?:\s*\[[\w-]+(?:=[^\]]*)?\])*$)")
+_WORD = re.compile(r"\w+")
+_NEEDS_QUOTES = re.compile(r"[\n:](\s|$)|\s#|[\n\r]")
+_HEX_ESCAPE = re.compile(r"\\x([0-9a-fA-F]{2})")
+_MCP_SNAPSHOT = re.compile(r"- Page Snapshot:\n```yaml\n(.*?)\n```", re.DOTALL)
+_CYPRESS_MARKER = "ARIA SNAPSHOT (Accessibility Tree)"
+_SEPARATOR = "=" * 80
+
+# Roles rendered for text content rather than for elements
+TEXT_ROLE = "text"
+
+
+class AriaNode:
+    """One element (or text run) of an ARIA snapshot."""
+
+    __slots__ = (
+        "index",
+        "role",
+        "name",
+        "ref",
+        "attributes",
+        "props",
+        "text",
+        "depth",
+        "parent",
+        "children",
+        "changed",
+    )
+
+    def __init__(self, index: int, role: str, name: str, depth: int, parent: Optional[AriaNode]):
+        self.index = index
+        self.role = role
+        self.name = name
+        self.ref: Optional[str] = None
+        # [checked], [level=2], [ref=e5], ... in rendering order; None when there are none
+        self.attributes: Optional[Dict[str, Optional[str]]] = None
+        # /url, /placeholder, ...
+        self.props: Optional[Dict[str, str]] = None
+        # Inline text content, e.g. the value of a textbox or the text of a paragraph
+        self.text = ""
+        self.depth = depth
+        self.parent = parent
+        self.children: List[AriaNode] = []
+        self.changed = False
+
+    def attribute(self, key: str) -> Optional[str]:
+        """Value of an attribute; "" for flags such as [checked], None when absent."""
+        if not self.attributes or key not in self.attributes:
+            return None
+        return self.attributes[key] or ""
+
+    def ancestors(self) -> Iterator[AriaNode]:
+        node = self.parent
+        while node is not None:
+            yield node
+            node = node.parent
+
+    def describe(self) -> str:
+        """The node's snapshot key, e.g. `button "Sign in" [ref=e5]`."""
+        key = self.role if self.role else f"ref={self.ref}"
+        if self.name:
+            regex = self.name.startswith("/") and self.name.endswith("/") and len(self.name) > 1
+            key += " " + (self.name if regex else json.dumps(self.name, ensure_ascii=False))
+        for attribute, value in (self.attributes or {}).items():
+            key += f" [{attribute}]" if value is None else f" [{attribute}={value}]"
+        return key
+
+    def __repr__(self) -> str:
+        return f"AriaNode({self.describe()})"
+
+
+class AriaTree:
+    """
+    The nodes of a snapshot in document order. The ref and role indexes are built with the tree,
+    the name and word indexes on their first lookup.
+    """
+
+    def __init__(self, nodes: List[AriaNode]):
+        self.nodes = nodes
+        self.roots = [node for node in nodes if node.parent is None]
+        self._by_ref: Dict[str, AriaNode] = {}
+        self._by_role: Dict[str, List[AriaNode]] = {}
+        self._by_name: Optional[Dict[str, List[AriaNode]]] = None
+        self._by_word: Optional[Dict[str, List[AriaNode]]] = None
+        # Sorted words and sorted reversed words, for prefix and suffix lookups
+        self._words: List[str] = []
+        self._reversed_words: List[str] = []
+        for node in nodes:
+            if node.ref:
+                self._by_ref[node.ref] = node
+            self._by_role.setdefault(node.role, []).append(node)
+
+    @classmethod
+    def parse(cls, snapshot: str) -> AriaTree:
+        nodes: List[AriaNode] = []
+        # (indent, node) of the open ancestors
+        stack: List[Tuple[int, AriaNode]] = []
+        for line in snapshot.splitlines():
+            element = _ELEMENT.match(line)
+            if element:
+                indent_text, changed, role, name, attributes, _, value = element.groups()
+                indent = len(indent_text)
+            else:
+                match = _LINE.match(line)
+                if not match:
+                    continue
+                indent = len(match.group("indent"))
+            while stack and stack[-1][0] >= indent:
+                stack.pop()
+            parent = stack[-1][1] if stack else None
+
+            if element:
+                node = AriaNode(len(nodes), role, "", len(stack), parent)
+                if name:
+                    node.name = _unquote(name) if "\\" in name else name[1:-1]
+                if attributes:
+                    node.attributes = {key: flag[1:] if flag else None for key, flag in _ATTRIBUTES.findall(attributes)}
+                    node.ref = node.attributes.get("ref")
+                if value:
+                    node.text = _unquote(value) if value[0] == '"' else value
+                node.changed = bool(changed)
+                nodes.append(node)
+                if parent is not None:
+                    parent.children.append(node)
+                stack.append((indent, node))
+                continue
+
+            key, value = _split_entry(match.group("rest"))
+            if key.startswith("/"):
+                # A property of the parent, e.g. "- /url: /home"
+                if parent is None:
+                    continue
+                if parent.props is None:
+                    parent.props = {}
+                parent.props[key[1:]] = value or ""
+                continue
+
+            node = AriaNode(len(nodes), "", "", len(stack), parent)
+            _parse_key(node, key)
+            if node.role == TEXT_ROLE:
+                node.text = value or ""
+            elif value:
+                node.text = value
+            nodes.append(node)
+            if parent is not None:
+                parent.children.append(node)
+            stack.append((indent, node))
+        return cls(nodes)
+
+    @classmethod
+    def from_mcp_result(cls, text: str) -> Optional[AriaTree]:
+        """Tree of the page snapshot in a Playwright MCP tool result, if it has one."""
+        match = _MCP_SNAPSHOT.search(text)
+        return cls.parse(match.group(1)) if match else None
+
+    @classmethod
+    def from_cypress_output(cls, output: str) -> Optional[AriaTree]:
+        """Tree of the ARIA snapshot printed in Cypress failure output, if it has one."""
+        snapshot = extract_cypress_snapshot(output)
+        return cls.parse(snapshot) if snapshot else None
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __iter__(self) -> Iterator[AriaNode]:
+        return iter(self.nodes)
+
+    def by_ref(self, ref: str) -> Optional[AriaNode]:
+        return self._by_ref.get(ref)
+
+    def by_role(self, role: str) -> List[AriaNode]:
+        return self._by_role.get(role, [])
+
+    def by_name(self, name: str, role: str = None) -> List[AriaNode]:
+        """Nodes whose accessible name equals name, ignoring case and whitespace differences."""
+        if self._by_name is None:
+            self._by_name = {}
+            for node in self.nodes:
+                if node.name:
+                    self._by_name.setdefault(_normalize(node.name), []).append(node)
+        nodes = self._by_name.get(_normalize(name), [])
+        return [node for node in nodes if node.role == role] if role else nodes
+
+    def find_text(self, query: str, role: str = None) -> List[AriaNode]:
+        """Nodes whose name or text contains query (case-insensitive), in document order."""
+        needle = _normalize(query)
+        words = _WORD.findall(needle)
+        if words:
+            by_word = self._word_index()
+            # Inner words of the query are whole words of a match; the outer ones may be cut off
+            if len(words) == 1:
+                matching = [[word for word in self._words if words[0] in word]]
+            else:
+                suffixed = _with_prefix(self._reversed_words, words[0][::-1])
+                matching = [[word[::-1] for word in suffixed], _with_prefix(self._words, words[-1])]
+            postings = [by_word.get(word, []) for word in words[1:-1]]
+            postings += [[node for word in group for node in by_word[word]] for group in matching]
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates.intersection_update(posting)
+                if not candidates:
+                    return []
+            nodes = sorted(candidates, key=lambda node: node.index)
+        else:
+            nodes = self.nodes
+        return [
+            node
+            for node in nodes
+            if (role is None or node.role == role)
+            and (needle in _normalize(node.name) or needle in _normalize(node.text))
+        ]
+
+    def _word_index(self) -> Dict[str, List[AriaNode]]:
+        if self._by_word is None:
+            self._by_word = {}
+            for node in self.nodes:
+                text = f"{node.name} {node.text}" if node.text else node.name
+                for word in set(_WORD.findall(text.casefold())):
+                    self._by_word.setdefault(word, []).append(node)
+            self._words = sorted(self._by_word)
+            self._reversed_words = sorted(word[::-1] for word in self._by_word)
+        return self._by_word
+
+    def roles(self) -> Counter:
+        return Counter({role: len(nodes) for role, nodes in self._by_role.items()})
+
+    def render(self, node: AriaNode = None) -> str:
+        """YAML of the node's subtree (the whole tree by default), in the snapshot format."""
+        lines: List[str] = []
+        for root in [node] if node else self.roots:
+            _render(root, 0, lines)
+        return "\n".join(lines)
+
+
+def extract_cypress_snapshot(output: str) -> Optional[str]:
+    """The ARIA snapshot section the Cypress support code prints on failure, without its banners."""
+    start_idx = output.find(_CYPRESS_MARKER)
+    if start_idx == -1:
+        return None
+
+    marker_line_end = output.find("\n", start_idx)
+    if marker_line_end == -1:
+        return None
+
+    content_start = marker_line_end + 1
+    while content_start < len(output) and output[content_start : content_start + 80] == _SEPARATOR:
+        next_line = output.find("\n", content_start)
+        if next_line == -1:
+            return None
+        content_start = next_line + 1
+
+    end_idx = output.find(_SEPARATOR, content_start)
+    if end_idx == -1:
+        snapshot = output[content_start:].strip()
+    else:
+        snapshot = output[content_start:end_idx].strip()
+
+    return snapshot or None
+
+
+def strip_cypress_snapshots(output: str) -> str:
+    """Cypress output without its ARIA snapshot sections, leaving the errors and the run summary."""
+    kept: List[str] = []
+    lines = output.splitlines()
+    index = 0
+    while index < len(lines):
+        if "ARIA SNAPSHOT" not in lines[index]:
+            kept.append(lines[index])
+            index += 1
+            continue
+        # Drop the banner above the marker, the marker and the section up to its closing banner
+        if kept and kept[-1].startswith(_SEPARATOR):
+            kept.pop()
+        index += 1
+        while index < len(lines) and lines[index].startswith(_SEPARATOR):
+            index += 1
+        while index < len(lines) and not lines[index].startswith(_SEPARATOR):
+            index += 1
+        index += 1
+    return "\n".join(kept)
+
+
+def _with_prefix(sorted_words: List[str], prefix: str) -> List[str]:
+    start = bisect.bisect_left(sorted_words, prefix)
+    end = bisect.bisect_left(sorted_words, prefix + "\U0010ffff")
+    return sorted_words[start:end]
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+def _split_entry(rest: str) -> Tuple[str, Optional[str]]:
+    """Split `key: value` (or `key:` / `key`), unquoting a YAML-quoted key and value."""
+    if rest.startswith("'"):
+        index = 1
+        while index < len(rest):
+            if rest[index] == "'":
+                if rest.startswith("''", index):
+                    index += 2
+                    continue
+                break
+            index += 1
+        key = rest[1:index].replace("''", "'")
+        remainder = rest[index + 1 :]
+    else:
+        # Unquoted keys never contain ": "; YAML quoting would have been needed
+        colon = rest.find(": ")
+        if colon == -1:
+            key, remainder = (rest[:-1], ":") if rest.endswith(":") else (rest, "")
+        else:
+            key, remainder = rest[:colon], rest[colon:]
+    if not remainder.startswith(":"):
+        return key, None
+    value = remainder[1:].strip()
+    return key, _unquote(value) if value else None
+
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+        try:
+            return json.loads(_HEX_ESCAPE.sub(r"\\u00\1", value))
+        except json.JSONDecodeError:
+            return value[1:-1]
+    return value
+
+
+def _parse_key(node: AriaNode, key: str):
+    if key.startswith("<changed> "):
+        node.changed = True
+        key = key[len("<changed> ") :]
+    if key.startswith("ref="):
+        # "- ref=e5 [unchanged]": a subtree identical to the previous snapshot
+        ref, _, attributes = key[4:].partition(" ")
+        _parse_attributes(node, attributes)
+        node.ref = ref
+        return
+
+    role, _, rest = key.partition(" ")
+    node.role = role
+    rest = rest.lstrip()
+    name_match = _NAME.match(rest)
+    if name_match:
+        node.name = _unquote(name_match.group(0))
+        rest = rest[name_match.end() :]
+    elif rest.startswith("/"):
+        regex_match = _REGEX_NAME.match(rest)
+        if regex_match:
+            node.name = regex_match.group(1)
+            rest = rest[regex_match.end() :]
+    _parse_attributes(node, rest)
+
+
+def _parse_attributes(node: AriaNode, text: str):
+    for key, flag in _ATTRIBUTES.findall(text):
+        if node.attributes is None:
+            node.attributes = {}
+        node.attributes[key] = flag[1:] if flag else None
+        if key == "ref":
+            node.ref = flag[1:]
+
+
+def _render(node: AriaNode, depth: int, lines: List[str]):
+    indent = "  " * depth
+    key = node.describe()
+    if _needs_quotes(key):
+        key = "'" + key.replace("'", "''") + "'"
+    if node.role == TEXT_ROLE:
+        lines.append(f"{indent}- text: {_quote_value(node.text)}")
+        return
+    if not node.children and not node.props:
+        lines.append(f"{indent}- {key}: {_quote_value(node.text)}" if node.text else f"{indent}- {key}")
+        return
+    lines.append(f"{indent}- {key}:")
+    for prop, value in (node.props or {}).items():
+        lines.append(f"{indent}  - /{prop}: {_quote_value(value)}")
+    if node.text:
+        lines.append(f"{indent}  - text: {_quote_value(node.text)}")
+    for child in node.children:
+        _render(child, depth + 1, lines)
+
+
+def _quote_value(value: str) -> str:
+    return json.dumps(value, ensure_ascii=False) if _needs_quotes(value) else value
+
+
+def _needs_quotes(text: str) -> bool:
+    """The YAML quoting rules of the snapshot renderer, for the cases that occur in snapshots."""
+    return not text or text != text.strip() or text[0] in "-'\"[{&*!|>%@`" or bool(_NEEDS_QUOTES.search(text))
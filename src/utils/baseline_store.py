@@ -0,0 +1,461 @@
+"""
+ARIA snapshots of passing tests, step by step, kept as known-good references for healing.
+
+In capture mode, Cypress runs with a generated support file that loads the project's own
+support file and adds a hook. After every page command of a test, the hook takes an ARIA
+snapshot of the application with Playwright's injected script, the same renderer the MCP
+server uses. The steps of each test that passes are written to the run's capture directory;
+failing tests write nothing.
+
+The store is content-addressed: every snapshot is kept once, gzipped, under its SHA-256, however
+many steps, tests and runs share it. A per-spec index lists the recent runs of each test, by its
+describe and test titles joined with spaces, with the digests of their steps. Retention limits
+the runs kept per test, their age and the total size of the snapshots; unreferenced snapshots
+are swept.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import re
+import shutil
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from self_healing.src.utils.cypress_config import CypressConfigResolver
+
+# Configuration
+MAX_RUNS_PER_TEST = 3
+DEFAULT_MAX_AGE = 30 * 24 * 3600
+MAX_STORE_BYTES = 512 * 1024 * 1024
+# Sweeping reads every index, so it runs at most this often per process
+SWEEP_INTERVAL = 600
+# Snapshots younger than this are never swept: a concurrent capture may not have indexed them yet
+SWEEP_GRACE = 3600
+INJECTED_SCRIPT_SOURCE = "self_healing/playwright/packages/playwright-core/lib/generated/injectedScriptSource.js"
+
+# Parts of a snapshot line that differ between runs of an unchanged page
+_VOLATILE = re.compile(r" \[(?:ref=[^\]]*|cursor=[^\]]*|active)\]")
+
+# Commands that do not act on the page; no snapshot is taken after them
+_SKIPPED_COMMANDS = [
+    "as",
+    "clearCookies",
+    "clearLocalStorage",
+    "document",
+    "each",
+    "end",
+    "exec",
+    "fixture",
+    "intercept",
+    "invoke",
+    "its",
+    "log",
+    "readFile",
+    "request",
+    "session",
+    "setCookie",
+    "spread",
+    "task",
+    "then",
+    "viewport",
+    "wait",
+    "window",
+    "wrap",
+    "writeFile",
+]
+
+_CAPTURE_SUPPORT = r"""
+// Generated for a baseline capture run of self_healing; loads the project's support file first.
+__SUPPORT_REQUIRE__
+const captureDir = __CAPTURE_DIR__;
+const { source } = require(__INJECTED_SCRIPT__);
+const skipped = new Set(__SKIPPED_COMMANDS__);
+let steps = null;
+let previous = null;
+let captured = 0;
+
+function ariaSnapshot(win) {
+  if (!win.__selfHealingInjected) {
+    const options = JSON.stringify({
+      isUnderTest: false,
+      sdkLanguage: 'javascript',
+      testIdAttributeName: 'data-testid',
+      stableRafCount: 1,
+      browserName: Cypress.browser.name,
+      customEngines: [],
+    });
+    const create = `return new (module.exports.InjectedScript())(globalThis, ${options});`;
+    win.__selfHealingInjected = win.eval(`(() => { const module = {};\n${source}\n${create} })()`);
+  }
+  return win.__selfHealingInjected.ariaSnapshot(win.document.body, { mode: 'ai' });
+}
+
+beforeEach(() => {
+  steps = [];
+  previous = null;
+});
+
+Cypress.on('command:end', command => {
+  if (!steps || skipped.has(command.get('name')))
+    return;
+  let snapshot;
+  try {
+    const win = cy.state('window');
+    if (!win || !win.document || !win.document.body)
+      return;
+    snapshot = ariaSnapshot(win);
+  } catch (e) {
+    // Cross-origin or unloaded page
+    return;
+  }
+  steps.push({
+    command: command.get('name'),
+    message: String(command.get('message') || '').slice(0, 200),
+    // Unchanged since the previous step
+    snapshot: snapshot === previous ? null : snapshot,
+  });
+  previous = snapshot;
+});
+
+afterEach(function () {
+  const testSteps = steps;
+  steps = null;
+  if (!testSteps || !testSteps.length || this.currentTest.state !== 'passed')
+    return;
+  captured += 1;
+  cy.writeFile(
+    `${captureDir}/${captured}.json`,
+    { title: this.currentTest.title, titlePath: this.currentTest.titlePath(), steps: testSteps },
+    { log: false }
+  );
+});
+"""
+
+
+class BaselineStep(NamedTuple):
+    """One page command of a passing test and the snapshot taken after it."""
+
+    index: int
+    command: str
+    message: str
+    digest: str
+    title: str = ""
+    captured_at: float = 0.0
+
+    def describe(self) -> str:
+        message = f" {self.message}" if self.message else ""
+        return f"step {self.index} (cy.{self.command}{message}) of '{self.title}'"
+
+
+class CaptureStats(NamedTuple):
+    """What one capture run added to the store."""
+
+    tests: int = 0
+    steps: int = 0
+    snapshots: int = 0
+    stored: int = 0
+
+    def summary(self) -> str:
+        return (
+            f"{self.tests} passing tests, {self.steps} steps, {self.snapshots} distinct snapshots "
+            f"({self.stored} new, {self.snapshots - self.stored} already stored)"
+        )
+
+
+class BaselineStore:
+    """
+    Content-addressed snapshot objects plus a per-spec index of the recent runs of each test.
+    """
+
+    _shared: Dict[str, "BaselineStore"] = {}
+
+    def __init__(
+        self,
+        workspace_path: str,
+        max_runs: int = MAX_RUNS_PER_TEST,
+        max_age: float = DEFAULT_MAX_AGE,
+        max_bytes: int = MAX_STORE_BYTES,
+        store_dir: Path | None = None,
+    ):
+        self.workspace_path = workspace_path
+        self.max_runs = max_runs
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.store_dir = (
+            Path(store_dir) if store_dir else Path(workspace_path) / "self_healing" / "results" / "baselines"
+        ).absolute()
+        self.last_swept = 0.0
+
+    @classmethod
+    def shared(cls, workspace_path: str) -> "BaselineStore":
+        """Return the process-wide store for the workspace, creating it on first use."""
+        if workspace_path not in cls._shared:
+            cls._shared[workspace_path] = cls(workspace_path)
+        return cls._shared[workspace_path]
+
+    # Capture
+
+    def begin_capture(self) -> Optional[Path]:
+        """
+        Create a capture directory with the generated support file (support.js) for one Cypress run.
+        Returns None when the vendored Playwright has not been built, as its injected script is needed.
+        """
+        injected_script = Path(self.workspace_path) / INJECTED_SCRIPT_SOURCE
+        if not injected_script.exists():
+            print(f"⚠️ {INJECTED_SCRIPT_SOURCE} not found (build the vendored Playwright), not capturing baselines")
+            return None
+        capture_dir = self.store_dir / "captures" / uuid.uuid4().hex
+        capture_dir.mkdir(parents=True)
+        support_file = self._support_file()
+        support_require = f"require({json.dumps(str(support_file))});" if support_file else ""
+        script = (
+            _CAPTURE_SUPPORT.replace("__SUPPORT_REQUIRE__", support_require)
+            .replace("__CAPTURE_DIR__", json.dumps(str(capture_dir)))
+            .replace("__INJECTED_SCRIPT__", json.dumps(str(injected_script.absolute())))
+            .replace("__SKIPPED_COMMANDS__", json.dumps(_SKIPPED_COMMANDS))
+        )
+        (capture_dir / "support.js").write_text(script.lstrip(), encoding="utf-8")
+        return capture_dir
+
+    def finish_capture(self, test_file_path: str, capture_dir: Path) -> CaptureStats:
+        """Store the steps of the tests that passed in the capture run, then remove the capture directory."""
+        try:
+            return self.ingest(test_file_path, capture_dir)
+        finally:
+            self.discard_capture(capture_dir)
+
+    @staticmethod
+    def discard_capture(capture_dir: Path) -> None:
+        shutil.rmtree(capture_dir, ignore_errors=True)
+
+    def ingest(self, test_file_path: str, capture_dir: Path) -> CaptureStats:
+        captures = []
+        for path in sorted(capture_dir.glob("*.json"), key=lambda path: int(path.stem) if path.stem.isdigit() else 0):
+            try:
+                captures.append(json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, json.JSONDecodeError):
+                continue
+        if not captures:
+            return CaptureStats()
+
+        now = time.time()
+        index = self._load_index(test_file_path)
+        digests: Set[str] = set()
+        stored = steps_count = 0
+        for capture in captures:
+            steps, snapshot = [], None
+            for step in capture.get("steps", []):
+                snapshot = step.get("snapshot") if step.get("snapshot") is not None else snapshot
+                if snapshot is None:
+                    continue
+                digest = hashlib.sha256(snapshot.encode("utf-8")).hexdigest()
+                if digest not in digests:
+                    digests.add(digest)
+                    stored += self._write_object(digest, snapshot)
+                steps.append([step.get("command", ""), step.get("message", ""), digest])
+            if not steps:
+                continue
+            steps_count += len(steps)
+            # Keyed like SpecTest.full_title, so tests of the same title in different describe blocks stay apart
+            runs = index["tests"].setdefault(" ".join(capture.get("titlePath") or [capture["title"]]), [])
+            if runs and [step[2] for step in runs[0]["steps"]] == [step[2] for step in steps]:
+                # The page went through the same states as in the latest run
+                runs[0]["captured_at"] = now
+            else:
+                runs.insert(0, {"captured_at": now, "steps": steps})
+            del runs[self.max_runs :]
+
+        self._expire(index, now)
+        self._save_index(test_file_path, index)
+        if now - self.last_swept > SWEEP_INTERVAL:
+            self.sweep()
+        return CaptureStats(len(captures), steps_count, len(digests), stored)
+
+    def _support_file(self) -> Optional[Path]:
+        """The project's support entry file, as Cypress resolves the supportFile setting."""
+        pattern = CypressConfigResolver.shared(self.workspace_path).config().support_file
+        if not pattern:
+            return None
+        # "cypress/support/e2e.{js,jsx,ts,tsx}" -> the first of the alternatives that exists
+        match = re.search(r"\{([^}]*)\}", pattern)
+        alternatives = (
+            [pattern[: match.start()] + option + pattern[match.end() :] for option in match.group(1).split(",")]
+            if match
+            else [pattern]
+        )
+        for alternative in alternatives:
+            path = Path(self.workspace_path) / alternative
+            if path.is_file():
+                return path.absolute()
+        return None
+
+    # Lookups
+
+    def steps(self, test_file_path: str, full_title: str = None) -> List[BaselineStep]:
+        """Steps of the latest passing run of the test (by its SpecTest.full_title), or of every test of the spec."""
+        index = self._load_index(test_file_path)
+        tests = index["tests"]
+        if full_title is not None:
+            tests = {full_title: tests[full_title]} if full_title in tests else {}
+        return [
+            BaselineStep(number, command, message, digest, title, runs[0]["captured_at"])
+            for title, runs in tests.items()
+            if runs
+            for number, (command, message, digest) in enumerate(runs[0]["steps"], 1)
+        ]
+
+    def snapshot(self, digest: str) -> Optional[str]:
+        try:
+            return gzip.decompress(self._object_path(digest).read_bytes()).decode("utf-8")
+        except (OSError, EOFError):
+            return None
+
+    def closest(
+        self, test_file_path: str, current_snapshot: str, full_title: str = None
+    ) -> Optional[Tuple[str, BaselineStep]]:
+        """
+        The stored snapshot most similar to the current one, i.e. the page as it was at the failing
+        step in the passing run, with the step it was taken after. Similarity is the overlap of the
+        snapshots' lines, ignoring refs and other per-run details.
+        """
+        steps = self.steps(test_file_path, full_title)
+        if not steps:
+            return None
+        current_lines = _lines(current_snapshot)
+        best: Optional[Tuple[float, str, BaselineStep]] = None
+        seen: Set[str] = set()
+        for step in steps:
+            if step.digest in seen:
+                continue
+            seen.add(step.digest)
+            snapshot = self.snapshot(step.digest)
+            if snapshot is None:
+                continue
+            lines = _lines(snapshot)
+            union = len(current_lines | lines)
+            similarity = len(current_lines & lines) / union if union else 1.0
+            if best is None or similarity > best[0]:
+                best = (similarity, snapshot, step)
+        return (best[1], best[2]) if best else None
+
+    # Retention
+
+    def sweep(self) -> None:
+        """Apply the age limit to every index, delete unreferenced snapshots and enforce the size limit."""
+        self.last_swept = now = time.time()
+        indexes = {}
+        for path in (self.store_dir / "index").glob("*.json"):
+            try:
+                index = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError):
+                continue
+            if self._expire(index, now):
+                self._save_index(index["spec"], index)
+            indexes[index["spec"]] = index
+
+        references: Counter = Counter(
+            step[2]
+            for index in indexes.values()
+            for runs in index["tests"].values()
+            for run in runs
+            for step in run["steps"]
+        )
+        sizes: Dict[str, int] = {}
+        for path in (self.store_dir / "objects").glob("*/*.yaml.gz"):
+            digest = path.name.split(".")[0]
+            stat = path.stat()
+            if digest not in references and now - stat.st_mtime > SWEEP_GRACE:
+                path.unlink(missing_ok=True)
+            else:
+                sizes[digest] = stat.st_size
+
+        total = sum(sizes.values())
+        if total <= self.max_bytes:
+            return
+        # Drop runs, oldest first and latest runs of a test last, until the snapshots fit
+        runs = sorted(
+            (
+                (position == 0, run["captured_at"], spec, title, run)
+                for spec, index in indexes.items()
+                for title, test_runs in index["tests"].items()
+                for position, run in enumerate(test_runs)
+            ),
+            key=lambda entry: entry[:2],
+        )
+        changed: Set[str] = set()
+        for _, _, spec, title, run in runs:
+            if total <= self.max_bytes:
+                break
+            tests = indexes[spec]["tests"]
+            tests[title].remove(run)
+            if not tests[title]:
+                del tests[title]
+            changed.add(spec)
+            for _, _, digest in run["steps"]:
+                references[digest] -= 1
+                if references[digest] == 0 and digest in sizes:
+                    self._object_path(digest).unlink(missing_ok=True)
+                    total -= sizes.pop(digest)
+        for spec in changed:
+            self._save_index(spec, indexes[spec])
+        print(f"📸 Baseline store trimmed to {total / 1024 / 1024:.1f} MB")
+
+    def _expire(self, index: Dict[str, Any], now: float) -> bool:
+        """Drop runs past the maximum age; returns whether anything was dropped."""
+        expired = False
+        for title in list(index["tests"]):
+            runs = [run for run in index["tests"][title] if now - run["captured_at"] <= self.max_age]
+            expired |= len(runs) != len(index["tests"][title])
+            if runs:
+                index["tests"][title] = runs
+            else:
+                del index["tests"][title]
+        return expired
+
+    # Storage
+
+    def _index_path(self, test_file_path: str) -> Path:
+        digest = hashlib.sha256(test_file_path.encode("utf-8")).hexdigest()[:16]
+        return self.store_dir / "index" / f"{digest}.json"
+
+    def _object_path(self, digest: str) -> Path:
+        return self.store_dir / "objects" / digest[:2] / f"{digest}.yaml.gz"
+
+    def _load_index(self, test_file_path: str) -> Dict[str, Any]:
+        try:
+            return json.loads(self._index_path(test_file_path).read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return {"spec": test_file_path, "tests": {}}
+
+    def _save_index(self, test_file_path: str, index: Dict[str, Any]) -> None:
+        path = self._index_path(test_file_path)
+        if not index["tests"]:
+            path.unlink(missing_ok=True)
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = path.with_suffix(f".{uuid.uuid4().hex[:8]}.tmp")
+        temporary_path.write_text(json.dumps(index, ensure_ascii=False), encoding="utf-8")
+        temporary_path.replace(path)
+
+    def _write_object(self, digest: str, snapshot: str) -> bool:
+        """Store the snapshot unless it already is; returns whether it was new."""
+        path = self._object_path(digest)
+        if path.exists():
+            # Refresh the mtime so a concurrent sweep keeps it until it is indexed
+            path.touch()
+            return False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = path.with_suffix(f".{uuid.uuid4().hex[:8]}.tmp")
+        temporary_path.write_bytes(gzip.compress(snapshot.encode("utf-8")))
+        temporary_path.replace(path)
+        return True
+
+
+def _lines(snapshot: str) -> Set[str]:
+    return {_VOLATILE.sub("", line).strip() for line in snapshot.splitlines()}
@@ -0,0 +1,261 @@
+"""
+Named profiles of third-party hosts (analytics, chat widgets, ad tags) to block in healing sessions.
+
+Blocked hosts are passed to the Playwright MCP server with --blocked-origins, which aborts their
+requests with route blocking, and optionally to Cypress validation runs as blockHosts. Profiles
+are built in and can be extended or overridden per workspace in
+self_healing/blocking_profiles.json, e.g. {"internal": ["*.tracking.example.com"]}.
+
+Since blocked requests never happen, what they would have cost is measured separately: the
+spec's start page is loaded once with and once without the profile's hosts.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+from urllib.parse import urlparse
+
+# Configuration
+PROFILES_FILE = "self_healing/blocking_profiles.json"
+DEFAULT_PROBE_TIMEOUT = 90
+# Third-party tags usually load after the load event; give them this long to finish
+SETTLE_TIMEOUT = 5
+
+# Host globs as accepted by both --blocked-origins and Cypress blockHosts
+BUILTIN_PROFILES: Dict[str, List[str]] = {
+    "analytics": [
+        "*.google-analytics.com",
+        "*.googletagmanager.com",
+        "*.segment.com",
+        "*.segment.io",
+        "*.mixpanel.com",
+        "*.amplitude.com",
+        "*.hotjar.com",
+        "*.hotjar.io",
+        "*.fullstory.com",
+        "*.heap.io",
+        "*.heapanalytics.com",
+        "*.newrelic.com",
+        "*.nr-data.net",
+        "*.clarity.ms",
+    ],
+    "chat": [
+        "*.intercom.io",
+        "*.intercomcdn.com",
+        "*.intercomassets.com",
+        "*.drift.com",
+        "*.driftt.com",
+        "*.crisp.chat",
+        "*.tawk.to",
+        "*.livechatinc.com",
+        "*.zopim.com",
+        "*.olark.com",
+    ],
+    "ads": [
+        "*.doubleclick.net",
+        "*.googlesyndication.com",
+        "*.googleadservices.com",
+        "*.adnxs.com",
+        "*.criteo.com",
+        "*.criteo.net",
+        "*.taboola.com",
+        "*.outbrain.com",
+        "connect.facebook.net",
+        "*.ads-twitter.com",
+        "*.licdn.com",
+    ],
+}
+
+_VISIT = re.compile(r"""cy\.visit\(\s*(['"`])([^'"`$]+)\1""")
+
+_PROBE_SCRIPT = r"""
+const input = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+
+async function load(browser, block) {
+  const context = await browser.newContext(input.storageState ? { storageState: input.storageState } : {});
+  const matched = new Set();
+  const sizes = [];
+  let blocked = 0;
+  for (const pattern of input.patterns) {
+    await context.route(pattern, route => {
+      if (block) {
+        blocked++;
+        return route.abort('blockedbyclient');
+      }
+      matched.add(route.request());
+      return route.continue();
+    });
+  }
+  context.on('requestfinished', request => {
+    if (matched.has(request))
+      sizes.push(request.sizes().then(s => s.responseBodySize + s.responseHeadersSize).catch(() => 0));
+  });
+  const page = await context.newPage();
+  const started = Date.now();
+  await page.goto(input.url, { waitUntil: 'load', timeout: input.timeout });
+  const loadTime = Date.now() - started;
+  await page.waitForLoadState('networkidle', { timeout: input.settleTimeout }).catch(() => {});
+  const bytes = (await Promise.all(sizes)).reduce((sum, size) => sum + size, 0);
+  await context.close();
+  return { loadTime, bytes, requests: block ? blocked : sizes.length };
+}
+
+(async () => {
+  const { chromium } = require(process.argv[1]);
+  const browser = await chromium.launch({ headless: true });
+  try {
+    const open = await load(browser, false);
+    const blocked = await load(browser, true);
+    process.stdout.write(JSON.stringify({ open, blocked }));
+  } finally {
+    await browser.close();
+  }
+})().catch(e => {
+  process.stderr.write(String((e && e.message) || e).split('\n')[0]);
+  process.exit(1);
+});
+"""
+
+
+class BlockingReport(NamedTuple):
+    """What blocking the profile's hosts saves on one load of a page."""
+
+    url: str
+    blocked_requests: int = 0
+    bytes_saved: int = 0
+    load_time: float = 0.0
+    blocked_load_time: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def time_saved(self) -> float:
+        return self.load_time - self.blocked_load_time
+
+    def summary(self) -> str:
+        if self.error:
+            return f"Could not measure blocking savings on {self.url}: {self.error}"
+        return (
+            f"Blocked {self.blocked_requests} requests on {self.url}: "
+            f"{self.bytes_saved / 1024 / 1024:.2f} MB and {self.time_saved:.1f}s saved per page load "
+            f"({self.load_time:.1f}s → {self.blocked_load_time:.1f}s)"
+        )
+
+
+class BlockingProfiles:
+    """
+    Resolves profile names to the hosts they block.
+    """
+
+    def __init__(self, workspace_path: str):
+        self.workspace_path = workspace_path
+
+    def available(self) -> Dict[str, List[str]]:
+        """Built-in profiles, extended or overridden by the workspace's profiles file."""
+        profiles = dict(BUILTIN_PROFILES)
+        path = Path(self.workspace_path) / PROFILES_FILE
+        if path.exists():
+            try:
+                custom = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError) as e:
+                raise ValueError(f"Unreadable blocking profiles file {path}: {e}") from e
+            for name, hosts in custom.items():
+                if not isinstance(hosts, list) or not all(isinstance(host, str) for host in hosts):
+                    raise ValueError(f"Blocking profile '{name}' in {path} must be a list of hosts")
+                profiles[name] = hosts
+        return profiles
+
+    def hosts(self, names: List[str]) -> List[str]:
+        """Hosts blocked by the given profiles; raises ValueError for unknown names."""
+        profiles = self.available()
+        unknown = [name for name in names if name not in profiles]
+        if unknown:
+            raise ValueError(
+                f"Unknown blocking profile(s): {', '.join(unknown)} (available: {', '.join(sorted(profiles))})"
+            )
+        return sorted({host for name in names for host in profiles[name]})
+
+    @staticmethod
+    def server_args(hosts: List[str]) -> List[str]:
+        """Playwright MCP server arguments that abort requests to the hosts."""
+        return ["--blocked-origins", ";".join(hosts)] if hosts else []
+
+    @staticmethod
+    def cypress_block_hosts(hosts: List[str]) -> List[str]:
+        """Cypress blockHosts only takes hosts, so origins are reduced to theirs."""
+        return [urlparse(host).netloc if "://" in host else host for host in hosts]
+
+
+class BlockingProbe:
+    """
+    Loads a page with the vendored Playwright, with and without the blocked hosts, to measure the savings.
+    """
+
+    def __init__(self, workspace_path: str, timeout: float = DEFAULT_PROBE_TIMEOUT):
+        self.workspace_path = workspace_path
+        self.timeout = timeout
+        self.playwright_module = os.path.join(workspace_path, "self_healing/playwright/packages/playwright")
+
+    @staticmethod
+    def start_url(spec_source: str, base_url: str = None) -> Optional[str]:
+        """URL of the spec's first cy.visit() with a literal argument, resolved against baseUrl."""
+        match = _VISIT.search(spec_source)
+        if not match:
+            return base_url
+        url = match.group(2)
+        if re.match(r"[a-z][a-z0-9+.-]*:", url):
+            return url
+        return base_url.rstrip("/") + "/" + url.lstrip("/") if base_url else None
+
+    async def measure(self, url: str, hosts: List[str], storage_state_path: str = None) -> BlockingReport:
+        payload = {
+            "url": url,
+            "patterns": [_route_glob(host) for host in hosts],
+            "storageState": storage_state_path,
+            "timeout": self.timeout * 1000 / 2,
+            "settleTimeout": SETTLE_TIMEOUT * 1000,
+        }
+        process = await asyncio.create_subprocess_exec(
+            "node",
+            "-e",
+            _PROBE_SCRIPT,
+            self.playwright_module,
+            cwd=self.workspace_path,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                process.communicate(json.dumps(payload).encode("utf-8")), timeout=self.timeout
+            )
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            process.kill()
+            await process.wait()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return BlockingReport(url, error=f"timed out after {self.timeout:g}s")
+
+        try:
+            result: Dict[str, Any] = json.loads(stdout.decode("utf-8"))
+        except json.JSONDecodeError:
+            return BlockingReport(url, error=stderr.decode("utf-8", errors="replace").strip() or "node failed")
+
+        return BlockingReport(
+            url=url,
+            blocked_requests=result["blocked"]["requests"],
+            bytes_saved=result["open"]["bytes"],
+            load_time=result["open"]["loadTime"] / 1000,
+            blocked_load_time=result["blocked"]["loadTime"] / 1000,
+        )
+
+
+def _route_glob(host: str) -> str:
+    """The URL glob the MCP server routes for a --blocked-origins entry."""
+    if "://" in host:
+        return host.rstrip("/") + "/**"
+    return f"*://{host}/**"
@@ -0,0 +1,61 @@
+"""
+Builds a compact bundle of the files a web agent would otherwise Read/Grep/Glob itself:
+the spec, the local modules it imports (page objects, helpers), the Cypress support files
+(custom commands) and the Cypress config.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List
+
+from self_healing.src.utils.spec_dependencies import SpecDependencyResolver
+
+# Configuration
+MAX_FILE_CHARS = 12000
+MAX_BUNDLE_CHARS = 60000
+
+_FENCE_LANGUAGES = {".ts": "ts", ".tsx": "tsx", ".json": "json", ".mjs": "js", ".cjs": "js", ".jsx": "jsx"}
+
+
+class ContextBundle:
+    """
+    Renders a spec and its related files as Markdown code blocks, within a character budget.
+    """
+
+    def __init__(
+        self, workspace_path: str, max_file_chars: int = MAX_FILE_CHARS, max_bundle_chars: int = MAX_BUNDLE_CHARS
+    ):
+        self.resolver = SpecDependencyResolver(workspace_path)
+        self.max_file_chars = max_file_chars
+        self.max_bundle_chars = max_bundle_chars
+
+    def files(self, test_file_path: str) -> List[Path]:
+        """Files in the bundle, most relevant first: spec, config, the spec's imports, support files."""
+        files = [self.resolver.workspace_path / test_file_path, *self.resolver.config_files()]
+        files += self.resolver.imported_files(test_file_path)
+        files += self.resolver.support_files()
+        return list(dict.fromkeys(path.resolve() for path in files if path.is_file()))
+
+    def build(self, test_file_path: str) -> str:
+        sections: List[str] = []
+        omitted: List[str] = []
+        used = 0
+        for path in self.files(test_file_path):
+            relative = self.resolver.relative(path)
+            try:
+                content = path.read_text(encoding="utf-8")
+            except (OSError, UnicodeDecodeError):
+                continue
+            if len(content) > self.max_file_chars:
+                content = content[: self.max_file_chars] + f"\n// ... truncated, Read {relative} for the rest"
+            section = f"#### {relative}\n```{_FENCE_LANGUAGES.get(path.suffix, 'js')}\n{content.rstrip()}\n```\n"
+            if used + len(section) > self.max_bundle_chars:
+                omitted.append(relative)
+                continue
+            sections.append(section)
+            used += len(section)
+
+        if omitted:
+            sections.append("Not included (size limit): " + ", ".join(omitted) + "\n")
+        return "\n".join(sections)
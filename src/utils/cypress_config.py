@@ -0,0 +1,398 @@
+"""
+Resolves the Cypress settings the agents need (baseUrl, env, specPattern, supportFile) from
+cypress.config.* and cypress.env.json without running Node.
+
+Values are read from the `e2e` block first, then from the top level of the config. Only
+literals and `process.env.NAME || literal` fallbacks are evaluated; other expressions are kept
+as source text. As in Cypress, cypress.env.json overrides the config's `env`, and CYPRESS_*
+environment variables override both, except those naming a config option or the record key.
+Prompts show only the names of env values taken from environment variables. Results are cached
+per workspace and re-parsed only when a config file's mtime or size changes.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from self_healing.src.utils.cypress_transpiler import unescape_js
+from self_healing.src.utils.spec_dependencies import SpecDependencyResolver
+
+# Cypress defaults for e2e testing
+DEFAULT_SPEC_PATTERN = "cypress/e2e/**/*.cy.{js,jsx,ts,tsx}"
+DEFAULT_SUPPORT_FILE = "cypress/support/e2e.{js,jsx,ts,tsx}"
+
+ENV_FILE = "cypress.env.json"
+
+# CYPRESS_* variables that Cypress does not expose through Cypress.env(): the record key, the binary
+# install settings and the config options, compared lowercase without underscores (CYPRESS_BASE_URL = baseUrl)
+_ENV_EXCLUDED_KEYS = {"recordkey", "installbinary", "downloadmirror", "cachefolder", "runbinary", "skipbinaryinstall"}
+_CONFIG_KEYS = {
+    "animationdistancethreshold",
+    "arch",
+    "baseurl",
+    "blockhosts",
+    "browser",
+    "chromewebsecurity",
+    "clientcertificates",
+    "configfile",
+    "defaultcommandtimeout",
+    "downloadsfolder",
+    "env",
+    "excludespecpattern",
+    "exectimeout",
+    "fileserverfolder",
+    "fixturesfolder",
+    "hosts",
+    "includeshadowdom",
+    "indexhtmlfile",
+    "keystrokedelay",
+    "modifyobstructivecode",
+    "numtestskeptinmemory",
+    "pageloadtimeout",
+    "port",
+    "projectid",
+    "redirectionlimit",
+    "reporter",
+    "reporteroptions",
+    "requesttimeout",
+    "responsetimeout",
+    "retries",
+    "screenshotonrunfailure",
+    "screenshotsfolder",
+    "scrollbehavior",
+    "slowtestthreshold",
+    "specpattern",
+    "supportfile",
+    "tasktimeout",
+    "testisolation",
+    "trashassetsbeforeruns",
+    "useragent",
+    "video",
+    "videocompression",
+    "videosfolder",
+    "viewportheight",
+    "viewportwidth",
+    "waitforanimations",
+    "watchforfilechanges",
+}
+
+_STRING_PATTERN = r"""'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|`[^`$]*`"""
+_LITERAL = re.compile(rf"\s*({_STRING_PATTERN}|-?\d+(?:\.\d+)?|true|false|null|undefined)\s*$")
+_PROCESS_ENV = re.compile(rf"\s*process\.env\.(\w+)\s*(?:(?:\|\||\?\?)\s*({_STRING_PATTERN}|-?\d+(?:\.\d+)?))?\s*$")
+_CONFIG_START = re.compile(r"(?:defineConfig\s*\(|module\.exports\s*=|export\s+default)\s*\{")
+_KEY = re.compile(r"""\s*(?:(\w+)|'([^']*)'|"([^"]*)")\s*:""")
+
+
+class CypressConfig(NamedTuple):
+    """Settings resolved for the e2e testing type."""
+
+    config_file: Optional[str]
+    base_url: Optional[str]
+    env: Dict[str, Any]
+    spec_patterns: Optional[List[str]]
+    support_file: Optional[str]
+    # env keys whose values come from environment variables and may be secrets
+    os_env_keys: FrozenSet[str] = frozenset()
+
+    def matches_spec(self, test_file_path: str) -> Optional[bool]:
+        """Whether Cypress would accept the spec with --spec; None when the pattern could not be resolved."""
+        if self.spec_patterns is None:
+            return None
+        path = Path(test_file_path).as_posix().removeprefix("./")
+        return any(_glob_regex(pattern).fullmatch(path) for pattern in self.spec_patterns)
+
+    def describe(self) -> str:
+        """Short plain-text summary for agent prompts."""
+        lines = [f"- Config file: {self.config_file or 'none'}"]
+        lines.append(f"- baseUrl: {self.base_url or 'not set'}")
+        env = {key: value for key, value in self.env.items() if key not in self.os_env_keys}
+        if env:
+            lines.append("- env (Cypress.env()): " + json.dumps(env, ensure_ascii=False))
+        if self.os_env_keys:
+            lines.append("- env from environment variables (values not shown): " + ", ".join(sorted(self.os_env_keys)))
+        if self.spec_patterns:
+            lines.append("- specPattern: " + ", ".join(self.spec_patterns))
+        if self.support_file:
+            lines.append(f"- supportFile: {self.support_file}")
+        return "\n".join(lines)
+
+
+class CypressConfigResolver:
+    """
+    Parses the workspace's Cypress config once and serves the cached result until the files change.
+    """
+
+    _shared: Dict[str, "CypressConfigResolver"] = {}
+
+    def __init__(self, workspace_path: str):
+        self.workspace_path = workspace_path
+        self.dependency_resolver = SpecDependencyResolver(workspace_path)
+        self._cached: Optional[Tuple[Tuple, CypressConfig]] = None
+
+    @classmethod
+    def shared(cls, workspace_path: str) -> "CypressConfigResolver":
+        """Return the process-wide resolver for the workspace, creating it on first use."""
+        if workspace_path not in cls._shared:
+            cls._shared[workspace_path] = cls(workspace_path)
+        return cls._shared[workspace_path]
+
+    def config(self) -> CypressConfig:
+        files = self.dependency_resolver.config_files()
+        key = tuple((path.name, path.stat().st_mtime_ns, path.stat().st_size) for path in files)
+        if self._cached is None or self._cached[0] != key:
+            self._cached = (key, self._parse(files))
+        return self._cached[1]
+
+    def _parse(self, files: List[Path]) -> CypressConfig:
+        config_path = next((path for path in files if path.name != ENV_FILE), None)
+        env_path = next((path for path in files if path.name == ENV_FILE), None)
+        source = ""
+        if config_path:
+            try:
+                source = _strip_comments(config_path.read_text(encoding="utf-8"))
+            except (OSError, UnicodeDecodeError):
+                pass
+
+        top = _config_object(source) or ""
+        scopes = [block for block in [_object_block(top, "e2e")] if block is not None] + [top]
+
+        def setting(name: str) -> Optional[str]:
+            for scope in scopes:
+                expression = _property(scope, name)
+                if expression is not None:
+                    return expression
+            return None
+
+        base_url = setting("baseUrl")
+        base_url = _evaluate(base_url) if base_url is not None else None
+        env: Dict[str, Any] = {}
+        os_env_keys = set()
+        for scope in reversed(scopes):
+            block = _object_block(scope, "env")
+            if block:
+                env.update(_object_literal(block))
+                for key, expression in _top_level_entries(block):
+                    match = _PROCESS_ENV.match(expression)
+                    if match and match.group(1) in os.environ:
+                        os_env_keys.add(key)
+        if env_path:
+            try:
+                file_env = json.loads(env_path.read_text(encoding="utf-8"))
+                env.update(file_env)
+                os_env_keys.difference_update(file_env)
+            except (OSError, json.JSONDecodeError):
+                pass
+        for name, value in os.environ.items():
+            if not name.upper().startswith("CYPRESS_"):
+                continue
+            key = name[len("CYPRESS_") :]
+            normalized = key.lower().replace("_", "")
+            if normalized == "baseurl":
+                base_url = value
+            elif not (
+                normalized in _CONFIG_KEYS
+                or normalized in _ENV_EXCLUDED_KEYS
+                or normalized.startswith(("internal", "experimental"))
+            ):
+                env[key] = value
+                os_env_keys.add(key)
+
+        spec_pattern = setting("specPattern")
+        if spec_pattern is None:
+            spec_patterns = [DEFAULT_SPEC_PATTERN]
+        elif spec_pattern.startswith("["):
+            spec_patterns = _string_list(spec_pattern)
+        else:
+            value = _evaluate(spec_pattern)
+            spec_patterns = [value] if isinstance(value, str) and value != spec_pattern else None
+
+        support_file = setting("supportFile")
+        support_file = DEFAULT_SUPPORT_FILE if support_file is None else _evaluate(support_file)
+
+        return CypressConfig(
+            config_file=config_path.name if config_path else None,
+            base_url=base_url if isinstance(base_url, str) else None,
+            env=env,
+            spec_patterns=spec_patterns,
+            support_file=support_file if isinstance(support_file, str) else None,
+            os_env_keys=frozenset(os_env_keys),
+        )
+
+
+def _strip_comments(source: str) -> str:
+    """Remove // and /* */ comments, leaving strings intact."""
+    pattern = re.compile(rf"({_STRING_PATTERN})|//[^\n]*|/\*.*?\*/", re.DOTALL)
+    return pattern.sub(lambda match: match.group(1) or "", source)
+
+
+def _matching_close(source: str, start: int) -> int:
+    """Index of the bracket closing the one at start, skipping strings; -1 if unbalanced."""
+    pairs = {"{": "}", "[": "]", "(": ")"}
+    stack: List[str] = []
+    index = start
+    while index < len(source):
+        char = source[index]
+        if char in "'\"`":
+            end = index + 1
+            while end < len(source) and source[end] != char:
+                end += 2 if source[end] == "\\" else 1
+            index = end
+        elif char in pairs:
+            stack.append(pairs[char])
+        elif stack and char == stack[-1]:
+            stack.pop()
+            if not stack:
+                return index
+        index += 1
+    return -1
+
+
+def _top_level_entries(body: str) -> List[Tuple[str, str]]:
+    """Split the inside of an object literal into (key, value source) pairs at depth 0."""
+    entries = []
+    index = 0
+    while index < len(body):
+        match = _KEY.match(body, index)
+        if not match:
+            comma = _next_comma(body, index)
+            index = comma + 1 if comma != -1 else len(body)
+            continue
+        key = next(group for group in match.groups() if group is not None)
+        end = _next_comma(body, match.end())
+        end = len(body) if end == -1 else end
+        entries.append((key, body[match.end() : end].strip()))
+        index = end + 1
+    return entries
+
+
+def _next_comma(body: str, start: int) -> int:
+    index = start
+    while index < len(body):
+        char = body[index]
+        if char in "{[(":
+            close = _matching_close(body, index)
+            if close == -1:
+                return -1
+            index = close
+        elif char in "'\"`":
+            end = index + 1
+            while end < len(body) and body[end] != char:
+                end += 2 if body[end] == "\\" else 1
+            index = end
+        elif char == ",":
+            return index
+        index += 1
+    return -1
+
+
+def _config_object(source: str) -> Optional[str]:
+    """Body of the object literal passed to defineConfig() or exported by the config file."""
+    match = _CONFIG_START.search(source)
+    start = match.end() - 1 if match else source.find("{")
+    while start != -1:
+        close = _matching_close(source, start)
+        if close == -1:
+            return None
+        body = source[start + 1 : close]
+        if match or _KEY.match(body):
+            return body
+        start = source.find("{", close + 1)
+    return None
+
+
+def _property(body: str, name: str) -> Optional[str]:
+    """Source text of a property of an object literal body."""
+    for key, value in _top_level_entries(body):
+        if key == name:
+            return value
+    return None
+
+
+def _object_block(source: str, name: str) -> Optional[str]:
+    """Body of the object literal assigned to the given property, if any."""
+    expression = _property(source, name)
+    if not expression or not expression.startswith("{"):
+        return None
+    close = _matching_close(expression, 0)
+    return expression[1:close] if close != -1 else None
+
+
+def _object_literal(body: str) -> Dict[str, Any]:
+    return {key: _evaluate(value) for key, value in _top_level_entries(body)}
+
+
+def _string_list(expression: str) -> Optional[List[str]]:
+    """Strings of an array literal; None when it contains anything else."""
+    close = _matching_close(expression, 0)
+    inner = expression[1:close] if close != -1 else ""
+    if re.sub(_STRING_PATTERN, "", inner).strip(" ,\n\t"):
+        return None
+    return [_literal(token) for token in re.findall(_STRING_PATTERN, inner)] or None
+
+
+def _evaluate(expression: str) -> Any:
+    """Evaluate a literal or a process.env fallback; return other expressions as source text."""
+    match = _LITERAL.match(expression)
+    if match:
+        return _literal(match.group(1))
+    match = _PROCESS_ENV.match(expression)
+    if match:
+        name, fallback = match.groups()
+        if name in os.environ:
+            return os.environ[name]
+        return _literal(fallback) if fallback else None
+    if expression.startswith("{"):
+        close = _matching_close(expression, 0)
+        if close == len(expression) - 1:
+            return _object_literal(expression[1:close])
+    return expression
+
+
+def _literal(token: str) -> Any:
+    if token[0] in "'\"`":
+        try:
+            return unescape_js(token[1:-1])
+        except ValueError:
+            return token
+    if token in ("true", "false"):
+        return token == "true"
+    if token in ("null", "undefined"):
+        return None
+    return float(token) if "." in token else int(token)
+
+
+def _glob_regex(pattern: str) -> re.Pattern:
+    """Translate a Cypress/minimatch glob with {a,b} alternatives and ** into a regex."""
+    pattern = pattern.removeprefix("./")
+    parts = []
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        if pattern.startswith("**/", index):
+            parts.append("(?:.*/)?")
+            index += 3
+            continue
+        if pattern.startswith("**", index):
+            parts.append(".*")
+            index += 2
+            continue
+        if char == "*":
+            parts.append("[^/]*")
+        elif char == "?":
+            parts.append("[^/]")
+        elif char == "{":
+            close = pattern.find("}", index)
+            if close != -1:
+                options = pattern[index + 1 : close].split(",")
+                parts.append("(?:" + "|".join(re.escape(option) for option in options) + ")")
+                index = close + 1
+                continue
+            parts.append(re.escape(char))
+        else:
+            parts.append(re.escape(char))
+        index += 1
+    return re.compile("".join(parts))
@@ -0,0 +1,552 @@
+"""
+Translates common Cypress command chains into Playwright code, so the steps of a spec that
+still work can be executed deterministically before an agent takes over.
+
+Only a subset is supported: navigation, element queries (`cy.get`, `cy.contains`, `.find`, ...),
+actions (`.click`, `.type`, `.check`, `.select`, ...) and the usual `.should` assertions.
+Custom commands, callbacks, variables and aliases of elements are not translated; translation
+of a test stops at the first such step.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+# Configuration
+DEFAULT_ASSERTION_TIMEOUT = 4000  # ms, Cypress's defaultCommandTimeout
+
+_IDENTIFIER = re.compile(r"\.\s*([A-Za-z_$][\w$]*)\s*")
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?$")
+_REGEX = re.compile(r"/(.+)/([gimsuy]*)$")
+# Option objects made of plain keys and literal values, e.g. { force: true, timeout: 10000 }
+_SIMPLE_OBJECT = re.compile(r"\{[\s\w:'\",.\-]*\}$")
+_ESCAPE = re.compile(r"\\(u\{[0-9A-Fa-f]+\}|u[0-9A-Fa-f]{4}|x[0-9A-Fa-f]{2}|0(?![0-9])|\r\n|[^ux0-9]|.?)", re.DOTALL)
+_SINGLE_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", "v": "\v", "0": "\0"}
+_JQUERY_PSEUDOS = re.compile(r":(?:contains|eq|gt|lt|first|last|even|odd|visible|hidden|selected|checked)\b")
+_TYPE_KEYS = {
+    "enter": "Enter",
+    "esc": "Escape",
+    "backspace": "Backspace",
+    "del": "Delete",
+    "selectall": "ControlOrMeta+a",
+    "movetostart": "Home",
+    "movetoend": "End",
+    "uparrow": "ArrowUp",
+    "downarrow": "ArrowDown",
+    "leftarrow": "ArrowLeft",
+    "rightarrow": "ArrowRight",
+    "home": "Home",
+    "end": "End",
+    "pageup": "PageUp",
+    "pagedown": "PageDown",
+}
+# Commands without effect on the page
+_NO_OP_COMMANDS = {"log", "screenshot", "as"}
+
+_PRELUDE = f"""const __timeout = {DEFAULT_ASSERTION_TIMEOUT};
+const __waitUntil = async (check, what) => {{
+  const end = Date.now() + __timeout;
+  while (!(await check().catch(() => false))) {{
+    if (Date.now() > end)
+      throw new Error('Timed out retrying after ' + __timeout + 'ms: ' + what);
+    await page.waitForTimeout(100);
+  }}
+}};
+const __step = async (label, action) => {{
+  try {{
+    await action();
+  }} catch (e) {{
+    const message = String((e && e.message) || e).split('\\n').slice(0, 6).join('\\n');
+    throw new Error('Pre-execution stopped at ' + label + '\\n' + message);
+  }}
+}};
+"""
+_ISOLATION = """await page.context().clearCookies();
+await page.evaluate(() => { localStorage.clear(); sessionStorage.clear(); }).catch(() => {});
+await page.goto('about:blank');
+"""
+
+
+class Untranslatable(Exception):
+    """Raised for a Cypress command that has no deterministic Playwright equivalent here."""
+
+
+class JsRegex(NamedTuple):
+    source: str
+
+
+class JsObject(NamedTuple):
+    source: str
+
+
+class TranspiledStep(NamedTuple):
+    """A Cypress command chain and its Playwright translation (None if it could not be translated)."""
+
+    test_title: str
+    cypress: str
+    code: Optional[str]
+    reason: str = ""
+
+
+class PreExecution(NamedTuple):
+    """Playwright code that runs the translatable leading steps of one or more tests."""
+
+    code: str
+    steps: List[TranspiledStep]  # every step, translated or not
+    translated: int  # leading steps covered by the code
+
+    @property
+    def stopped_at(self) -> Optional[TranspiledStep]:
+        return self.steps[self.translated] if self.translated < len(self.steps) else None
+
+    def label(self, index: int) -> str:
+        step = self.steps[index]
+        return f'step {index + 1} of {len(self.steps)} (test "{step.test_title}"): {step.cypress}'
+
+
+class CypressTranspiler:
+    """
+    Translates Cypress command chains (as returned by SpecSplitter.steps) into Playwright statements.
+    """
+
+    def __init__(self, base_url: str = None):
+        self.base_url = base_url
+
+    def translate(self, chain: str, test_title: str = "") -> TranspiledStep:
+        try:
+            return TranspiledStep(test_title, chain, self._translate_chain(chain))
+        except Untranslatable as e:
+            return TranspiledStep(test_title, chain, None, str(e))
+
+    def pre_execution(self, tests: List[Tuple[str, List[str]]]) -> PreExecution:
+        """
+        Build code that runs the given tests' steps in order, resetting cookies and storage between
+        tests as Cypress does, and stops before the first step that cannot be translated. Each step
+        is labelled, so a failure names the Cypress command it came from.
+        """
+        steps = [self.translate(chain, title) for title, chains in tests for chain in chains]
+        translated = next((index for index, step in enumerate(steps) if step.code is None), len(steps))
+        plan = PreExecution("", steps, translated)
+
+        lines = [_PRELUDE]
+        for index, step in enumerate(steps[:translated]):
+            if index and step.test_title != steps[index - 1].test_title:
+                lines.append(_ISOLATION)
+            body = "\n".join("  " + line for line in step.code.splitlines())
+            lines.append(f"await __step({json.dumps(plan.label(index))}, async () => {{\n{body}\n}});")
+        return plan._replace(code="\n".join(lines))
+
+    def _translate_chain(self, chain: str) -> str:
+        calls = _parse_chain(chain)
+        statements: List[str] = []
+        subject: Optional[str] = None  # JS expression of the current locator, or a special subject
+        for name, args in calls:
+            values = [_parse_arg(arg) for arg in args]
+            if name in _NO_OP_COMMANDS:
+                continue
+            handler = getattr(self, f"_cmd_{name}", None)
+            if handler is None:
+                raise Untranslatable(f"unsupported command .{name}()")
+            subject = handler(subject, values, statements)
+        return "\n".join(statements) if statements else "// no browser action"
+
+    # Parent commands
+
+    def _cmd_visit(self, subject, values, statements):
+        url = _string(values, 0, "cy.visit() URL")
+        if not re.match(r"[a-z][a-z0-9+.-]*:", url):
+            if not self.base_url:
+                raise Untranslatable("relative cy.visit() URL without a baseUrl")
+            url = self.base_url.rstrip("/") + "/" + url.lstrip("/")
+        statements.append(f"await page.goto({json.dumps(url)});")
+        return None
+
+    def _cmd_get(self, subject, values, statements):
+        selector = _selector(values)
+        return f"page.locator({json.dumps(selector)})"
+
+    def _cmd_contains(self, subject, values, statements):
+        scope = _locator(subject) if subject else "page"
+        texts = [value for value in values if not isinstance(value, JsObject)]
+        if len(texts) == 2:
+            selector = _string(texts, 0, "cy.contains() selector")
+            _check_selector(selector)
+            return f"{scope}.locator({json.dumps(selector)}, {{ hasText: {_text_matcher(texts[1])} }}).first()"
+        if len(texts) == 1:
+            return f"{scope}.getByText({_text_matcher(texts[0])}).first()"
+        raise Untranslatable("cy.contains() without text")
+
+    def _cmd_focused(self, subject, values, statements):
+        return "page.locator('*:focus')"
+
+    def _cmd_url(self, subject, values, statements):
+        return "url"
+
+    def _cmd_title(self, subject, values, statements):
+        return "title"
+
+    def _cmd_wait(self, subject, values, statements):
+        if values and isinstance(values[0], (int, float)):
+            statements.append(f"await page.waitForTimeout({values[0]});")
+        elif values and isinstance(values[0], str) and values[0].startswith("@"):
+            # Intercepted requests are not tracked; wait for the network to settle instead
+            statements.append("await page.waitForLoadState('networkidle');")
+        else:
+            raise Untranslatable("unsupported cy.wait() argument")
+        return subject
+
+    def _cmd_intercept(self, subject, values, statements):
+        if len(values) > 2 or any(isinstance(value, JsObject) for value in values[1:]):
+            raise Untranslatable("cy.intercept() with a stubbed response")
+        return None  # spying only, it does not change the page
+
+    def _cmd_reload(self, subject, values, statements):
+        statements.append("await page.reload();")
+        return None
+
+    def _cmd_go(self, subject, values, statements):
+        direction = values[0] if values else None
+        if direction in ("back", -1):
+            statements.append("await page.goBack();")
+        elif direction in ("forward", 1):
+            statements.append("await page.goForward();")
+        else:
+            raise Untranslatable("unsupported cy.go() argument")
+        return None
+
+    def _cmd_viewport(self, subject, values, statements):
+        if len(values) < 2 or not all(isinstance(value, (int, float)) for value in values[:2]):
+            raise Untranslatable("cy.viewport() preset")
+        statements.append(f"await page.setViewportSize({{ width: {values[0]}, height: {values[1]} }});")
+        return None
+
+    def _cmd_clearCookies(self, subject, values, statements):
+        statements.append("await page.context().clearCookies();")
+        return None
+
+    def _cmd_clearLocalStorage(self, subject, values, statements):
+        statements.append("await page.evaluate(() => localStorage.clear());")
+        return None
+
+    # Child commands
+
+    def _cmd_find(self, subject, values, statements):
+        return f"{_locator(subject)}.locator({json.dumps(_selector(values))})"
+
+    def _cmd_first(self, subject, values, statements):
+        return f"{_locator(subject)}.first()"
+
+    def _cmd_last(self, subject, values, statements):
+        return f"{_locator(subject)}.last()"
+
+    def _cmd_eq(self, subject, values, statements):
+        if not values or not isinstance(values[0], int):
+            raise Untranslatable(".eq() without an index")
+        return f"{_locator(subject)}.nth({values[0]})"
+
+    def _cmd_parent(self, subject, values, statements):
+        return f"{_locator(subject)}.locator('..')"
+
+    def _cmd_children(self, subject, values, statements):
+        selector = _selector(values) if values else "*"
+        return f"{_locator(subject)}.locator({json.dumps(':scope > ' + selector)})"
+
+    def _cmd_click(self, subject, values, statements):
+        statements.append(f"await {_locator(subject)}.click({_action_options(values)});")
+        return subject
+
+    def _cmd_dblclick(self, subject, values, statements):
+        statements.append(f"await {_locator(subject)}.dblclick({_action_options(values)});")
+        return subject
+
+    def _cmd_rightclick(self, subject, values, statements):
+        force = ", force: true" if _action_options(values) else ""
+        statements.append(f"await {_locator(subject)}.click({{ button: 'right'{force} }});")
+        return subject
+
+    def _cmd_type(self, subject, values, statements):
+        locator = _locator(subject)
+        text = values[0] if values else None
+        if isinstance(text, (int, float)):
+            text = str(text)
+        if not isinstance(text, str):
+            raise Untranslatable(".type() without literal text")
+        for literal, key in re.findall(r"([^{]+|\{\{\})|\{(\w+)\}", text):
+            if literal:
+                literal = "{" if literal == "{{}" else literal
+                statements.append(f"await {locator}.pressSequentially({json.dumps(literal)});")
+            elif key.lower() in _TYPE_KEYS:
+                statements.append(f"await {locator}.press({json.dumps(_TYPE_KEYS[key.lower()])});")
+            else:
+                raise Untranslatable(f"unsupported .type() key {{{key}}}")
+        return subject
+
+    def _cmd_clear(self, subject, values, statements):
+        statements.append(f"await {_locator(subject)}.clear();")
+        return subject
+
+    def _cmd_check(self, subject, values, statements):
+        statements.append(f"await {_locator(subject)}.check({_action_options(values)});")
+        return subject
+
+    def _cmd_uncheck(self, subject, values, statements):
+        statements.append(f"await {_locator(subject)}.uncheck({_action_options(values)});")
+        return subject
+
+    def _cmd_select(self, subject, values, statements):
+        option = _string(values, 0, ".select() value")
+        statements.append(f"await {_locator(subject)}.selectOption({json.dumps(option)});")
+        return subject
+
+    def _cmd_focus(self, subject, values, statements):
+        statements.append(f"await {_locator(subject)}.focus();")
+        return subject
+
+    def _cmd_blur(self, subject, values, statements):
+        statements.append(f"await {_locator(subject)}.blur();")
+        return subject
+
+    def _cmd_trigger(self, subject, values, statements):
+        event = _string(values, 0, ".trigger() event")
+        statements.append(f"await {_locator(subject)}.dispatchEvent({json.dumps(event)});")
+        return subject
+
+    def _cmd_scrollIntoView(self, subject, values, statements):
+        statements.append(f"await {_locator(subject)}.scrollIntoViewIfNeeded();")
+        return subject
+
+    def _cmd_should(self, subject, values, statements):
+        chainer = _string(values, 0, ".should() chainer")
+        statements.append(_assertion(subject, chainer, values[1:]))
+        return subject
+
+    _cmd_and = _cmd_should
+
+
+def _parse_chain(chain: str) -> List[Tuple[str, List[str]]]:
+    """Split `cy.a(x).b(y, z)` into [("a", ["x"]), ("b", ["y", "z"])]."""
+    if not chain.startswith("cy"):
+        raise Untranslatable("not a cy command chain")
+    calls = []
+    index = 2
+    while index < len(chain):
+        match = _IDENTIFIER.match(chain, index)
+        if not match:
+            raise Untranslatable(f"cannot parse {chain[index:][:40]}")
+        name = match.group(1)
+        index = match.end()
+        args: List[str] = []
+        if index < len(chain) and chain[index] == "(":
+            close = _closing(chain, index)
+            args = _split_args(chain[index + 1 : close])
+            index = close + 1
+        calls.append((name, args))
+        while index < len(chain) and chain[index] in " ;":
+            index += 1
+    return calls
+
+
+def _skip_string(text: str, index: int) -> int:
+    """Index just after the string literal starting at index."""
+    quote = text[index]
+    index += 1
+    while index < len(text) and text[index] != quote:
+        index += 2 if text[index] == "\\" else 1
+    return index + 1
+
+
+def _closing(text: str, open_index: int) -> int:
+    depth = 0
+    index = open_index
+    while index < len(text):
+        char = text[index]
+        if char in "'\"`":
+            index = _skip_string(text, index)
+            continue
+        if char in "([{":
+            depth += 1
+        elif char in ")]}":
+            depth -= 1
+            if depth == 0:
+                return index
+        index += 1
+    raise Untranslatable("unbalanced brackets")
+
+
+def _split_args(source: str) -> List[str]:
+    args, depth, start, index = [], 0, 0, 0
+    while index < len(source):
+        char = source[index]
+        if char in "'\"`":
+            index = _skip_string(source, index)
+            continue
+        if char in "([{":
+            depth += 1
+        elif char in ")]}":
+            depth -= 1
+        elif char == "," and depth == 0:
+            args.append(source[start:index].strip())
+            start = index + 1
+        index += 1
+    if source[start:].strip():
+        args.append(source[start:].strip())
+    return args
+
+
+def _parse_arg(source: str):
+    if len(source) >= 2 and source[0] in "'\"`" and source[-1] == source[0] and _skip_string(source, 0) == len(source):
+        if source[0] == "`" and "${" in source:
+            raise Untranslatable("template literal with expressions")
+        try:
+            return unescape_js(source[1:-1])
+        except ValueError as e:
+            raise Untranslatable(str(e)) from None
+    if _NUMBER.match(source):
+        return float(source) if "." in source else int(source)
+    if source in ("true", "false"):
+        return source == "true"
+    if _REGEX.match(source):
+        return JsRegex(source)
+    if _SIMPLE_OBJECT.match(source):
+        return JsObject(source)
+    raise Untranslatable(f"non-literal argument {source[:40]}")
+
+
+def unescape_js(body: str) -> str:
+    """
+    The value of a JavaScript string literal's body: \\n, \\t, \\xHH, \\uHHHH, \\u{...} and the
+    other escapes are decoded, any other escaped character stands for itself and an escaped line
+    break is dropped. Raises ValueError for malformed hex and unicode escapes and legacy octal ones.
+    """
+
+    def decode(match: re.Match) -> str:
+        escape = match.group(1)
+        if escape in _SINGLE_ESCAPES:
+            return _SINGLE_ESCAPES[escape]
+        if escape.startswith("u{"):
+            return chr(int(escape[2:-1], 16))
+        if escape[:1] in ("u", "x") and len(escape) > 1:
+            return chr(int(escape[1:], 16))
+        if escape in ("\n", "\r", "\r\n", "\u2028", "\u2029"):
+            return ""
+        if not escape or escape in "ux" or escape.isdigit():
+            raise ValueError(f"unsupported escape sequence \\{escape}")
+        return escape
+
+    value = _ESCAPE.sub(decode, body)
+    # \uD83D\uDE00 escapes a character outside the BMP as a surrogate pair
+    return value.encode("utf-16", "surrogatepass").decode("utf-16") if re.search("[\ud800-\udfff]", value) else value
+
+
+def _string(values, index: int, what: str) -> str:
+    if len(values) <= index or not isinstance(values[index], str):
+        raise Untranslatable(f"{what} is not a string literal")
+    return values[index]
+
+
+def _check_selector(selector: str) -> None:
+    if selector.startswith("@"):
+        raise Untranslatable("element alias")
+    if _JQUERY_PSEUDOS.search(selector):
+        raise Untranslatable("jQuery-only selector")
+
+
+def _selector(values) -> str:
+    selector = _string(values, 0, "selector")
+    _check_selector(selector)
+    return selector
+
+
+def _locator(subject: Optional[str]) -> str:
+    if not subject or subject in ("url", "title"):
+        raise Untranslatable("command needs an element subject")
+    return subject
+
+
+def _text_matcher(value) -> str:
+    if isinstance(value, JsRegex):
+        return value.source
+    if isinstance(value, (int, float)):
+        value = str(value)
+    if not isinstance(value, str):
+        raise Untranslatable("text is not a literal")
+    return json.dumps(value)
+
+
+def _action_options(values) -> str:
+    options = next((value for value in values if isinstance(value, JsObject)), None)
+    if any(not isinstance(value, JsObject) for value in values):
+        raise Untranslatable("positional action arguments")
+    if options and re.search(r"\bmultiple\s*:\s*true", options.source):
+        raise Untranslatable("action on multiple elements")
+    return "{ force: true }" if options and re.search(r"\bforce\s*:\s*true", options.source) else ""
+
+
+def _assertion(subject: Optional[str], chainer: str, args: list) -> str:
+    """Translate a .should() chainer into a retried check, as Cypress retries assertions."""
+    expected = args[0] if args else None
+    if len(args) > (2 if chainer == "have.attr" else 1):
+        raise Untranslatable(f"unsupported .should('{chainer}') arguments")
+    if subject in ("url", "title"):
+        actual = "page.url()" if subject == "url" else "(await page.title())"
+        checks = {
+            "include": lambda: f"{actual}.includes({_text_matcher(expected)})",
+            "contain": lambda: f"{actual}.includes({_text_matcher(expected)})",
+            "eq": lambda: f"{actual} === {_text_matcher(expected)}",
+            "equal": lambda: f"{actual} === {_text_matcher(expected)}",
+            "not.include": lambda: f"!{actual}.includes({_text_matcher(expected)})",
+            "match": lambda: f"{_text_matcher(expected)}.test({actual})",
+        }
+    else:
+        locator = _locator(subject)
+        first = f"{locator}.first()"
+        text = f"((await {first}.textContent()) || '')"
+        checks = {
+            "be.visible": lambda: f"await {first}.isVisible()",
+            "not.be.visible": lambda: f"!(await {first}.isVisible())",
+            "exist": lambda: f"(await {locator}.count()) > 0",
+            "not.exist": lambda: f"(await {locator}.count()) === 0",
+            "contain": lambda: _contains(text, expected),
+            "contain.text": lambda: _contains(text, expected),
+            "include.text": lambda: _contains(text, expected),
+            "not.contain": lambda: f"!({_contains(text, expected)})",
+            "have.text": lambda: f"{text} === {_text_matcher(expected)}",
+            "have.value": lambda: f"(await {first}.inputValue()) === {_text_matcher(expected)}",
+            "be.checked": lambda: f"await {first}.isChecked()",
+            "not.be.checked": lambda: f"!(await {first}.isChecked())",
+            "be.disabled": lambda: f"await {first}.isDisabled()",
+            "be.enabled": lambda: f"await {first}.isEnabled()",
+            "not.be.disabled": lambda: f"await {first}.isEnabled()",
+            "have.length": lambda: f"(await {locator}.count()) === {_number(expected)}",
+            "have.length.gt": lambda: f"(await {locator}.count()) > {_number(expected)}",
+            "have.length.greaterThan": lambda: f"(await {locator}.count()) > {_number(expected)}",
+            "have.attr": lambda: _attribute(first, *args),
+            "have.class": lambda: (
+                f"((await {first}.getAttribute('class')) || '').split(/\\s+/).includes({_text_matcher(expected)})"
+            ),
+        }
+    if chainer not in checks:
+        raise Untranslatable(f"unsupported assertion '{chainer}'")
+    what = f"expected to {chainer}" + (f" {json.dumps(expected)}" if isinstance(expected, (str, int, float)) else "")
+    return f"await __waitUntil(async () => {checks[chainer]()}, {json.dumps(what)});"
+
+
+def _contains(text: str, expected) -> str:
+    if isinstance(expected, JsRegex):
+        return f"{expected.source}.test({text})"
+    return f"{text}.includes({_text_matcher(expected)})"
+
+
+def _number(value) -> str:
+    if not isinstance(value, int):
+        raise Untranslatable("length is not a number")
+    return str(value)
+
+
+def _attribute(first: str, name, value=None) -> str:
+    if not isinstance(name, str):
+        raise Untranslatable("attribute name is not a string")
+    actual = f"(await {first}.getAttribute({json.dumps(name)}))"
+    return f"{actual} !== null" if value is None else f"{actual} === {_text_matcher(value)}"
@@ -0,0 +1,72 @@
+"""
+Git helpers for restricting a heal run to the specs affected by a revision range.
+"""
+
+from __future__ import annotations
+
+import subprocess
+from pathlib import Path
+from typing import Iterable, List, Set
+
+from self_healing.src.utils.spec_dependencies import SpecDependencyResolver
+
+
+class GitChangeDetector:
+    """
+    Maps the files changed in a git revision range onto the specs that depend on them.
+    """
+
+    def __init__(self, workspace_path: str):
+        self.workspace_path = workspace_path
+        self.resolver = SpecDependencyResolver(workspace_path)
+
+    def changed_files(self, revision_range: str) -> Set[Path]:
+        """
+        Return absolute paths of files changed in the range.
+        Accepts anything `git diff` does: "main..HEAD", "origin/main...HEAD", or a single
+        revision such as "HEAD~1" (compared against the working tree).
+        """
+        repo_root = Path(self._git("rev-parse", "--show-toplevel").strip())
+        output = self._git("diff", "--name-only", revision_range, "--")
+        return {(repo_root / line).resolve() for line in output.splitlines() if line.strip()}
+
+    def untracked_files(self) -> Set[Path]:
+        """Return absolute paths of untracked files that are not ignored, e.g. specs not added yet."""
+        repo_root = Path(self._git("rev-parse", "--show-toplevel").strip())
+        output = self._git("ls-files", "--others", "--exclude-standard", "--full-name")
+        return {(repo_root / line).resolve() for line in output.splitlines() if line.strip()}
+
+    def affected_specs(self, test_file_paths: Iterable[str], revision_range: str) -> List[str]:
+        """Return the specs that changed themselves or depend on a changed import, support or config file."""
+        test_file_paths = list(test_file_paths)
+        changed = self.changed_files(revision_range)
+        if ".." not in revision_range:
+            # A single revision is compared against the working tree, whose new specs git diff does not list
+            spec_paths = {(Path(self.workspace_path) / path).resolve() for path in test_file_paths}
+            changed |= self.untracked_files() & spec_paths
+        print(f"Git changes in {revision_range}: {len(changed)} files")
+        if not changed:
+            return []
+
+        affected = []
+        for test_file_path in test_file_paths:
+            dependencies = self.resolver.dependency_files(test_file_path)
+            changed_dependencies = [path for path in dependencies if path in changed]
+            if changed_dependencies:
+                reason = ", ".join(self.resolver.relative_all(changed_dependencies[:3]))
+                if len(changed_dependencies) > 3:
+                    reason += f" (+{len(changed_dependencies) - 3} more)"
+                print(f"  ↳ {test_file_path}: {reason}")
+                affected.append(test_file_path)
+        return affected
+
+    def _git(self, *args: str) -> str:
+        result = subprocess.run(
+            ["git", *args],
+            cwd=self.workspace_path,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"git {' '.join(args)} failed: {result.stderr.strip()}")
+        return result.stdout
@@ -0,0 +1,113 @@
+"""
+Per-spec HAR recordings of application traffic, replayed in later web agent sessions.
+
+The first browser session of a spec records its traffic (recordHar, configured through the MCP
+server's --config). Later sessions of the same spec route requests from that HAR (routeFromHAR,
+installed through --init-page), so recorded responses are served locally; requests missing from
+the HAR still go to the network. A HAR is dropped when it is older than the maximum age.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+# Configuration
+DEFAULT_MAX_AGE = 4 * 3600
+# The HAR is written when the session's browser context closes, shortly after the agent session ends
+HAR_WRITE_TIMEOUT = 15
+
+
+class HarStore:
+    """
+    Tracks the HAR file of each spec and which specs are currently being recorded.
+    """
+
+    _shared: Dict[str, "HarStore"] = {}
+
+    def __init__(self, workspace_path: str, max_age: float = DEFAULT_MAX_AGE, har_dir: Path | None = None):
+        self.workspace_path = workspace_path
+        self.max_age = max_age
+        self.har_dir = Path(har_dir) if har_dir else Path(workspace_path) / "self_healing" / "results" / "har"
+        self.recording: Set[str] = set()
+
+    @classmethod
+    def shared(cls, workspace_path: str, max_age: float = DEFAULT_MAX_AGE) -> "HarStore":
+        """Return the process-wide store for the workspace, creating it on first use."""
+        if workspace_path not in cls._shared:
+            cls._shared[workspace_path] = cls(workspace_path, max_age=max_age)
+        return cls._shared[workspace_path]
+
+    def path(self, test_file_path: str) -> Path:
+        digest = hashlib.sha256(test_file_path.encode("utf-8")).hexdigest()[:16]
+        return (self.har_dir / f"har_{digest}.har").absolute()
+
+    def valid_har(self, test_file_path: str) -> Optional[Path]:
+        """Return the spec's HAR if it can be replayed, removing it if it is stale."""
+        path = self.path(test_file_path)
+        if test_file_path in self.recording or not path.exists():
+            return None
+        age = time.time() - path.stat().st_mtime
+        if age > self.max_age:
+            print(f"🗂️ Discarding HAR of {test_file_path} (older than {self.max_age:g}s)")
+            self.invalidate(test_file_path)
+            return None
+        return path
+
+    def begin_record(self, test_file_path: str) -> Optional[Path]:
+        """Claim the recording for the spec; returns where to record, or None if a session already records it."""
+        if test_file_path in self.recording:
+            return None
+        self.recording.add(test_file_path)
+        self.har_dir.mkdir(parents=True, exist_ok=True)
+        return self.path(test_file_path)
+
+    async def finish_record(self, test_file_path: str) -> None:
+        """Wait for the HAR the MCP server writes when it shuts down, then release the claim and report it."""
+        path = self.path(test_file_path)
+        deadline = time.monotonic() + HAR_WRITE_TIMEOUT
+        while not path.exists() and time.monotonic() < deadline:
+            await asyncio.sleep(0.5)
+        self.recording.discard(test_file_path)
+        entries = self._entry_count(path)
+        if not entries:
+            print(f"🗂️ No traffic was recorded for {test_file_path}")
+            self.invalidate(test_file_path)
+            return
+        size = path.stat().st_size / 1024 / 1024
+        print(f"🗂️ Recorded {entries} requests ({size:.1f} MB) for later sessions of {test_file_path}")
+
+    def invalidate(self, test_file_path: str) -> None:
+        self.path(test_file_path).unlink(missing_ok=True)
+
+    def record_args(self, har_path: Path) -> List[str]:
+        """MCP server arguments that record the session's traffic into har_path when its context closes."""
+        config_path = har_path.with_suffix(".config.json")
+        config = {"browser": {"contextOptions": {"recordHar": {"path": str(har_path), "content": "embed"}}}}
+        config_path.write_text(json.dumps(config, indent=2), encoding="utf-8")
+        return ["--config", str(config_path)]
+
+    def replay_args(self, har_path: Path) -> List[str]:
+        """MCP server arguments that serve recorded responses from har_path, falling back to the network."""
+        # CommonJS regardless of the workspace package.json "type"
+        init_page_path = har_path.with_suffix(".init.cjs")
+        init_page_path.write_text(
+            "module.exports = {\n"
+            "  default: async ({ page }) => {\n"
+            f"    await page.routeFromHAR({json.dumps(str(har_path))}, {{ notFound: 'fallback' }});\n"
+            "  },\n"
+            "};\n",
+            encoding="utf-8",
+        )
+        return ["--init-page", str(init_page_path)]
+
+    @staticmethod
+    def _entry_count(path: Path) -> int:
+        try:
+            return len(json.loads(path.read_text(encoding="utf-8"))["log"]["entries"])
+        except (OSError, json.JSONDecodeError, KeyError, TypeError):
+            return 0
@@ -0,0 +1,260 @@
+"""
+Deterministic replay of the Playwright code a web agent ran.
+
+After each whole-spec web agent session, the Playwright code of its browser tool calls is
+recorded as a flow. Replaying a flow runs that code in order with the vendored Playwright, no
+LLM involved, and stops at the first step that fails, capturing an ARIA snapshot of the page at
+that point. A flow that still replays shows the page behaves as it did when it was explored.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from self_healing.src.utils.conversation_extractor import ToolCall
+
+# Configuration
+DEFAULT_STEP_TIMEOUT = 10
+DEFAULT_REPLAY_TIMEOUT = 300
+MAX_SNAPSHOT_CHARS = 10000
+
+# Tool calls that only observe the page or write files
+SKIPPED_TOOLS = {
+    "mcp__playwright__browser_snapshot",
+    "mcp__playwright__browser_take_screenshot",
+}
+# Code that saves login or prefix state must not overwrite the files recorded by the session
+_SKIPPED_CODE = ["storageState(", "localStorage.setItem("]
+
+_REPLAY_SCRIPT = r"""
+const { chromium } = require(process.argv[1]);
+const input = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+const AsyncFunction = Object.getPrototypeOf(async function () {}).constructor;
+(async () => {
+  const browser = await chromium.launch({ headless: true });
+  const result = { durations: [], failedStep: null, error: null, snapshot: null, url: null };
+  try {
+    const context = await browser.newContext(input.storageState ? { storageState: input.storageState } : {});
+    const page = await context.newPage();
+    page.setDefaultTimeout(input.stepTimeout);
+    let index = -1;
+    try {
+      if (input.startUrl)
+        await page.goto(input.startUrl);
+      for (index = 0; index < input.steps.length; index++) {
+        const started = Date.now();
+        await new AsyncFunction('page', 'context', input.steps[index])(page, context);
+        result.durations.push(Date.now() - started);
+      }
+    } catch (e) {
+      result.failedStep = index;
+      result.error = String((e && e.message) || e).split('\n').slice(0, 8).join('\n');
+      result.url = page.url();
+      result.snapshot = await page.locator('body').ariaSnapshot({ timeout: 5000 }).catch(() => null);
+    }
+  } finally {
+    await browser.close();
+  }
+  process.stdout.write(JSON.stringify(result));
+})().catch(e => {
+  process.stderr.write(String((e && e.stack) || e));
+  process.exit(1);
+});
+"""
+
+
+class ReplayStep(NamedTuple):
+    """One recorded browser tool call."""
+
+    tool_name: str
+    code: str
+    description: str = ""
+
+
+class ReplayFlow(NamedTuple):
+    """The browser steps of one web agent session, plus the state it started from."""
+
+    test_file_path: str
+    recorded_at: str
+    code_blocks_path: str
+    conversation_path: str
+    steps: List[ReplayStep]
+    storage_state_path: Optional[str] = None
+    start_url: Optional[str] = None
+
+
+class ReplayResult(NamedTuple):
+    """Outcome of replaying a flow."""
+
+    passed: bool
+    steps_run: int
+    total_steps: int
+    duration: float
+    failed_step: Optional[ReplayStep] = None
+    error: Optional[str] = None
+    url: Optional[str] = None
+    snapshot: Optional[str] = None
+
+    def report(self) -> str:
+        if self.passed:
+            return f"All {self.total_steps} recorded steps replayed in {self.duration:.1f}s"
+        if self.failed_step is None:
+            return f"Replay could not run: {self.error}"
+        lines = [
+            f"Step {self.steps_run + 1} of {self.total_steps} failed after {self.duration:.1f}s "
+            f"({self.failed_step.tool_name}):",
+            self.failed_step.code,
+            f"Error: {self.error}",
+            f"URL: {self.url}",
+        ]
+        if self.snapshot:
+            snapshot = self.snapshot[:MAX_SNAPSHOT_CHARS]
+            if len(self.snapshot) > MAX_SNAPSHOT_CHARS:
+                snapshot += "\n... (truncated)"
+            lines.append(f"ARIA snapshot at the failure:\n{snapshot}")
+        return "\n".join(lines)
+
+
+class FlowStore:
+    """
+    Keeps the latest recorded flow of each spec in self_healing/results/flows.
+    """
+
+    def __init__(self, workspace_path: str, flows_dir: Path | None = None):
+        self.workspace_path = workspace_path
+        self.flows_dir = Path(flows_dir) if flows_dir else Path(workspace_path) / "self_healing" / "results" / "flows"
+
+    def path(self, test_file_path: str) -> Path:
+        digest = hashlib.sha256(test_file_path.encode("utf-8")).hexdigest()[:16]
+        return self.flows_dir / f"flow_{digest}.json"
+
+    def record(
+        self,
+        test_file_path: str,
+        tool_calls: List[ToolCall],
+        code_blocks_path: Path,
+        conversation_path: Path,
+        storage_state_path: str = None,
+        start_url: str = None,
+    ) -> Optional[ReplayFlow]:
+        """Save the replayable steps of a session; sessions without any are not recorded."""
+        steps = [
+            ReplayStep(call.tool_name, call.playwright_code, call.description)
+            for call in tool_calls
+            if call.tool_name not in SKIPPED_TOOLS
+            and not any(marker in call.playwright_code for marker in _SKIPPED_CODE)
+        ]
+        if not steps:
+            return None
+
+        flow = ReplayFlow(
+            test_file_path=test_file_path,
+            recorded_at=datetime.now().isoformat(timespec="seconds"),
+            code_blocks_path=str(Path(code_blocks_path).absolute()),
+            conversation_path=str(Path(conversation_path).absolute()),
+            steps=steps,
+            storage_state_path=storage_state_path,
+            start_url=start_url,
+        )
+        data = flow._asdict()
+        data["steps"] = [step._asdict() for step in steps]
+        self.flows_dir.mkdir(parents=True, exist_ok=True)
+        self.path(test_file_path).write_text(json.dumps(data, indent=2), encoding="utf-8")
+        return flow
+
+    def load(self, test_file_path: str) -> Optional[ReplayFlow]:
+        path = self.path(test_file_path)
+        if not path.exists():
+            return None
+        try:
+            data: Dict[str, Any] = json.loads(path.read_text(encoding="utf-8"))
+            data["steps"] = [ReplayStep(**step) for step in data["steps"]]
+            return ReplayFlow(**data)
+        except (OSError, json.JSONDecodeError, KeyError, TypeError) as e:
+            print(f"⚠️ Ignoring unreadable flow {path}: {e}")
+            return None
+
+
+class PlaywrightReplayer:
+    """
+    Replays recorded flows with the vendored Playwright in a headless Chromium.
+    """
+
+    def __init__(
+        self,
+        workspace_path: str,
+        step_timeout: float = DEFAULT_STEP_TIMEOUT,
+        timeout: float = DEFAULT_REPLAY_TIMEOUT,
+    ):
+        self.workspace_path = workspace_path
+        self.step_timeout = step_timeout
+        self.timeout = timeout
+        self.playwright_module = os.path.join(workspace_path, "self_healing/playwright/packages/playwright")
+
+    async def replay(self, flow: ReplayFlow) -> ReplayResult:
+        storage_state = flow.storage_state_path
+        if storage_state and not Path(storage_state).exists():
+            storage_state = None
+        payload = {
+            "steps": [step.code for step in flow.steps],
+            "stepTimeout": self.step_timeout * 1000,
+            "storageState": storage_state,
+            "startUrl": flow.start_url,
+        }
+
+        start = time.monotonic()
+        process = await asyncio.create_subprocess_exec(
+            "node",
+            "-e",
+            _REPLAY_SCRIPT,
+            self.playwright_module,
+            cwd=self.workspace_path,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                process.communicate(json.dumps(payload).encode("utf-8")), timeout=self.timeout
+            )
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            process.kill()
+            await process.wait()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return self._not_run(flow, f"timed out after {self.timeout:g}s", start)
+
+        try:
+            result: Dict[str, Any] = json.loads(stdout.decode("utf-8"))
+        except json.JSONDecodeError:
+            return self._not_run(flow, stderr.decode("utf-8", errors="replace").strip()[-2000:], start)
+
+        duration = time.monotonic() - start
+        failed = result["failedStep"]
+        if failed is None:
+            return ReplayResult(True, len(flow.steps), len(flow.steps), duration)
+        # -1 means the navigation to the recorded start URL failed
+        failed_step = (
+            flow.steps[failed] if failed >= 0 else ReplayStep("start_url", f"await page.goto('{flow.start_url}');")
+        )
+        return ReplayResult(
+            passed=False,
+            steps_run=max(failed, 0),
+            total_steps=len(flow.steps),
+            duration=duration,
+            failed_step=failed_step,
+            error=result["error"],
+            url=result["url"],
+            snapshot=result["snapshot"],
+        )
+
+    @staticmethod
+    def _not_run(flow: ReplayFlow, error: str, start: float) -> ReplayResult:
+        return ReplayResult(False, 0, len(flow.steps), time.monotonic() - start, error=error or "node failed")
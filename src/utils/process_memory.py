@@ -0,0 +1,178 @@
+"""
+Memory sampling for Playwright MCP servers and the browsers they launch (Linux /proc only).
+
+The sampler periodically sums the memory of every `run-mcp-server` process below this
+process, together with its browser children, and relates it to the number of web agent
+sessions running at that moment. It works the same whether each session starts its own
+stdio server (spawned by the agent CLI) or leases one from McpServerPool.
+
+RSS counts pages shared between browser processes once per process and so overstates the
+total; PSS splits shared pages proportionally and is the better number to compare modes.
+"""
+
+import asyncio
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+# Configuration
+DEFAULT_SAMPLE_INTERVAL = 2.0
+MCP_SERVER_MARKER = "run-mcp-server"
+# The compaction proxy carries the server command in its arguments; its memory counts with its server
+PROXY_MARKER = "mcp_compaction_proxy"
+
+_PROC = Path("/proc")
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+class ProcessMemory(NamedTuple):
+    """Memory of a set of processes, in bytes."""
+
+    rss: int
+    pss: int
+
+
+class MemorySample(NamedTuple):
+    sessions: int
+    servers: int
+    memory: ProcessMemory
+
+
+def _parent_map() -> Dict[int, int]:
+    """Map every visible pid to its parent pid."""
+    parents = {}
+    for stat_path in _PROC.glob("[0-9]*/stat"):
+        try:
+            stat = stat_path.read_text()
+        except OSError:
+            continue
+        # The command name may contain spaces and parentheses; fields resume after the last ")"
+        fields = stat[stat.rfind(")") + 2 :].split()
+        parents[int(stat_path.parent.name)] = int(fields[1])
+    return parents
+
+
+def _descendants(pid: int, parents: Dict[int, int]) -> List[int]:
+    children: Dict[int, List[int]] = {}
+    for child, parent in parents.items():
+        children.setdefault(parent, []).append(child)
+    found, stack = [], [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+
+def _cmdline(pid: int) -> str:
+    try:
+        return (_PROC / str(pid) / "cmdline").read_bytes().replace(b"\0", b" ").decode("utf-8", errors="replace")
+    except OSError:
+        return ""
+
+
+def process_memory(pids: List[int]) -> ProcessMemory:
+    """Sum RSS and PSS over the given processes, skipping ones that exited."""
+    rss = pss = 0
+    for pid in pids:
+        try:
+            rss += int((_PROC / str(pid) / "statm").read_text().split()[1]) * _PAGE_SIZE
+        except (OSError, IndexError, ValueError):
+            continue
+        try:
+            for line in (_PROC / str(pid) / "smaps_rollup").read_text().splitlines():
+                if line.startswith("Pss:"):
+                    pss += int(line.split()[1]) * 1024
+                    break
+        except (OSError, ValueError):
+            pass
+    return ProcessMemory(rss, pss)
+
+
+def mcp_server_memory(root_pid: int = None) -> MemorySample:
+    """Memory of every MCP server below root_pid (default: this process) including its browsers."""
+    parents = _parent_map()
+    descendants = _descendants(root_pid or os.getpid(), parents)
+    proxies = [pid for pid in descendants if PROXY_MARKER in _cmdline(pid)]
+    servers = [pid for pid in descendants if MCP_SERVER_MARKER in _cmdline(pid) and pid not in proxies]
+    pids = set(servers + proxies)
+    for server in servers:
+        pids.update(_descendants(server, parents))
+    return MemorySample(sessions=0, servers=len(servers), memory=process_memory(sorted(pids)))
+
+
+class McpMemorySampler:
+    """
+    Samples MCP server memory while web agent sessions run and reports memory per concurrent session.
+    """
+
+    _shared: Optional["McpMemorySampler"] = None
+
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.sessions = 0
+        self.samples: List[MemorySample] = []
+        self._task: Optional[asyncio.Task] = None
+        self.supported = _PROC.is_dir()
+
+    @classmethod
+    def shared(cls) -> "McpMemorySampler":
+        """Return the process-wide sampler, creating it on first use."""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    @classmethod
+    async def close_shared(cls):
+        """Stop the process-wide sampler and print its report."""
+        sampler, cls._shared = cls._shared, None
+        if sampler:
+            await sampler.close()
+
+    @contextmanager
+    def session(self) -> Iterator[None]:
+        """Count a web agent session as running while the block executes."""
+        if not self.supported:
+            yield
+            return
+        self.sessions += 1
+        if self._task is None:
+            self._task = asyncio.create_task(self._sample_forever())
+        try:
+            yield
+        finally:
+            self.sessions -= 1
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self.print_report()
+
+    def print_report(self):
+        active = [sample for sample in self.samples if sample.sessions and sample.servers]
+        if not active:
+            return
+        peak = max(active, key=lambda sample: sample.memory.rss)
+        rss_per_session = sum(sample.memory.rss / sample.sessions for sample in active) / len(active)
+        pss_per_session = sum(sample.memory.pss / sample.sessions for sample in active) / len(active)
+        mib = 1024 * 1024
+
+        print("\n" + "=" * 80)
+        print("MCP Server Memory")
+        print("=" * 80)
+        print(f"Samples: {len(active)} (every {self.interval:g}s while web agents ran)")
+        print(
+            f"Peak: {peak.memory.rss / mib:.0f} MiB RSS, {peak.memory.pss / mib:.0f} MiB PSS "
+            f"for {peak.sessions} sessions on {peak.servers} servers"
+        )
+        print(f"Per concurrent session: {rss_per_session / mib:.0f} MiB RSS, {pss_per_session / mib:.0f} MiB PSS")
+        print("=" * 80)
+
+    async def _sample_forever(self):
+        while True:
+            if self.sessions:
+                sample = await asyncio.to_thread(mcp_server_memory)
+                self.samples.append(sample._replace(sessions=self.sessions))
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,341 @@
+"""
+Selector Matcher
+
+Heals simple renames without an agent. When a Cypress lookup fails because its selector or
+`cy.contains()` text no longer matches anything, SelectorMatcher reads the failed lookup from the
+error, ranks the elements of the failure's ARIA snapshot by how similar they are to it, and
+proposes an edit of the spec with a confidence score:
+
+    cy.contains('Sign in')       Expected to find content: 'Sign in' but never did.
+    - button "Sign In" [ref=e5]  ->  cy.contains('Sign In')
+
+    cy.get('[data-testid=submit-order]')      Expected to find element: `[data-testid=submit-order]`
+    - button "Submit your order" [ref=e9]  ->  cy.contains('button', 'Submit your order')
+
+Candidate names are indexed as sparse TF-IDF vectors of character trigrams and words, so a query
+is scored against every candidate in one pass over the postings of its features. The role the
+selector asks for (a `button` tag, `[role=tab]`) weighs the scores, and the confidence drops with
+the margin to the best differently named candidate.
+"""
+
+import heapq
+import json
+import math
+import re
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from self_healing.src.utils.aria_tree import TEXT_ROLE, AriaNode, AriaTree
+
+# Configuration
+DEFAULT_CONFIDENCE = 0.75
+# Score margin to the runner-up below which the confidence is scaled down
+MIN_MARGIN = 0.2
+# Score factor for candidates whose role differs from the one the selector asks for
+ROLE_MISMATCH = 0.7
+WORD_WEIGHT = 2.0
+MAX_CANDIDATES = 5
+LOG_PATH = "self_healing/results/local_matches.jsonl"
+
+# Lookup kinds
+LOOKUP_ELEMENT = "element"
+LOOKUP_CONTENT = "content"
+
+_ANSI = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+_MISSING_ELEMENT = re.compile(r"Expected to find element: `(?P<selector>.+?)`, but never found it")
+_MISSING_CONTENT = re.compile(
+    r"Expected to find content: '(?P<text>.*?)'"
+    r"(?: within the (?:selector: '(?P<selector>.*?)'|element: <(?P<element>[^>]*)>))? but never did"
+)
+_ROLE_SELECTOR = re.compile(r"\[role=['\"]?([\w-]+)")
+_TAG = re.compile(r"^([a-z][a-z0-9]*)")
+# Ids, classes and attribute values carry a selector's words, e.g. "#login-button" or "[data-testid=save]"
+_SELECTOR_WORDS = re.compile(r"[#.]([\w-]+)|\[[\w-]+[~|^$*]?=['\"]?([^'\"\]]+)")
+_JS_STRING = r"""'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|`[^`]*`"""
+_CAMEL_CASE = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+_WORD = re.compile(r"\w+")
+
+# Words of selectors that name the kind of element rather than the element
+_GENERIC_WORDS = {"btn", "button", "link", "input", "field", "text", "label", "icon", "container", "wrapper"}
+
+# Implicit roles of the HTML tags selectors use most
+_TAG_ROLES = {
+    "a": "link",
+    "button": "button",
+    "input": "textbox",
+    "textarea": "textbox",
+    "select": "combobox",
+    "option": "option",
+    "img": "img",
+    "li": "listitem",
+    "nav": "navigation",
+    "table": "table",
+    "td": "cell",
+    "th": "columnheader",
+    "dialog": "dialog",
+    **{f"h{level}": "heading" for level in range(1, 7)},
+}
+# Selectors for cy.contains() that match elements of a role
+_ROLE_SELECTORS = {
+    "link": "a",
+    "button": "button",
+    "heading": "h1, h2, h3, h4, h5, h6",
+    "option": "option",
+    "listitem": "li",
+    "cell": "td",
+    "columnheader": "th",
+}
+_TEXTBOX_ROLES = {"textbox", "searchbox", "combobox", "spinbutton"}
+
+
+class NoMatch(Exception):
+    """Raised when a failure is not a rename the matcher can propose a fix for."""
+
+
+class FailedLookup(NamedTuple):
+    """The selector or text a failing Cypress command looked for."""
+
+    kind: str  # LOOKUP_ELEMENT or LOOKUP_CONTENT
+    value: str  # the selector, or the text cy.contains() looked for
+    scope: Optional[str] = None  # the selector or element cy.contains() searched within
+
+    @classmethod
+    def from_output(cls, output: str) -> Optional["FailedLookup"]:
+        """The first failed lookup in Cypress output, if the failure is one."""
+        output = _ANSI.sub("", output)
+        element = _MISSING_ELEMENT.search(output)
+        content = _MISSING_CONTENT.search(output)
+        if content and (not element or content.start() < element.start()):
+            return cls(LOOKUP_CONTENT, content.group("text"), content.group("selector") or content.group("element"))
+        if element:
+            return cls(LOOKUP_ELEMENT, element.group("selector"))
+        return None
+
+    @property
+    def role(self) -> Optional[str]:
+        """The role the lookup asks for, from the tag or [role] of its (last) selector."""
+        selector = self.value if self.kind == LOOKUP_ELEMENT else self.scope
+        if not selector:
+            return None
+        last = re.split(r"[\s>+~,]+", selector.strip())[-1]
+        role = _ROLE_SELECTOR.search(last)
+        if role:
+            return role.group(1)
+        tag = _TAG.match(last)
+        return _TAG_ROLES.get(tag.group(1)) if tag else None
+
+    def query(self) -> str:
+        """The text to compare the snapshot's names with."""
+        if self.kind == LOOKUP_CONTENT:
+            return self.value
+        words = []
+        for identifier, attribute_value in _SELECTOR_WORDS.findall(self.value):
+            for part in re.split(r"[-_\s]+", identifier or attribute_value):
+                words += [word for word in _CAMEL_CASE.split(part) if word.casefold() not in _GENERIC_WORDS]
+        return " ".join(word for word in words if word)
+
+    def describe(self) -> str:
+        if self.kind == LOOKUP_ELEMENT:
+            return f"element `{self.value}`"
+        scope = f" within {self.scope}" if self.scope else ""
+        return f"content '{self.value}'{scope}"
+
+
+class SimilarityIndex:
+    """
+    Unit-length TF-IDF vectors of the candidates' texts, stored as postings per feature.
+    Features are the character trigrams of the padded, casefolded text plus its whole words.
+    """
+
+    def __init__(self, texts: List[str]):
+        vectors = [_features(text) for text in texts]
+        document_frequency = Counter(feature for vector in vectors for feature in vector)
+        count = len(texts)
+        self.idf = {feature: math.log((1 + count) / (1 + df)) + 1 for feature, df in document_frequency.items()}
+        # Features no candidate has are as rare as can be
+        self.unseen_idf = math.log(1 + count) + 1
+        self.postings: Dict[str, List[Tuple[int, float]]] = {}
+        for document, vector in enumerate(vectors):
+            weights = {feature: weight * self.idf[feature] for feature, weight in vector.items()}
+            norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+            for feature, weight in weights.items():
+                self.postings.setdefault(feature, []).append((document, weight / norm))
+
+    def scores(self, text: str) -> Dict[int, float]:
+        """Cosine similarity of the text to every candidate sharing a feature with it."""
+        weights = {
+            feature: weight * self.idf.get(feature, self.unseen_idf) for feature, weight in _features(text).items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+        scores: Dict[int, float] = {}
+        for feature, weight in weights.items():
+            for document, document_weight in self.postings.get(feature, ()):
+                scores[document] = scores.get(document, 0.0) + weight / norm * document_weight
+        return scores
+
+
+class SelectorMatch(NamedTuple):
+    """A proposed edit of the spec: every lookup call with old in the searched spans gets new instead."""
+
+    lookup: FailedLookup
+    node: AriaNode
+    old: str
+    new: str
+    occurrences: int
+    score: float
+    confidence: float
+
+    def describe(self) -> str:
+        element = self.node.describe() if self.node.name else f"{self.node.role}: {self.node.text}"
+        edits = f", {self.occurrences} occurrences" if self.occurrences > 1 else ""
+        return f"{self.old} -> {self.new} ({element}, confidence {self.confidence:.2f}{edits})"
+
+
+class SelectorMatcher:
+    """
+    Proposes replacements for failed lookups from the ARIA snapshot in the failure output.
+    """
+
+    def propose(self, output: str, source: str, spans: Sequence[Tuple[int, int]] = None) -> SelectorMatch:
+        """
+        Propose an edit of source for the failed lookup in output, limited to spans: the failing
+        test's body and hooks. Raises NoMatch with the reason when there is none.
+        """
+        lookup = FailedLookup.from_output(output)
+        if lookup is None:
+            raise NoMatch("the failure is not a missing element or content")
+        tree = AriaTree.from_cypress_output(output)
+        if tree is None:
+            raise NoMatch("the failure output has no ARIA snapshot")
+
+        old, occurrences = self._find_in_source(lookup, source, spans or [(0, len(source))])
+        if not occurrences:
+            raise NoMatch(f"the {lookup.describe()} is not written literally in the failing test")
+        if lookup.kind == LOOKUP_CONTENT and any(lookup.value in _text(node) for node in tree):
+            raise NoMatch(f"the {lookup.describe()} is still on the page, so it was not renamed")
+        query = lookup.query()
+        if not query:
+            raise NoMatch(f"the {lookup.describe()} has no words to match")
+
+        ranked = self.rank(lookup, tree, query)
+        if not ranked:
+            raise NoMatch(f"no element of the page resembles the {lookup.describe()}")
+        score, node = ranked[0]
+        runner_up = next((other for other, candidate in ranked[1:] if _text(candidate) != _text(node)), 0.0)
+        confidence = score * min(1.0, (score - runner_up) / MIN_MARGIN)
+        return SelectorMatch(lookup, node, old, self._replacement(lookup, old, node), occurrences, score, confidence)
+
+    @staticmethod
+    def rank(lookup: FailedLookup, tree: AriaTree, query: str) -> List[Tuple[float, AriaNode]]:
+        """The best candidates for the lookup, highest score first."""
+        candidates = [node for node in tree if _text(node) and not _is_regex(node.name)]
+        index = SimilarityIndex([_text(node) for node in candidates])
+        role = lookup.role
+        scored = [
+            (score * (ROLE_MISMATCH if role and candidates[document].role != role else 1.0), document)
+            for document, score in index.scores(query).items()
+        ]
+        return [(score, candidates[document]) for score, document in heapq.nlargest(MAX_CANDIDATES, scored)]
+
+    @staticmethod
+    def apply(match: SelectorMatch, source: str, spans: Sequence[Tuple[int, int]] = None) -> str:
+        """The source with the match's edit applied to the lookup calls within spans."""
+        pattern = _lookup_call(match.lookup, match.old)
+        edited, position = [], 0
+        for start, end in sorted(spans or [(0, len(source))]):
+            edited.append(source[position:start])
+            edited.append(pattern.sub(lambda call: call.group(1) + match.new, source[start:end]))
+            position = end
+        return "".join(edited) + source[position:]
+
+    @staticmethod
+    def _find_in_source(lookup: FailedLookup, source: str, spans: Sequence[Tuple[int, int]]) -> Tuple[str, int]:
+        """
+        The source text to replace and how often the lookup calls within spans use it, trying each
+        JavaScript quote. Only arguments of get()/find() (selectors) or contains() (text) count, so
+        test titles and other strings with the same text are left alone.
+        """
+        for quote in ("'", '"', "`"):
+            old = literal = _quote(lookup.value, quote)
+            if lookup.kind == LOOKUP_ELEMENT:
+                element_call = re.compile(rf"\b(get|find)\(\s*{re.escape(literal)}\s*\)")
+                calls = [element_call.search(source, start, end) for start, end in spans]
+                old = next((call.group(0) for call in calls if call), None)
+                if old is None:
+                    continue
+            pattern = _lookup_call(lookup, old)
+            occurrences = sum(len(pattern.findall(source, start, end)) for start, end in spans)
+            if occurrences:
+                return old, occurrences
+        return "", 0
+
+    @staticmethod
+    def _replacement(lookup: FailedLookup, old: str, node: AriaNode) -> str:
+        quote = re.search(r"['\"`]", old).group(0)
+        text = _text(node)
+        if lookup.kind == LOOKUP_CONTENT:
+            return _quote(text, quote)
+        command = old[: old.index("(")]
+        placeholder = (node.props or {}).get("placeholder")
+        if node.role in _TEXTBOX_ROLES and placeholder:
+            return f"{command}({_quote(f'[placeholder={json.dumps(placeholder)}]', quote)})"
+        if node.role == TEXT_ROLE or not node.role:
+            return f"contains({_quote(text, quote)})"
+        selector = _ROLE_SELECTORS.get(node.role, f'[role="{node.role}"]')
+        return f"contains({_quote(selector, quote)}, {_quote(text, quote)})"
+
+
+class LocalMatchRecord(NamedTuple):
+    """One attempt of the matcher, as appended to LOG_PATH for measuring its share of heals and latency."""
+
+    test_file_path: str
+    test_title: str
+    outcome: str  # "healed", "rejected" (validation failed), "low confidence" or "no match"
+    reason: str = ""
+    old: str = ""
+    new: str = ""
+    confidence: float = 0.0
+    match_ms: float = 0.0
+    validation_time: float = 0.0
+
+    def save(self, workspace_path: str):
+        log_path = Path(workspace_path) / LOG_PATH
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        record = {"recorded_at": time.time(), **self._asdict()}
+        with log_path.open("a", encoding="utf-8") as log:
+            log.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def _lookup_call(lookup: FailedLookup, old: str) -> re.Pattern:
+    """Where old is the lookup's argument: group 1 is the call text before it, kept when it is replaced."""
+    if lookup.kind == LOOKUP_ELEMENT:
+        return re.compile(rf"((?<![\w$])){re.escape(old)}")
+    return re.compile(rf"(\bcontains\(\s*(?:(?:{_JS_STRING})\s*,\s*)?){re.escape(old)}(?=\s*[,)])")
+
+
+def _features(text: str) -> Counter:
+    normalized = " ".join(text.casefold().split())
+    padded = f" {normalized} "
+    features = Counter(padded[index : index + 3] for index in range(len(padded) - 2))
+    for word in _WORD.findall(normalized):
+        features["w:" + word] += WORD_WEIGHT
+    return features
+
+
+def _text(node: AriaNode) -> str:
+    """What cy.contains() would see of the node: its accessible name, or its text."""
+    return node.name or node.text
+
+
+def _is_regex(name: str) -> bool:
+    return len(name) > 1 and name.startswith("/") and name.endswith("/")
+
+
+def _quote(text: str, quote: str) -> str:
+    """A JavaScript string literal of text in the given quotes."""
+    escaped = text.replace("\\", "\\\\").replace(quote, "\\" + quote).replace("\n", "\\n")
+    if quote == "`":
+        escaped = escaped.replace("${", "\\${")
+    return f"{quote}{escaped}{quote}"
@@ -0,0 +1,172 @@
+"""
+Compaction of Playwright MCP tool results before they reach the web agent.
+
+The server already renders the snapshots of actions (click, type, ...) as incremental diffs
+against its previous snapshot, but browser_snapshot, tab switches and visits to a page seen
+before return the full ARIA tree again, and consecutive full trees of a page are mostly
+identical. Every full snapshot handed to the agent is numbered; a later full snapshot of the
+same URL is replaced by a reference when it is unchanged, or by a unified diff against the
+numbered one when that is sufficiently shorter. Every few references a full snapshot is sent
+again, so the agent never has to look far back. Each tool's text output is capped at a per-tool
+budget: an oversized snapshot is cut at a line inside its code fence and is not kept as a numbered
+snapshot, since the agent never saw all of it.
+"""
+
+from __future__ import annotations
+
+import difflib
+import itertools
+import re
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+# Configuration
+DEFAULT_BUDGET = 20000
+TOOL_BUDGETS: Dict[str, int] = {
+    "browser_snapshot": 40000,
+    "browser_navigate": 30000,
+    "browser_click": 12000,
+    "browser_type": 12000,
+    "browser_press_key": 12000,
+    "browser_wait_for": 12000,
+}
+# Send the full snapshot again after this many references to the same numbered one
+KEYFRAME_INTERVAL = 5
+# A delta is only used when it is at most this fraction of the full snapshot
+MAX_DELTA_RATIO = 0.6
+CHARS_PER_TOKEN = 4
+
+_SNAPSHOT_BLOCK = re.compile(r"- Page Snapshot:\n```yaml\n(?P<snapshot>.*?)\n```", re.DOTALL)
+_PAGE_URL = re.compile(r"^- Page URL: (.*)$", re.MULTILINE)
+# Markers of the server's own incremental snapshots, which are passed through
+_INCREMENTAL_MARKERS = ("<changed>", "[unchanged]")
+
+
+class CompactionStats(NamedTuple):
+    """Totals over the tool results of one session."""
+
+    results: int = 0
+    original_chars: int = 0
+    compacted_chars: int = 0
+    references: int = 0
+    deltas: int = 0
+    truncated: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return (self.original_chars - self.compacted_chars) // CHARS_PER_TOKEN
+
+    def summary(self) -> str:
+        return (
+            f"{self.results} tool results, {self.original_chars:,} → {self.compacted_chars:,} characters, "
+            f"~{self.tokens_saved:,} tokens saved ({self.references} unchanged snapshots referenced, "
+            f"{self.deltas} sent as deltas, {self.truncated} results over budget)"
+        )
+
+
+class _Keyframe(NamedTuple):
+    number: int
+    snapshot: str
+    references: int
+
+
+class SnapshotCompactor:
+    """
+    Rewrites the text content of MCP tool results, remembering the full snapshots already sent per URL.
+    """
+
+    def __init__(self, budgets: Dict[str, int] = None, keyframe_interval: int = KEYFRAME_INTERVAL):
+        self.budgets = {**TOOL_BUDGETS, **(budgets or {})}
+        self.keyframe_interval = keyframe_interval
+        self.keyframes: Dict[str, _Keyframe] = {}
+        self.snapshot_count = 0
+        self.stats = CompactionStats()
+
+    def compact(self, tool_name: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the tool result with its text content compacted; other content is kept as is."""
+        content = result.get("content")
+        if not isinstance(content, list):
+            return result
+        original = compacted = 0
+        references = deltas = truncated = 0
+        items = []
+        for item in content:
+            if not isinstance(item, dict) or item.get("type") != "text":
+                items.append(item)
+                continue
+            text = item.get("text", "")
+            budget = self.budgets.get(tool_name, DEFAULT_BUDGET)
+            new_text, kind, snapshot_truncated = self._compact_snapshot(text, budget)
+            references += kind == "reference"
+            deltas += kind == "delta"
+            truncated += snapshot_truncated
+            if len(new_text) > budget:
+                omitted = len(new_text) - budget
+                new_text = (
+                    new_text[:budget] + f"\n... ({omitted} characters over the {tool_name} output budget omitted)"
+                )
+                truncated += 1
+            original += len(text)
+            compacted += len(new_text)
+            items.append({**item, "text": new_text})
+
+        self.stats = CompactionStats(
+            results=self.stats.results + 1,
+            original_chars=self.stats.original_chars + original,
+            compacted_chars=self.stats.compacted_chars + compacted,
+            references=self.stats.references + references,
+            deltas=self.stats.deltas + deltas,
+            truncated=self.stats.truncated + min(truncated, 1),
+        )
+        return {**result, "content": items}
+
+    def _compact_snapshot(self, text: str, budget: int) -> Tuple[str, Optional[str], bool]:
+        """
+        Replace a full snapshot in the text by a reference or delta, fitting it into the budget.
+        Returns the text, what was done and whether the snapshot had to be cut.
+        """
+        match = _SNAPSHOT_BLOCK.search(text)
+        if not match:
+            return text, None, False
+        snapshot = match.group("snapshot")
+        if any(marker in snapshot for marker in _INCREMENTAL_MARKERS):
+            return text, None, False
+        url_match = _PAGE_URL.search(text)
+        url = url_match.group(1).strip() if url_match else ""
+        # What the snapshot block may take after the text around it
+        room = budget - (len(text) - len(snapshot))
+
+        keyframe = self.keyframes.get(url)
+        replacement, kind = None, None
+        if keyframe and keyframe.references < self.keyframe_interval:
+            if snapshot == keyframe.snapshot:
+                replacement, kind = f"# Unchanged since snapshot #{keyframe.number}", "reference"
+            else:
+                diff = difflib.unified_diff(keyframe.snapshot.splitlines(), snapshot.splitlines(), n=1, lineterm="")
+                # The first two lines are the ---/+++ file headers
+                delta = "\n".join(itertools.islice(diff, 2, None))
+                if len(delta) <= MAX_DELTA_RATIO * len(snapshot):
+                    header = f"# Changes since snapshot #{keyframe.number} (unified diff: - removed, + added lines)"
+                    replacement, kind = f"{header}\n{delta}", "delta"
+
+        if replacement is None:
+            self.snapshot_count += 1
+            header = f"# Snapshot #{self.snapshot_count}"
+            body, truncated = _fit(snapshot, room - len(header) - 1)
+            # Later snapshots are only compared with what the agent actually received
+            if not truncated:
+                self.keyframes[url] = _Keyframe(self.snapshot_count, snapshot, 0)
+            replacement = f"{header}\n{body}"
+        else:
+            self.keyframes[url] = keyframe._replace(references=keyframe.references + 1)
+            replacement, truncated = _fit(replacement, room)
+        start, end = match.span("snapshot")
+        return text[:start] + replacement + text[end:], kind, truncated
+
+
+def _fit(snapshot: str, limit: int) -> Tuple[str, bool]:
+    """Cut the snapshot at a line boundary so that it and the omission note fit into limit characters."""
+    if len(snapshot) <= limit:
+        return snapshot, False
+    note = f"# ... cut at the output budget, {len(snapshot):,} characters in full"
+    cut = snapshot.rfind("\n", 0, max(0, limit - len(note)))
+    return (snapshot[: cut + 1] if cut != -1 else "") + note, True
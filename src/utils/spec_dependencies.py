@@ -0,0 +1,114 @@
+"""
+Helpers for resolving the local files a Cypress spec depends on (imports, requires, support files, config).
+"""
+
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import Iterable, List, Optional, Set
+
+# Matches `import x from './a'`, `import './a'`, `export * from './a'`, `require('./a')` and `import('./a')`
+_IMPORT_PATTERN = re.compile(
+    r"""(?:\bimport\s+(?:[^'"]*?\s+from\s+)?|\bexport\s+[^'"]*?\s+from\s+|\brequire\s*\(\s*|\bimport\s*\(\s*)['"]([^'"]+)['"]""",
+)
+_RESOLVE_SUFFIXES = ["", ".js", ".ts", ".jsx", ".tsx", ".mjs", ".cjs", ".json"]
+_INDEX_FILES = ["index.js", "index.ts", "index.jsx", "index.tsx"]
+
+# Files that affect every spec in a Cypress project
+CONFIG_FILES = [
+    "cypress.config.js",
+    "cypress.config.ts",
+    "cypress.config.mjs",
+    "cypress.config.cjs",
+    "cypress.env.json",
+]
+SUPPORT_FILE_GLOBS = ["cypress/support/e2e.*", "cypress/support/index.*"]
+
+
+class SpecDependencyResolver:
+    """
+    Finds local modules imported by a spec (transitively) plus the project-wide Cypress config and support files.
+    """
+
+    def __init__(self, workspace_path: str):
+        self.workspace_path = Path(workspace_path).resolve()
+
+    @staticmethod
+    def find_import_specifiers(source: str) -> List[str]:
+        """Return every module specifier imported or required by the given source."""
+        return _IMPORT_PATTERN.findall(source)
+
+    def resolve_specifier(self, specifier: str, importer: Path) -> Optional[Path]:
+        """Resolve a relative import specifier to a file in the workspace, or None for packages/missing files."""
+        if not specifier.startswith("."):
+            return None
+
+        base = (importer.parent / specifier).resolve()
+        for suffix in _RESOLVE_SUFFIXES:
+            candidate = base.with_name(base.name + suffix) if suffix else base
+            if candidate.is_file():
+                return candidate
+        for index_file in _INDEX_FILES:
+            candidate = base / index_file
+            if candidate.is_file():
+                return candidate
+        return None
+
+    def imported_files(self, test_file_path: str) -> List[Path]:
+        """Return the local files the spec imports, transitively, excluding the spec itself."""
+        spec_path = self._absolute(test_file_path)
+        seen: Set[Path] = {spec_path}
+        ordered: List[Path] = []
+        stack = [spec_path]
+        while stack:
+            current = stack.pop()
+            try:
+                source = current.read_text(encoding="utf-8")
+            except (OSError, UnicodeDecodeError):
+                continue
+            for specifier in self.find_import_specifiers(source):
+                resolved = self.resolve_specifier(specifier, current)
+                if resolved and resolved not in seen:
+                    seen.add(resolved)
+                    ordered.append(resolved)
+                    stack.append(resolved)
+        return ordered
+
+    def config_files(self) -> List[Path]:
+        """Return the Cypress config files that exist in the workspace."""
+        files = [self.workspace_path / name for name in CONFIG_FILES]
+        return [path for path in files if path.is_file()]
+
+    def support_files(self) -> List[Path]:
+        """Return the Cypress support entry files and everything they import."""
+        files: List[Path] = []
+        for pattern in SUPPORT_FILE_GLOBS:
+            for entry in sorted(path for path in self.workspace_path.glob(pattern) if path.is_file()):
+                files.append(entry.resolve())
+                files.extend(self.imported_files(str(entry)))
+        return list(dict.fromkeys(files))
+
+    def dependency_files(self, test_file_path: str) -> List[Path]:
+        """Return the spec, its imported files and the project-wide config/support files, without duplicates."""
+        files = [self._absolute(test_file_path)]
+        files.extend(self.imported_files(test_file_path))
+        files.extend(self.config_files())
+        files.extend(self.support_files())
+        return list(dict.fromkeys(files))
+
+    def relative(self, path: Path) -> str:
+        """Return the path relative to the workspace when possible."""
+        try:
+            return path.resolve().relative_to(self.workspace_path).as_posix()
+        except ValueError:
+            return path.as_posix()
+
+    def relative_all(self, paths: Iterable[Path]) -> List[str]:
+        return [self.relative(path) for path in paths]
+
+    def _absolute(self, test_file_path: str) -> Path:
+        path = Path(test_file_path)
+        if not path.is_absolute():
+            path = self.workspace_path / path
+        return path.resolve()
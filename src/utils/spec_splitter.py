@@ -0,0 +1,296 @@
+"""
+Utilities for splitting a Cypress spec into its individual tests and focusing a single test.
+"""
+
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+_BLOCK_PATTERN = re.compile(r"(?<![\w.$])(describe|context|it|specify)(\.only|\.skip)?\s*\(")
+_HOOK_PATTERN = re.compile(r"(?<![\w.$])(before|beforeEach)\s*\(")
+_COMMAND_PATTERN = re.compile(r"(?<![\w.$])cy\s*\.")
+_CHAIN_LINK_PATTERN = re.compile(r"\s*\.\s*[A-Za-z_$][\w$]*")
+_ANSI_PATTERN = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+# Mocha spec reporter lists failing tests as "  1) title" before the "N passing" summary
+_FAILING_LINE_PATTERN = re.compile(r"^\s+\d+\) (.+?)\s*$", re.MULTILINE)
+_SUMMARY_PATTERN = re.compile(r"^\s+\d+ (?:passing|failing|pending)\b", re.MULTILINE)
+# Lines a detailed failure's title may span: one per describe block plus the test title
+_MAX_TITLE_LINES = 12
+# Characters after which a "/" starts a regex literal rather than a division
+_REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^") | {""}
+
+
+class SpecTest(NamedTuple):
+    """A single it()/specify() block within a spec."""
+
+    title: str
+    full_title: str  # describe titles and the test title joined with spaces, as Mocha reports them
+    keyword_start: int  # offset of the "it"/"specify" keyword
+    keyword_end: int  # offset just after the keyword, including any ".only"/".skip" modifier
+    end: int  # offset just after the closing parenthesis of the call
+    line: int
+
+
+class SpecSplitter:
+    """
+    Finds the tests declared in a Cypress spec using a lightweight JavaScript scanner
+    that skips strings, template literals, comments and regex literals.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self._masked, self._literals = self._mask(source)
+
+    @classmethod
+    def from_file(cls, test_file_path: str | Path) -> "SpecSplitter":
+        return cls(Path(test_file_path).read_text(encoding="utf-8"))
+
+    def tests(self) -> List[SpecTest]:
+        """Return every it()/specify() block in source order."""
+        blocks = []
+        for match in _BLOCK_PATTERN.finditer(self._masked):
+            title = self._title_after(match.end())
+            if title is None:
+                continue
+            end = self._matching_paren(match.end() - 1)
+            blocks.append((match.group(1), match.start(), match.end(), end, title, match))
+
+        tests = []
+        for keyword, start, _, end, title, match in blocks:
+            if keyword not in ("it", "specify"):
+                continue
+            parents = [
+                parent_title
+                for parent_keyword, parent_start, _, parent_end, parent_title, _ in blocks
+                if parent_keyword in ("describe", "context") and parent_start < start and end <= parent_end
+            ]
+            keyword_end = match.start() + len(match.group(1)) + len(match.group(2) or "")
+            tests.append(
+                SpecTest(
+                    title=title,
+                    full_title=" ".join(parents + [title]),
+                    keyword_start=start,
+                    keyword_end=keyword_end,
+                    end=end,
+                    line=self.source.count("\n", 0, start) + 1,
+                )
+            )
+        return tests
+
+    def steps(self, test: SpecTest, before_run: Optional[Set[int]] = None) -> List[str]:
+        """
+        Return the Cypress command chains that run for a test, in order: the before hooks of its
+        enclosing describe blocks (outermost first), then their beforeEach hooks (outermost first),
+        then the test body. Each chain is one top-level `cy...` statement with whitespace normalized.
+
+        Mocha runs a describe block's before hooks once, ahead of its first test. When the steps of
+        several tests are collected in order, pass the same before_run set to each call: before hooks
+        already in it are left out, and the ones returned are added to it.
+        """
+        return [step for start, end in self.ranges(test, before_run) for step in self._command_chains(start, end)]
+
+    def ranges(self, test: SpecTest, before_run: Optional[Set[int]] = None) -> List[Tuple[int, int]]:
+        """The (start, end) offsets of the hook bodies and the test body that steps() reads, in the same order."""
+        describes = [
+            (match.start(), self._matching_paren(match.end() - 1))
+            for match in _BLOCK_PATTERN.finditer(self._masked)
+            if match.group(1) in ("describe", "context")
+        ]
+        hooks = []
+        for match in _HOOK_PATTERN.finditer(self._masked):
+            start, end = match.start(), self._matching_paren(match.end() - 1)
+            enclosing = [block for block in describes if block[0] < start and end <= block[1]]
+            if not all(block[0] < test.keyword_start and test.end <= block[1] for block in enclosing):
+                continue
+            if match.group(1) == "before" and before_run is not None:
+                if start in before_run:
+                    continue
+                before_run.add(start)
+            # Mocha runs every before() hook (outermost first) before any beforeEach() hook
+            hooks.append((match.group(1) == "beforeEach", len(enclosing), start, match.end(), end))
+
+        ranges = [(body_start, end) for _, _, _, body_start, end in sorted(hooks)]
+        ranges.append((test.keyword_end, test.end))
+        return ranges
+
+    def focus(self, test: SpecTest) -> str:
+        """
+        Return the spec source with only the given test enabled: the target becomes it.only()
+        and every other .only modifier is blanked out (offsets are preserved).
+        """
+        source = list(self.source)
+        for match in _BLOCK_PATTERN.finditer(self._masked):
+            if match.group(2) == ".only" and match.start() != test.keyword_start:
+                only_start = match.start() + len(match.group(1))
+                source[only_start : only_start + len(".only")] = " " * len(".only")
+        keyword = self.source[test.keyword_start : test.keyword_end].split(".")[0]
+        source[test.keyword_start : test.keyword_end] = list(f"{keyword}.only")
+        return "".join(source)
+
+    @staticmethod
+    def failing_titles(test_output: str) -> List[str]:
+        """Return the titles of failing tests listed by the Cypress (Mocha spec) reporter."""
+        output = _ANSI_PATTERN.sub("", test_output)
+        titles: List[str] = []
+        # Each spec run prints its own listing; only look at the part before each summary block
+        for section in re.split(r"Running:\s", output)[1:] or [output]:
+            summary = _SUMMARY_PATTERN.search(section)
+            listing = section[: summary.start()] if summary else section
+            titles.extend(_FAILING_LINE_PATTERN.findall(listing))
+        return list(dict.fromkeys(titles))
+
+    @staticmethod
+    def failing_full_titles(test_output: str) -> List[str]:
+        """
+        Return the full titles of the failures detailed after the reporter's summary, where Mocha
+        prints "1) describe" with the nested titles on the following lines, the last ending in ":".
+        """
+        output = _ANSI_PATTERN.sub("", test_output)
+        titles: List[str] = []
+        for section in re.split(r"Running:\s", output)[1:] or [output]:
+            summary = _SUMMARY_PATTERN.search(section)
+            if not summary:
+                continue
+            lines = section[summary.start() :].splitlines()
+            for index, line in enumerate(lines):
+                match = _FAILING_LINE_PATTERN.match(line)
+                if not match:
+                    continue
+                parts = [match.group(1)]
+                for following in lines[index + 1 : index + _MAX_TITLE_LINES]:
+                    if parts[-1].endswith(":") or not following.strip():
+                        break
+                    parts.append(following.strip())
+                if parts[-1].endswith(":"):
+                    titles.append(" ".join(parts)[:-1])
+        return list(dict.fromkeys(titles))
+
+    def failing_tests(self, test_output: str) -> List[SpecTest]:
+        """
+        Match the failures from a Cypress run against the tests in this spec: by full title when the
+        reporter detailed them, so tests sharing a title in different describe blocks stay apart,
+        else by the titles in the listing.
+        """
+        tests = self.tests()
+        full_titles = self.failing_full_titles(test_output)
+        if full_titles:
+            failing = [test for test in tests if test.full_title in full_titles]
+            # Failures inside hooks are reported as 'describe "before each" hook for "title"'
+            for full_title in full_titles:
+                hook_match = re.fullmatch(r'(.*?) ?"[^"]*" hook for "(.+)"', full_title)
+                if hook_match:
+                    prefix, title = hook_match.groups()
+                    failing += [
+                        test
+                        for test in tests
+                        if test.title == title and test.full_title.startswith(prefix) and test not in failing
+                    ]
+            if failing:
+                return [test for test in tests if test in failing]
+
+        failing_titles: Set[str] = set(self.failing_titles(test_output))
+        for title in list(failing_titles):
+            hook_match = re.search(r'hook for "(.+)"', title)
+            if hook_match:
+                failing_titles.add(hook_match.group(1))
+        return [test for test in tests if test.title in failing_titles]
+
+    def _command_chains(self, start: int, end: int) -> List[str]:
+        chains = []
+        chain_end = start
+        for match in _COMMAND_PATTERN.finditer(self._masked, start, end):
+            if match.start() < chain_end:
+                continue  # nested inside the previous chain's callbacks
+            index = match.start() + len("cy")
+            while True:
+                link = _CHAIN_LINK_PATTERN.match(self._masked, index)
+                if not link:
+                    break
+                index = link.end()
+                call_start = index
+                while call_start < end and self._masked[call_start].isspace():
+                    call_start += 1
+                if call_start < end and self._masked[call_start] == "(":
+                    index = self._matching_paren(call_start)
+            chain_end = index
+            chain = " ".join(self.source[match.start() : index].split())
+            chains.append(re.sub(r"\)\s+\.", ").", chain))
+        return chains
+
+    def _title_after(self, offset: int) -> Optional[str]:
+        index = offset
+        while index < len(self._masked) and self._masked[index].isspace():
+            index += 1
+        return self._literals.get(index)
+
+    def _matching_paren(self, open_index: int) -> int:
+        depth = 0
+        for index in range(open_index, len(self._masked)):
+            char = self._masked[index]
+            if char in "([{":
+                depth += 1
+            elif char in ")]}":
+                depth -= 1
+                if depth == 0:
+                    return index + 1
+        return len(self._masked)
+
+    @staticmethod
+    def _mask(source: str) -> Tuple[str, Dict[int, str]]:
+        """
+        Blank out strings, comments and regex literals so brackets and keywords inside them are ignored.
+        Returns the masked source and a map of string literal start offsets to their contents.
+        """
+        masked = list(source)
+        literals: Dict[int, str] = {}
+        index = 0
+        previous = ""
+        length = len(source)
+        while index < length:
+            char = source[index]
+            next_char = source[index + 1] if index + 1 < length else ""
+            if char == "/" and next_char == "/":
+                end = source.find("\n", index)
+                end = length if end == -1 else end
+            elif char == "/" and next_char == "*":
+                end = source.find("*/", index + 2)
+                end = length if end == -1 else end + 2
+            elif char in "'\"`" or (char == "/" and previous in _REGEX_PRECEDERS):
+                end = index + 1
+                in_class = False
+                while end < length:
+                    current = source[end]
+                    if current == "\\":
+                        end += 2
+                        continue
+                    if char == "/" and current == "[":
+                        in_class = True
+                    elif char == "/" and current == "]":
+                        in_class = False
+                    elif current == char and not in_class:
+                        break
+                    elif current == "\n" and char != "`":
+                        break
+                    end += 1
+                end = min(end + 1, length)
+                if char != "/":
+                    literals[index] = source[index + 1 : end - 1]
+                previous = "a"  # a literal behaves like an operand
+                for masked_index in range(index + 1, end - 1):
+                    if masked[masked_index] != "\n":
+                        masked[masked_index] = " "
+                index = end
+                continue
+            else:
+                if not char.isspace():
+                    previous = char
+                index += 1
+                continue
+
+            for masked_index in range(index, end):
+                if masked[masked_index] != "\n":
+                    masked[masked_index] = " "
+            index = end
+        return "".join(masked), literals
@@ -0,0 +1,116 @@
+"""
+Content-addressed bookkeeping for pipeline stages, so interrupted or repeated runs can resume.
+
+A run is keyed by a hash of the spec, the local files it imports, the Cypress config/support
+files and the pipeline settings. The key doubles as the run id, so stage outputs such as
+conversation_<key>.md and code_blocks_<key>.txt are found again on the next run.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from self_healing.src.utils.spec_dependencies import SpecDependencyResolver
+
+STAGE_WEB = "web"
+STAGE_CODING = "coding"
+
+# Files outside the workspace that shape agent behaviour
+_PROMPTS_DIR = Path(__file__).resolve().parent.parent / "prompts"
+
+
+class StageCache:
+    """
+    Stores one manifest per content key recording which pipeline stages have completed.
+    """
+
+    def __init__(self, workspace_path: str, cache_dir: Path | None = None):
+        self.workspace_path = workspace_path
+        self.results_dir = Path(workspace_path) / "self_healing" / "results"
+        self.cache_dir = Path(cache_dir) if cache_dir else self.results_dir / "stages"
+        self.resolver = SpecDependencyResolver(workspace_path)
+
+    def compute_key(self, test_file_path: str, settings: Dict[str, Any] | None = None) -> str:
+        """Hash the spec, its dependencies, project config, prompts and pipeline settings."""
+        digest = hashlib.sha256()
+        digest.update(f"spec:{test_file_path}\n".encode("utf-8"))
+        for path in self.resolver.dependency_files(test_file_path):
+            self._update_with_file(digest, self.resolver.relative(path), path)
+        for path in sorted(_PROMPTS_DIR.glob("*.yaml")):
+            self._update_with_file(digest, f"prompts/{path.name}", path)
+        digest.update(json.dumps(settings or {}, sort_keys=True, default=str).encode("utf-8"))
+        return digest.hexdigest()[:32]
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the manifest for a key, or None if nothing was recorded."""
+        path = self._manifest_path(key)
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️ Ignoring unreadable stage manifest {path}: {e}")
+            return None
+
+    @staticmethod
+    def is_completed(manifest: Optional[Dict[str, Any]], stage: str) -> bool:
+        return bool(manifest) and stage in manifest.get("stages", {})
+
+    def mark_completed(self, key: str, test_file_path: str, stage: str, **details) -> None:
+        """Record that a stage finished for the given key, keeping earlier stages."""
+        manifest = self.load(key) or {"key": key, "test_file_path": test_file_path, "stages": {}}
+        manifest["stages"][stage] = details
+        self._write_json(self._manifest_path(key), manifest)
+
+    def copy_manifest(self, source_key: str, target_key: str) -> None:
+        """Record the outcome of source_key under target_key (e.g. the content key after the fix)."""
+        manifest = self.load(source_key)
+        if manifest and source_key != target_key:
+            self._write_json(self._manifest_path(target_key), {**manifest, "key": target_key})
+
+    def stage_outputs_exist(self, key: str) -> bool:
+        """Check that the Stage 1 files the coding agent needs are still on disk."""
+        return (self.results_dir / f"code_blocks_{key}.txt").exists()
+
+    def set_pending(self, test_file_path: str, key: str) -> None:
+        """Remember that Stage 2 started for this spec, since the fix may change the spec's content key."""
+        self._write_json(self._pending_path(test_file_path), {"test_file_path": test_file_path, "key": key})
+
+    def get_pending(self, test_file_path: str) -> Optional[str]:
+        path = self._pending_path(test_file_path)
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8")).get("key")
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def clear_pending(self, test_file_path: str) -> None:
+        self._pending_path(test_file_path).unlink(missing_ok=True)
+
+    def _manifest_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _pending_path(self, test_file_path: str) -> Path:
+        path_hash = hashlib.sha256(test_file_path.encode("utf-8")).hexdigest()[:16]
+        return self.cache_dir / "pending" / f"{path_hash}.json"
+
+    @staticmethod
+    def _update_with_file(digest, name: str, path: Path) -> None:
+        digest.update(f"file:{name}\n".encode("utf-8"))
+        try:
+            digest.update(path.read_bytes())
+        except OSError:
+            digest.update(b"<missing>")
+
+    @staticmethod
+    def _write_json(path: Path, data: Dict[str, Any]) -> None:
+        # Write then rename so concurrent pipelines never read a half-written manifest
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, path)
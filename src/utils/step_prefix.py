@@ -0,0 +1,65 @@
+"""
+Finds setup steps shared by several specs of a batch.
+
+Each spec is reduced to the Cypress command chains of its first test (hooks included), and
+specs are grouped by the longest leading run of identical steps they share with others.
+"""
+
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+from self_healing.src.utils.spec_splitter import SpecSplitter
+
+# Configuration
+DEFAULT_MIN_SPECS = 2
+DEFAULT_MIN_STEPS = 2
+
+
+class PrefixGroup(NamedTuple):
+    """Specs whose first test starts with the same steps."""
+
+    steps: Tuple[str, ...]
+    test_file_paths: List[str]
+
+
+def spec_steps(workspace_path: str, test_file_paths: List[str]) -> Dict[str, List[str]]:
+    """Steps of the first test of each spec; specs that cannot be read or have no tests are left out."""
+    steps = {}
+    for test_file_path in test_file_paths:
+        try:
+            splitter = SpecSplitter.from_file(Path(workspace_path) / test_file_path)
+        except (OSError, UnicodeDecodeError):
+            continue
+        tests = splitter.tests()
+        if tests:
+            steps[test_file_path] = splitter.steps(tests[0])
+    return steps
+
+
+def shared_prefixes(
+    steps_by_spec: Dict[str, List[str]],
+    min_specs: int = DEFAULT_MIN_SPECS,
+    min_steps: int = DEFAULT_MIN_STEPS,
+) -> List[PrefixGroup]:
+    """
+    Group specs by the longest prefix they share with at least min_specs - 1 other specs.
+    A prefix never covers a spec's last step, so every spec still has something to heal.
+    """
+    counts: Dict[Tuple[str, ...], int] = {}
+    for steps in steps_by_spec.values():
+        for length in range(1, len(steps)):
+            prefix = tuple(steps[:length])
+            counts[prefix] = counts.get(prefix, 0) + 1
+
+    groups: Dict[Tuple[str, ...], List[str]] = {}
+    for test_file_path, steps in steps_by_spec.items():
+        best = None
+        for length in range(min_steps, len(steps)):
+            prefix = tuple(steps[:length])
+            if counts.get(prefix, 0) < min_specs:
+                break
+            best = prefix
+        if best:
+            groups.setdefault(best, []).append(test_file_path)
+
+    return [PrefixGroup(steps, paths) for steps, paths in groups.items() if len(paths) >= min_specs]
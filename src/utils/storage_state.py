@@ -0,0 +1,110 @@
+"""
+Captured login sessions (Playwright storage state) shared by web agent sessions.
+
+Once per environment, a web agent saves the browser's storage state right after logging in.
+Later MCP sessions start with `--storage-state` and skip the login flow. The environment is
+identified by a hash of the Cypress config files, so a different base URL or user gets its
+own state. A state is dropped when it is older than the maximum age or one of its cookies
+has expired; agents that find the session rejected log in again and overwrite it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from self_healing.src.utils.spec_dependencies import SpecDependencyResolver
+
+# Configuration
+DEFAULT_MAX_AGE = 3600
+
+
+class StorageStateStore:
+    """
+    Tracks the storage state file for the current environment and who is capturing it.
+    """
+
+    _shared: Dict[str, "StorageStateStore"] = {}
+
+    def __init__(self, workspace_path: str, max_age: float = DEFAULT_MAX_AGE, state_dir: Path | None = None):
+        self.workspace_path = workspace_path
+        self.max_age = max_age
+        self.state_dir = Path(state_dir) if state_dir else Path(workspace_path) / "self_healing" / "results" / "auth"
+        self.capturing = False
+
+    @classmethod
+    def shared(cls, workspace_path: str, max_age: float = DEFAULT_MAX_AGE) -> "StorageStateStore":
+        """Return the process-wide store for the workspace, creating it on first use."""
+        if workspace_path not in cls._shared:
+            cls._shared[workspace_path] = cls(workspace_path, max_age=max_age)
+        return cls._shared[workspace_path]
+
+    @property
+    def path(self) -> Path:
+        """Storage state file for the current environment."""
+        digest = hashlib.sha256()
+        for config_file in SpecDependencyResolver(self.workspace_path).config_files():
+            digest.update(config_file.name.encode("utf-8"))
+            digest.update(config_file.read_bytes())
+        return (self.state_dir / f"storage_state_{digest.hexdigest()[:16]}.json").absolute()
+
+    def valid_state(self) -> Optional[Path]:
+        """Return the storage state file if it can be reused, invalidating it otherwise."""
+        path = self.path
+        if not path.exists():
+            return None
+
+        reason = self._invalid_reason(path)
+        if reason:
+            print(f"🔑 Discarding saved login session ({reason})")
+            self.invalidate()
+            return None
+        return path
+
+    def begin_capture(self) -> Optional[Path]:
+        """Claim the capture for this process; returns where to save the state, or None if already claimed."""
+        if self.capturing:
+            return None
+        self.capturing = True
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        return self.path
+
+    def finish_capture(self) -> None:
+        """Release the capture claim and report whether a usable state was saved."""
+        self.capturing = False
+        path = self.path
+        if not path.exists():
+            print("🔑 No login session was captured")
+            return
+        reason = self._invalid_reason(path)
+        if reason:
+            print(f"🔑 Captured login session is not usable ({reason})")
+            self.invalidate()
+            return
+        print(f"🔑 Captured login session for later specs: {path}")
+
+    def invalidate(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+    def _invalid_reason(self, path: Path) -> Optional[str]:
+        age = time.time() - path.stat().st_mtime
+        if age > self.max_age:
+            return f"older than {self.max_age:g}s"
+        try:
+            state: Dict[str, Any] = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return "unreadable"
+
+        cookies = state.get("cookies", [])
+        origins = [origin for origin in state.get("origins", []) if origin.get("localStorage")]
+        if not cookies and not origins:
+            return "empty"
+        # Session cookies are stored with expires -1
+        now = time.time()
+        expired = [cookie["name"] for cookie in cookies if 0 < cookie.get("expires", -1) < now]
+        if expired:
+            return f"cookie {expired[0]} expired"
+        return None
@@ -2,8 +2,27 @@
 Cypress test execution utilities, including ARIA snapshot extraction.
 """
 
+import asyncio
+import json
+import os
+import re
+import signal
 import subprocess
-from typing import Optional, Tuple
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from self_healing.src.utils.aria_tree import extract_cypress_snapshot
+from self_healing.src.utils.baseline_store import BaselineStore
+from self_healing.src.utils.cypress_config import CypressConfigResolver
+from self_healing.src.utils.spec_splitter import SpecSplitter
+
+# Configuration
+DEFAULT_TIMEOUT = 600
+
+# "login.focus-1a2b3c4d.cy.js" -> "login.cy.js"
+_FOCUSED_COPY = re.compile(r"\.focus(?:-[0-9a-f]{8})?(?=\.[^/]*$|$)")
 
 
 class SubprocessExecutor:
@@ -11,14 +30,126 @@ class SubprocessExecutor:
     Execute Cypress specs via yarn and enhance failure output with ARIA snapshots.
     """
 
-    def __init__(self, workspace_path: str):
+    def __init__(
+        self,
+        workspace_path: str,
+        timeout: float = DEFAULT_TIMEOUT,
+        block_hosts: List[str] = None,
+        baseline_store: BaselineStore = None,
+    ):
         self.workspace_path = workspace_path
+        self.timeout = timeout
+        # Third-party hosts Cypress should not load (blockHosts)
+        self.block_hosts = block_hosts or []
+        # Capture mode: runs store the ARIA snapshots of their passing tests here
+        self.baseline_store = baseline_store
+        self.config_resolver = CypressConfigResolver.shared(workspace_path)
 
     def run(self, test_file_path: str) -> Tuple[bool, str]:
         """
         Run the Cypress spec and return (success, combined stdout/stderr).
         """
-        cmd = [
+        rejected = self._spec_pattern_error(test_file_path)
+        if rejected:
+            return False, rejected
+        capture_dir = self.baseline_store.begin_capture() if self.baseline_store else None
+        command = self._build_command(test_file_path, capture_dir)
+        try:
+            # In its own process group, so Cypress and Electron go down with yarn
+            process = subprocess.Popen(
+                command,
+                cwd=self.workspace_path,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                start_new_session=True,
+            )
+            try:
+                stdout, stderr = process.communicate(timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                _kill_process_group(process.pid)
+                process.communicate()
+                raise subprocess.TimeoutExpired(command, self.timeout) from None
+            except BaseException:
+                _kill_process_group(process.pid)
+                process.wait()
+                raise
+            if capture_dir:
+                self._store_baselines(test_file_path, capture_dir)
+        finally:
+            if capture_dir:
+                BaselineStore.discard_capture(capture_dir)
+
+        success = process.returncode == 0
+        return success, self._enhance_output(success, stdout + stderr)
+
+    async def run_async(self, test_file_path: str) -> Tuple[bool, str]:
+        """
+        Run the Cypress spec without blocking the event loop, so several specs can be
+        validated concurrently. Returns the same (success, output) tuple as run().
+        """
+        rejected = self._spec_pattern_error(test_file_path)
+        if rejected:
+            return False, rejected
+        capture_dir = self.baseline_store.begin_capture() if self.baseline_store else None
+        command = self._build_command(test_file_path, capture_dir)
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                cwd=self.workspace_path,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True,
+            )
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                _kill_process_group(process.pid)
+                await process.wait()
+                raise subprocess.TimeoutExpired(command, self.timeout) from None
+            except asyncio.CancelledError:
+                # Do not leave Cypress running when the surrounding job is cancelled
+                _kill_process_group(process.pid)
+                await process.wait()
+                raise
+            if capture_dir:
+                self._store_baselines(test_file_path, capture_dir)
+        finally:
+            if capture_dir:
+                BaselineStore.discard_capture(capture_dir)
+
+        success = process.returncode == 0
+        output = stdout.decode("utf-8", errors="replace") + stderr.decode("utf-8", errors="replace")
+        return success, self._enhance_output(success, output)
+
+    def _spec_pattern_error(self, test_file_path: str) -> Optional[str]:
+        """Cypress refuses specs outside specPattern after booting; report that without starting it."""
+        config = self.config_resolver.config()
+        if not config.config_file:
+            return None
+        spec_path = Path(test_file_path)
+        if spec_path.is_absolute():
+            try:
+                spec_path = spec_path.relative_to(Path(self.workspace_path).resolve())
+            except ValueError:
+                return None
+        if config.matches_spec(str(spec_path)) is not False:
+            return None
+        patterns = ", ".join(config.spec_patterns)
+        return f"Can't run because no spec files were found: {test_file_path} does not match specPattern {patterns}"
+
+    def _store_baselines(self, test_file_path: str, capture_dir: Path):
+        spec_path = self._baseline_spec_path(test_file_path)
+        stats = self.baseline_store.ingest(spec_path, capture_dir)
+        if stats.tests:
+            print(f"📸 Stored baselines of {spec_path}: {stats.summary()}")
+
+    def _baseline_spec_path(self, test_file_path: str) -> str:
+        """The spec a run's baselines are stored under."""
+        return test_file_path
+
+    def _build_command(self, test_file_path: str, capture_dir: Path = None) -> List[str]:
+        command = [
             "yarn",
             "run",
             "cy-run",
@@ -28,18 +159,17 @@ class SubprocessExecutor:
             "--spec",
             test_file_path,
         ]
+        config = {}
+        if self.block_hosts:
+            config["blockHosts"] = self.block_hosts
+        if capture_dir:
+            # The generated support file loads the project's own and adds the snapshot hook
+            config["supportFile"] = str(capture_dir / "support.js")
+        if config:
+            command += ["--config", json.dumps(config)]
+        return command
 
-        result = subprocess.run(
-            cmd,
-            cwd=self.workspace_path,
-            capture_output=True,
-            text=True,
-            timeout=600,
-        )
-
-        success = result.returncode == 0
-        output = result.stdout + result.stderr
-
+    def _enhance_output(self, success: bool, output: str) -> str:
         if not success:
             aria_snapshot = self._extract_aria_snapshot(output)
             if aria_snapshot:
@@ -52,32 +182,67 @@ class SubprocessExecutor:
                     output += "\n... (truncated, showing last 30000 characters)"
                 output += "\n" + "=" * 80 + "\n"
 
-        return success, output
+        return output
 
     @staticmethod
     def _extract_aria_snapshot(output: str) -> Optional[str]:
-        marker_start = "ARIA SNAPSHOT (Accessibility Tree)"
-        separator = "=" * 80
+        return extract_cypress_snapshot(output)
 
-        start_idx = output.find(marker_start)
-        if start_idx == -1:
-            return None
 
-        marker_line_end = output.find("\n", start_idx)
-        if marker_line_end == -1:
-            return None
+class SingleTestExecutor(SubprocessExecutor):
+    """
+    Execute a single test of a Cypress spec by running a temporary copy of the spec
+    in which that test is marked it.only(). The copy lives next to the original so
+    relative imports and the spec pattern keep working.
+    """
 
-        content_start = marker_line_end + 1
-        while content_start < len(output) and output[content_start : content_start + 80] == separator:
-            next_line = output.find("\n", content_start)
-            if next_line == -1:
-                return None
-            content_start = next_line + 1
+    def __init__(
+        self,
+        workspace_path: str,
+        test_title: str,
+        timeout: float = DEFAULT_TIMEOUT,
+        block_hosts: List[str] = None,
+        baseline_store: BaselineStore = None,
+    ):
+        super().__init__(workspace_path, timeout=timeout, block_hosts=block_hosts, baseline_store=baseline_store)
+        self.test_title = test_title
+
+    def run(self, test_file_path: str) -> Tuple[bool, str]:
+        with self._focused_copy(test_file_path) as focused_path:
+            return super().run(focused_path)
+
+    async def run_async(self, test_file_path: str) -> Tuple[bool, str]:
+        with self._focused_copy(test_file_path) as focused_path:
+            return await super().run_async(focused_path)
+
+    def _baseline_spec_path(self, test_file_path: str) -> str:
+        return _FOCUSED_COPY.sub("", test_file_path)
+
+    @contextmanager
+    def _focused_copy(self, test_file_path: str) -> Iterator[str]:
+        spec_path = Path(test_file_path)
+        absolute_path = spec_path if spec_path.is_absolute() else Path(self.workspace_path) / spec_path
+        splitter = SpecSplitter.from_file(absolute_path)
+        test = next((test for test in splitter.tests() if test.title == self.test_title), None)
+        if test is None:
+            print(f"⚠️ Test '{self.test_title}' not found in {test_file_path}, running the whole spec")
+            yield test_file_path
+            return
+
+        # "login.cy.js" -> "login.focus-<id>.cy.js", so the copy still matches the spec pattern
+        stem, _, suffixes = spec_path.name.partition(".")
+        focused_name = f"{stem}.focus-{uuid.uuid4().hex[:8]}.{suffixes}" if suffixes else f"{stem}.focus"
+        focused_path = absolute_path.with_name(focused_name)
+        focused_path.write_text(splitter.focus(test), encoding="utf-8")
+        try:
+            yield str(spec_path.with_name(focused_name))
+        finally:
+            focused_path.unlink(missing_ok=True)
 
-        end_idx = output.find(separator, content_start)
-        if end_idx == -1:
-            snapshot = output[content_start:].strip()
-        else:
-            snapshot = output[content_start:end_idx].strip()
 
-        return snapshot or None
+def _kill_process_group(pid: int):
+    """Kill yarn together with the Cypress and Electron processes it started."""
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
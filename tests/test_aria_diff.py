@@ -0,0 +1,63 @@
+from self_healing.src.utils.aria_diff import ADDED, CHANGED, MOVED, REMOVED, RENAMED, AriaDiff
+from self_healing.src.utils.aria_tree import AriaTree
+
+BASELINE = """- navigation "Main" [ref=e3]:
+  - link "Home" [ref=e4]:
+    - /url: /home
+  - button "Sign in" [disabled] [ref=e5]
+- textbox "Email" [ref=e6]: jane@example.com
+- text: Welcome back"""
+
+
+def diff(baseline: str, current: str) -> AriaDiff:
+    return AriaDiff.between(AriaTree.parse(baseline), AriaTree.parse(current))
+
+
+def test_identical_pages_with_new_refs_have_no_changes():
+    current = BASELINE.replace("ref=e", "ref=f")
+
+    assert len(diff(BASELINE, current)) == 0
+
+
+def test_renames_removals_additions_and_changes():
+    current = """- navigation "Main" [ref=e1]:
+  - link "Home" [ref=e2]:
+    - /url: /home
+  - button "Sign In" [ref=e3]
+- textbox "Email" [ref=e6]: jane@example.com
+- link "Help" [ref=e7]"""
+
+    changes = {change.kind: change for change in diff(BASELINE, current).changes}
+
+    assert set(changes) == {RENAMED, REMOVED, ADDED, CHANGED}
+    assert (changes[RENAMED].element, changes[RENAMED].detail) == ('button "Sign in"', '"Sign In"')
+    assert changes[REMOVED].element == 'text "Welcome back"'
+    assert changes[ADDED].element == 'link "Help"'
+    assert "disabled" in changes[CHANGED].detail
+
+
+def test_moved_elements_report_both_locations():
+    baseline = '- main:\n  - form "Login":\n    - button "Go" [ref=e1]\n- list:\n  - listitem "A"'
+    current = '- main:\n  - button "Go" [ref=e9]\n  - form "Login"\n- list:\n  - listitem "A"'
+
+    (change,) = diff(baseline, current).changes
+
+    assert change.kind == MOVED
+    assert (change.context, change.detail) == ('main > form "Login"', "main")
+
+
+def test_removed_subtrees_are_reported_once_at_their_root():
+    baseline = '- main:\n  - list "Items":\n    - listitem "A"\n    - listitem "B"'
+
+    (change,) = diff(baseline, "- main").changes
+
+    assert (change.kind, change.element, change.size) == (REMOVED, 'list "Items"', 3)
+
+
+def test_render_caps_the_number_of_lines():
+    baseline = "\n".join(f'- listitem "Item {index}"' for index in range(10))
+
+    # Ten removed items and the added main landmark
+    rendered = diff(baseline, "- main").render(limit=3)
+
+    assert rendered.splitlines()[-1] == "... 8 more changes omitted"
@@ -0,0 +1,61 @@
+from self_healing.src.utils.aria_tree import AriaTree
+
+SNAPSHOT = """- navigation "Main" [ref=e3]:
+  - link "Home" [ref=e4] [cursor=pointer]:
+    - /url: /home
+  - button "Sign in" [disabled] [ref=e5]
+- textbox "Email" [ref=e6]: jane@example.com
+- text: Welcome back"""
+
+
+def test_parse_reads_roles_names_refs_and_nesting():
+    tree = AriaTree.parse(SNAPSHOT)
+
+    assert [(node.role, node.name) for node in tree] == [
+        ("navigation", "Main"),
+        ("link", "Home"),
+        ("button", "Sign in"),
+        ("textbox", "Email"),
+        ("text", ""),
+    ]
+    button = tree.by_ref("e5")
+    assert button.depth == 1
+    assert [ancestor.name for ancestor in button.ancestors()] == ["Main"]
+    assert "disabled" in button.attributes
+
+
+def test_parse_reads_values_and_props():
+    tree = AriaTree.parse(SNAPSHOT)
+
+    assert tree.by_ref("e6").text == "jane@example.com"
+    assert tree.by_ref("e4").props == {"url": "/home"}
+
+
+def test_lookups_by_role_name_and_text():
+    tree = AriaTree.parse(SNAPSHOT)
+
+    assert tree.by_role("link") == [tree.by_ref("e4")]
+    assert tree.by_name("Email") == [tree.by_ref("e6")]
+    assert [node.role for node in tree.find_text("welcome")] == ["text"]
+    assert tree.by_ref("e99") is None
+
+
+def test_incremental_snapshots_flag_changed_nodes():
+    tree = AriaTree.parse('- <changed> button "Save" [ref=e9]\n- ref=e5 [unchanged]')
+
+    save, unchanged = list(tree)
+    assert (save.role, save.name, save.changed) == ("button", "Save", True)
+    assert (unchanged.ref, unchanged.changed) == ("e5", False)
+
+
+def test_from_mcp_result_reads_the_page_snapshot_block():
+    result = f"- Page URL: http://localhost/\n- Page Snapshot:\n```yaml\n{SNAPSHOT}\n```\n"
+
+    assert len(AriaTree.from_mcp_result(result)) == 5
+    assert AriaTree.from_mcp_result("no snapshot here") is None
+
+
+def test_render_round_trips():
+    tree = AriaTree.parse(SNAPSHOT)
+
+    assert [node.describe() for node in AriaTree.parse(tree.render())] == [node.describe() for node in tree]
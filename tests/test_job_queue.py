@@ -0,0 +1,92 @@
+from self_healing.src.lib.batch_runner import STATUS_ERRORED, STATUS_HEALED, SpecResult
+from self_healing.src.lib.job_queue import QUEUE_DONE, QUEUE_LEASED, JobQueue
+
+SPEC = "cypress/e2e/login.cy.js"
+# A lease that has already run out by the time the next call looks at it
+EXPIRED = -1
+
+
+def healed(test_file_path: str = SPEC) -> SpecResult:
+    return SpecResult(test_file_path, STATUS_HEALED, 1.0)
+
+
+def test_lease_takes_each_job_once(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.db"))
+    queue.enqueue([SPEC, "cypress/e2e/other.cy.js"], {SPEC: {"per_test": True}})
+
+    first = queue.lease("worker-a")
+    second = queue.lease("worker-b")
+
+    assert (first.test_file_path, first.options, first.attempts) == (SPEC, {"per_test": True}, 1)
+    assert second.test_file_path == "cypress/e2e/other.cy.js"
+    assert queue.lease("worker-c") is None
+    assert queue.counts() == {QUEUE_LEASED: 2}
+
+
+def test_expired_lease_is_leased_again(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.db"))
+    (job_id,) = queue.enqueue([SPEC])
+
+    queue.lease("worker-a", lease_seconds=EXPIRED)
+    job = queue.lease("worker-b")
+
+    assert (job.job_id, job.attempts) == (job_id, 2)
+
+
+def test_renewed_lease_is_not_leased_again(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.db"))
+    queue.enqueue([SPEC])
+
+    job = queue.lease("worker-a", lease_seconds=EXPIRED)
+    assert queue.renew(job.job_id, "worker-a", lease_seconds=300)
+
+    assert queue.lease("worker-b") is None
+
+
+def test_worker_that_lost_its_lease_cannot_renew_or_complete(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.db"))
+    queue.enqueue([SPEC])
+    job = queue.lease("worker-a", lease_seconds=EXPIRED)
+    queue.lease("worker-b")
+
+    assert not queue.renew(job.job_id, "worker-a")
+    assert not queue.complete(job.job_id, "worker-a", healed())
+    assert queue.complete(job.job_id, "worker-b", healed())
+    assert queue.results() == [healed()]
+
+
+def test_complete_finishes_the_job(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.db"))
+    queue.enqueue([SPEC])
+    job = queue.lease("worker-a")
+
+    assert queue.complete(job.job_id, "worker-a", healed())
+    assert not queue.renew(job.job_id, "worker-a")
+    assert queue.counts() == {QUEUE_DONE: 1}
+    assert queue.is_drained()
+
+
+def test_release_returns_the_job_without_using_an_attempt(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.db"))
+    queue.enqueue([SPEC])
+    job = queue.lease("worker-a")
+
+    queue.release(job.job_id, "worker-b")
+    assert queue.lease("worker-c") is None
+
+    queue.release(job.job_id, "worker-a")
+    assert queue.lease("worker-c").attempts == 1
+
+
+def test_job_errors_once_its_attempts_are_used_up(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.db"), max_attempts=2)
+    queue.enqueue([SPEC])
+
+    assert queue.lease("worker-a", lease_seconds=EXPIRED).attempts == 1
+    assert queue.lease("worker-b", lease_seconds=EXPIRED).attempts == 2
+    assert queue.lease("worker-c") is None
+
+    (result,) = queue.results()
+    assert result.status == STATUS_ERRORED
+    assert "2 times" in result.error
+    assert queue.is_drained()
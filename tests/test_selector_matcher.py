@@ -0,0 +1,87 @@
+import pytest
+from self_healing.src.utils.selector_matcher import (
+    LOOKUP_CONTENT,
+    LOOKUP_ELEMENT,
+    FailedLookup,
+    NoMatch,
+    SelectorMatcher,
+)
+from self_healing.src.utils.spec_splitter import SpecSplitter
+
+SEPARATOR = "=" * 80
+PAGE = """- navigation "Main" [ref=e3]:
+  - link "Home" [ref=e4]
+- button "Sign In" [ref=e5]
+- button "Submit your order" [ref=e9]"""
+
+SPEC = """describe('Sign in', () => {
+  beforeEach(() => {
+    cy.visit('/');
+  });
+
+  it('shows Sign in', () => {
+    cy.contains('Sign in').click();
+  });
+
+  it('keeps other tests', () => {
+    cy.contains('Sign in').should('exist');
+  });
+});
+"""
+
+
+def failure(error: str, page: str = PAGE) -> str:
+    snapshot = f"ARIA SNAPSHOT (Accessibility Tree)\n{SEPARATOR}\n{page}\n{SEPARATOR}\n"
+    return f"  AssertionError: Timed out retrying after 4000ms: {error}\n\n{snapshot}"
+
+
+def test_failed_lookup_reads_missing_content_and_elements():
+    content = FailedLookup.from_output(failure("Expected to find content: 'Sign in' but never did."))
+    element = FailedLookup.from_output(
+        failure("Expected to find element: `[data-testid=submit-order]`, but never found it.")
+    )
+
+    assert (content.kind, content.value) == (LOOKUP_CONTENT, "Sign in")
+    assert (element.kind, element.value) == (LOOKUP_ELEMENT, "[data-testid=submit-order]")
+    assert FailedLookup.from_output("AssertionError: expected 1 to equal 2") is None
+
+
+def test_renamed_content_is_edited_only_in_the_failing_test():
+    splitter = SpecSplitter(SPEC)
+    test = next(test for test in splitter.tests() if test.title == "shows Sign in")
+    spans = splitter.ranges(test)
+    output = failure("Expected to find content: 'Sign in' but never did.")
+
+    match = SelectorMatcher().propose(output, SPEC, spans)
+    healed = SelectorMatcher.apply(match, SPEC, spans)
+
+    assert (match.old, match.new, match.occurrences) == ("'Sign in'", "'Sign In'", 1)
+    assert match.confidence >= 0.75
+    assert "cy.contains('Sign In').click();" in healed
+    # Titles and the other test keep the old text
+    assert "describe('Sign in'" in healed and "it('shows Sign in'" in healed
+    assert "cy.contains('Sign in').should('exist');" in healed
+
+
+def test_missing_element_becomes_a_contains_lookup():
+    source = "it('orders', () => {\n  cy.get('[data-testid=submit-order]').click();\n});\n"
+    output = failure("Expected to find element: `[data-testid=submit-order]`, but never found it.")
+
+    match = SelectorMatcher().propose(output, source)
+
+    assert match.new == "contains('button', 'Submit your order')"
+    assert "cy.contains('button', 'Submit your order').click();" in SelectorMatcher.apply(match, source)
+
+
+def test_content_still_on_the_page_is_not_a_rename():
+    output = failure("Expected to find content: 'Home' but never did.")
+
+    with pytest.raises(NoMatch, match="still on the page"):
+        SelectorMatcher().propose(output, "cy.contains('Home');")
+
+
+def test_lookup_outside_the_source_is_not_matched():
+    output = failure("Expected to find content: 'Sign in' but never did.")
+
+    with pytest.raises(NoMatch, match="not written literally"):
+        SelectorMatcher().propose(output, "cy.contains(label);")